@@ -1,7 +1,9 @@
+import time
 import numpy as np
 from dataclasses import dataclass
-from .utils import InfoCriterion
-from .models import Gaussian, LinearRegression, Sgn, MAD
+from .utils import InfoCriterion, ICScore, SeriesStats
+from .models import Gaussian, DBSCAN, registry
+from .profiling import FitProfile, Profiler, stage
 
 
 @dataclass
@@ -11,18 +13,49 @@ class Params:
     z_normalization: bool = True
     info_criterion: InfoCriterion = InfoCriterion.AIC
     min_sample_size: int = 10
+    dtype: str = 'float64'
+    sgn_engine: str = 'scan'
+    gaussian_engine: str = 'moments'
+    gaussian_robust: bool = False
+    dbscan_engine: str = 'sweep'
+    profile: bool = False
     # Threshold
     p_normality: float = 5e-3
     std_width: float = 1.5
     linear_res: float = 1.5
+    exp_decay_res: float = 1.5
     sgn_res: float = 1.5
     mad_res: float = 1.5
+    changepoint_res: float = 1.5
+    seasonal_res: float = 1.5
     min_res: float = 10
     # Tolerance
     gaussian_err: float = 10
     linear_err: float = 10
+    exp_decay_err: float = 10
     sgn_err: float = 10
     mad_err: float = 10
+    changepoint_err: float = 10
+    seasonal_err: float = 10
+    # Warm start
+    skip_ic_margin: float = None
+    # Steps
+    sgn_min_size: int = 5
+    sgn_min_effect: float = 1.
+    # Change points
+    changepoint_max: int = 10
+    changepoint_min_size: int = 10
+    changepoint_info_criterion: InfoCriterion = InfoCriterion.BIC
+    changepoint_min_effect: float = 1.
+    # Seasonality
+    seasonal_min_cycles: int = 2
+    seasonal_max_period: int = 1440
+    seasonal_candidates: int = 3
+    seasonal_significance: float = 1e-2
+    # DBSCAN
+    dbscan_eps: float = 0.9
+    dbscan_min_samples: int = 3
+    dbscan_t_eps: float = None
 
 
 @dataclass
@@ -40,70 +73,228 @@ class FittingResult:
     outliers: list = None
     residual: np.ndarray = None
     error_code: ErrorCode = ErrorCode.ok
+    ic_scores: dict = None
+    profile: FitProfile = None
 
 
 class AnomalyDetector:
+    """
+    Select the model describing a series best and pick up the anomalous points.
 
-    def __init__(self, t, x, params=Params):
+    Args:
+        t (numpy.ndarray): Time points, ignored if ``params.scaleless_t`` is True.
+        x (numpy.ndarray): Values of the series.
+        params (Params, optional): Policies, thresholds and tolerances.
+        hooks (iterable, optional): Callables ``hook(stage, seconds)`` invoked at the end of every stage of
+            :meth:`fit`. Setting hooks or ``params.profile`` enables the profiling, and every result then carries
+            a :class:`~anko.profiling.FitProfile`.
+        copy (bool, optional): If False, t and x are used without copy, e.g. as views on NumPy arrays,
+            ``memoryview`` or Arrow/pandas-backed buffers. They must not be modified while the detector is in use.
+            x is still converted if it is not of type ``params.dtype``.
+
+    The values, the residuals and the z-scores are held in ``params.dtype``, e.g. 'float32' halves their memory,
+    while sums, moments and information criteria are accumulated in float64.
+    """
+
+    def __init__(self, t, x, params=Params, hooks=(), copy: bool = True):
         self.params = params
-        self.x = np.array(x)
+        self.hooks = list(hooks)
+        self.x = np.array(x, dtype=params.dtype) if copy else np.asarray(x, dtype=params.dtype)
         if self.x.size < self.params.min_sample_size:
-            raise ValueError(ErrorCode.low_sample.format(x.size, self.params.min_sample_size))
+            raise ValueError(ErrorCode.low_sample.format(self.x.size, self.params.min_sample_size))
         if params.scaleless_t:
             self.t = np.arange(self.x.size)
         else:
-            self.t = np.array(t)
+            self.t = np.array(t) if copy else np.asarray(t)
+        self.stats = SeriesStats(self.x)
+        self._buffer = None
+
+    def _residual_buffer(self) -> np.ndarray:
+        # @Note: The full residual only lives until label_outliers keeps the outliers, so one buffer serves every fit.
+        if self._buffer is None:
+            self._buffer = np.empty(self.x.shape, dtype=self.x.dtype)
+        return self._buffer
+
+    def fit(self, previous: FittingResult = None) -> FittingResult:
+        """
+        Select the best model and pick up the anomalous points.
 
-    def fit(self) -> FittingResult:
+        Args:
+            previous (FittingResult, optional): Result of the previous fit of the same metric.
+                The iterative fits are seeded with its popt if it selected the same model,
+                and if ``params.skip_ic_margin`` is set, models whose information criterion exceeded the best one
+                by more than this margin last time are not fitted.
+
+        The models of :data:`~anko.models.registry` are fitted cheapest first, and a model is skipped when
+        the information criterion at its lower bound on the residual sum of squares cannot beat the best one so far.
+
+        Returns:
+            FittingResult:
+                result (FittingResult): Best model, its parameters and the anomalous points.
+        """
+        profiler = Profiler(self.hooks) if self.params.profile or self.hooks else None
+        start = time.perf_counter()
         result = FittingResult()
         proceed_to_ansatzes = True
 
-        model = Gaussian(self.x)
-        if model.is_normal_distribution(self.params.p_normality):
-            popt, perr = model.fit()
+        model = Gaussian.from_params(self.x, self.params, stats=self.stats)
+        model.profiler = profiler
+        with stage(profiler, 'normal_test'):
+            is_normal = model.is_normal_distribution(self.params.p_normality)
+        if is_normal:
+            popt, perr = self._fit_model(model, previous, profiler)
             if np.dot(perr[1:], perr[1:]) < self.params.gaussian_err:
                 result.best_model = model.name
                 result.popt = popt
                 result.perr = perr
-                result.residual = model.residual(self.params.min_res)
+                with stage(profiler, 'gaussian.residual'):
+                    result.residual = model.residual(self.params.min_res, out=self._residual_buffer())
                 proceed_to_ansatzes = False
 
-        models = [
-            LinearRegression(self.t, self.x),
-            Sgn(self.t, self.x),
-            MAD(self.t, self.x)
-        ]
         if proceed_to_ansatzes:
             tmp_result = {}
-            for model in models:
-                tmp_result[model.name] = {}
-                tmp_result[model.name]['popt'], tmp_result[model.name]['perr'] = model.fit()
-                tmp_result[model.name]['ic_score'] = model.score(self.params.info_criterion)
-                tmp_result[model.name]['residual'] = model.residual(tmp_result[model.name]['popt'],
-                                                                    self.params.min_res,
-                                                                    self.params.z_normalization)
+            best_score = np.inf
+            for model_cls in self._skip_lost_models(registry, previous):
+                with np.errstate(divide='ignore'):
+                    lower_bound = ICScore.from_rss(model_cls.rss_lower_bound(self.t, self.x, self.stats),
+                                                   self.x.size, model_cls.dof, self.params.info_criterion)
+                if lower_bound >= best_score:
+                    continue
+                model = model_cls.from_params(self.t, self.x, self.params, stats=self.stats)
+                model.profiler = profiler
+                tmp_result[model.name] = {'model': model}
+                tmp_result[model.name]['popt'], tmp_result[model.name]['perr'] = \
+                    self._fit_model(model, previous, profiler)
+                with stage(profiler, model.name + '.score'), np.errstate(divide='ignore'):
+                    tmp_result[model.name]['ic_score'] = model.score(self.params.info_criterion)
+                best_score = min(best_score, tmp_result[model.name]['ic_score'])
             result.best_model = min(tmp_result.items(), key=lambda k: k[1]['ic_score'])[0]
             result.popt = tmp_result[result.best_model]['popt']
             result.perr = tmp_result[result.best_model]['perr']
-            result.residual = tmp_result[model.name]['residual']
-        return self.get_outliers(result)
+            # @Note: Only the residual of the selected model is needed.
+            with stage(profiler, result.best_model + '.residual'):
+                result.residual = tmp_result[result.best_model]['model'].residual(result.popt,
+                                                                                  self.params.min_res,
+                                                                                  self.params.z_normalization,
+                                                                                  out=self._residual_buffer())
+            result.ic_scores = {name: tmp['ic_score'] for name, tmp in tmp_result.items()}
+        with stage(profiler, 'label_outliers'):
+            result = self.get_outliers(result)
+        if profiler is not None:
+            profiler.profile.total = time.perf_counter() - start
+            result.profile = profiler.profile
+        return result
 
-    def get_outliers(self, result: FittingResult) -> FittingResult:
-        if result.best_model == Gaussian.name:
-            outlier_idx = abs(result.residual) > self.params.std_width
-            result.residual = result.residual[outlier_idx]
-        # @TODO: This treatment isn't perfect and may result in many garbage results
-        # elif result.best_model == Sgn.name and (result.popt[0] - result.popt[1]) > self.params.min_res:
-        #     # @Note: Treat all points after a sudden drop as outliers
-        #     outlier_idx = np.where(self.t > result.popt[2])[0]
-        #     result.residual = (result.popt[1] - result.popt[0]) * np.ones(len(outlier_idx))
-        else:
-            outlier_idx = abs(result.residual) > getattr(self.params, "{}_res".format(result.best_model))
-            result.residual = result.residual[outlier_idx]
-        result.outliers = list(zip(self.t[outlier_idx], self.x[outlier_idx]))
-
-        err_norm = np.linalg.norm(result.perr)
-        err_thres = getattr(self.params, "{}_err".format(result.best_model))
-        if err_norm > err_thres:
-            result.error_code = ErrorCode.unconverged.format(result.best_model, err_norm, err_thres)
+    async def afit(self, previous: FittingResult = None, executor=None) -> FittingResult:
+        """
+        Awaitable :meth:`fit`, run in executor such that the event loop keeps serving other requests.
+        To fit many concurrent series together, see :class:`~anko.service.MicroBatcher`.
+
+        Args:
+            previous (FittingResult, optional): See :meth:`fit`.
+            executor (concurrent.futures.Executor, optional): Default to the executor of the running event loop.
+
+        Returns:
+            FittingResult:
+                result (FittingResult): Same as :meth:`fit`.
+        """
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(executor, self.fit, previous)
+
+    def _fit_model(self, model, previous: FittingResult, profiler: Profiler = None) -> tuple:
+        with stage(profiler, model.name + '.fit'):
+            if profiler is None:
+                return model.fit(p0=self._warm_start(model.name, previous))
+            try:
+                popt, perr = model.fit(p0=self._warm_start(model.name, previous))
+            except RuntimeError:
+                profiler.profile.converged[model.name] = False
+                raise
+        err_norm = np.linalg.norm(perr)
+        profiler.profile.converged[model.name] = bool(err_norm <= getattr(self.params, "{}_err".format(model.name)))
+        return popt, perr
+
+    @staticmethod
+    def _warm_start(name: str, previous: FittingResult = None):
+        if previous is not None and previous.best_model == name and np.size(previous.popt):
+            return previous.popt
+        return None
+
+    def _skip_lost_models(self, models, previous: FittingResult = None) -> list:
+        if previous is None or not previous.ic_scores or self.params.skip_ic_margin is None:
+            return list(models)
+        best_score = min(previous.ic_scores.values())
+        return [model for model in models
+                if not previous.ic_scores.get(model.name, best_score) - best_score > self.params.skip_ic_margin]
+
+    def fit_dbscan(self) -> FittingResult:
+        """
+        Alternative to :meth:`fit` without model selection: cluster the data points with :class:`~anko.models.DBSCAN`,
+        using ``params.dbscan_eps``, ``params.dbscan_min_samples`` and ``params.dbscan_t_eps``,
+        and pick up the noise points.
+
+        Returns:
+            FittingResult:
+                result (FittingResult): The noise points as outliers, with their deviation from the median as residual.
+                popt holds the neighbourhood radii (x_eps, t_eps) in the units of x and t, t_eps being nan
+                if only the values are clustered.
+        """
+        profiler = Profiler(self.hooks) if self.params.profile or self.hooks else None
+        start = time.perf_counter()
+        model = DBSCAN.from_params(self.t, self.x, self.params, stats=self.stats)
+        model.profiler = profiler
+        with stage(profiler, 'dbscan.fit'):
+            out = model.fit(self.params.dbscan_eps, self.params.dbscan_min_samples, self.params.dbscan_t_eps)
+        noise = out['labels'] == -1
+        t_eps = np.nan if self.params.dbscan_t_eps is None else self.params.dbscan_t_eps
+        result = FittingResult(best_model=model.name,
+                               popt=np.array([model.x_eps, t_eps]),
+                               outliers=list(zip(self.t[noise], self.x[noise])),
+                               residual=self.x[noise] - self.stats.median)
+        if profiler is not None:
+            profiler.profile.total = time.perf_counter() - start
+            result.profile = profiler.profile
         return result
+
+    def get_outliers(self, result: FittingResult) -> FittingResult:
+        return label_outliers(self.t, self.x, result, self.params)
+
+
+def label_outliers(t: np.ndarray, x: np.ndarray, result: FittingResult, params=Params) -> FittingResult:
+    """
+    Pick up anomalous points from the full residual of the best model, and check the convergence of the fitting.
+
+    Args:
+        t (numpy.ndarray): Time points of the series.
+        x (numpy.ndarray): Values of the series.
+        result (FittingResult): Result of the model selection, holding the residual of every data point.
+        params (Params, optional): Thresholds and tolerances.
+
+    Returns:
+        FittingResult:
+            result (FittingResult): The same object, with outliers, residual of the outliers and error code filled in.
+    """
+    if result.best_model == Gaussian.name:
+        outlier_idx = _exceeds(result.residual, params.std_width)
+        result.residual = result.residual[outlier_idx]
+    # @TODO: This treatment isn't perfect and may result in many garbage results
+    # elif result.best_model == Sgn.name and (result.popt[0] - result.popt[1]) > params.min_res:
+    #     # @Note: Treat all points after a sudden drop as outliers
+    #     outlier_idx = np.where(t > result.popt[2])[0]
+    #     result.residual = (result.popt[1] - result.popt[0]) * np.ones(len(outlier_idx))
+    else:
+        outlier_idx = _exceeds(result.residual, getattr(params, "{}_res".format(result.best_model)))
+        result.residual = result.residual[outlier_idx]
+    result.outliers = list(zip(t[outlier_idx], x[outlier_idx]))
+
+    err_norm = np.linalg.norm(result.perr)
+    err_thres = getattr(params, "{}_err".format(result.best_model))
+    if err_norm > err_thres:
+        result.error_code = ErrorCode.unconverged.format(result.best_model, err_norm, err_thres)
+    return result
+
+
+def _exceeds(res: np.ndarray, threshold: float) -> np.ndarray:
+    # @Note: Same as abs(res) > threshold, without the temporary array of magnitudes.
+    exceeds = np.greater(res, threshold)
+    return np.logical_or(exceeds, np.less(res, -threshold), out=exceeds)
@@ -0,0 +1,327 @@
+import numpy as np
+from collections import defaultdict
+from .utils import InfoCriterion, ICScore, SeriesStats, central_moments, mask_small
+from .models import Gaussian, registry
+from .anomaly_detector import Params, ErrorCode, FittingResult, label_outliers, _exceeds
+
+
+class CompactResult:
+    """
+    Result of one series of a :class:`BatchResult`, holding arrays instead of the per-outlier tuples
+    and the formatted error string of :class:`~anko.anomaly_detector.FittingResult`.
+    The attributes outliers and error_code are built on access, such that it can be used in place of a FittingResult.
+
+    Args:
+        best_model (str): Name of the selected model, None if the series was not fitted.
+        popt (numpy.ndarray): Estimated parameters of the best model.
+        perr (numpy.ndarray): Errors of popt, a 1-element array for models with a scalar error.
+        outlier_index (numpy.ndarray): Positions of the outliers in the series.
+        outlier_t (numpy.ndarray): Time points of the outliers.
+        outlier_x (numpy.ndarray): Values of the outliers.
+        residual (numpy.ndarray): Residual of the outliers.
+        status (int): Index in :attr:`BatchResult.statuses`.
+        err_norm (float): Norm of perr.
+        size (int): Number of data points of the series.
+        params (Params): Parameters of the fit, used to format error_code.
+    """
+
+    __slots__ = ('best_model', 'popt', 'perr', 'outlier_index', 'outlier_t', 'outlier_x', 'residual', 'status',
+                 'err_norm', 'size', 'params')
+
+    def __init__(self, best_model, popt, perr, outlier_index, outlier_t, outlier_x, residual, status, err_norm, size,
+                 params=Params):
+        self.best_model = best_model
+        self.popt = popt
+        self.perr = perr
+        self.outlier_index = outlier_index
+        self.outlier_t = outlier_t
+        self.outlier_x = outlier_x
+        self.residual = residual
+        self.status = status
+        self.err_norm = err_norm
+        self.size = size
+        self.params = params
+
+    @property
+    def outliers(self) -> list:
+        return list(zip(self.outlier_t, self.outlier_x))
+
+    @property
+    def error_code(self) -> str:
+        if self.status == BatchResult.statuses.index('unconverged'):
+            err_thres = getattr(self.params, "{}_err".format(self.best_model))
+            return ErrorCode.unconverged.format(self.best_model, self.err_norm, err_thres)
+        elif self.status == BatchResult.statuses.index('low_sample'):
+            return ErrorCode.low_sample.format(self.size, self.params.min_sample_size)
+        return ErrorCode.ok
+
+    def to_fitting_result(self) -> FittingResult:
+        return FittingResult(best_model=self.best_model, popt=self.popt, perr=self.perr, outliers=self.outliers,
+                             residual=self.residual, error_code=self.error_code)
+
+
+class BatchResult:
+    """
+    Columnar results of :meth:`BatchAnomalyDetector.fit_columnar`, made of a few NumPy arrays whatever the number
+    of series and outliers. Indexing returns the :class:`CompactResult` of one series,
+    whose arrays are views on the columns.
+
+    Args:
+        models (tuple): Names of the models, indexed by the field model of series.
+        series (numpy.ndarray): Structured array with one record per series: size, model (-1 if not fitted),
+            status (index in :attr:`statuses`), err_norm, n_popt and n_perr (number of valid columns of popt and perr)
+            and start, stop (slice of the outliers of the series).
+        popt (numpy.ndarray): Estimated parameters, one row per series padded with nan.
+        perr (numpy.ndarray): Errors of popt, one row per series padded with nan.
+        ic_scores (numpy.ndarray): Information criterion of every model (columns as models), nan if not fitted.
+        outliers (numpy.ndarray): Structured array with one record per outlier, grouped by series:
+            series, index, t, x and residual.
+        params (Params, optional): Parameters of the fit.
+    """
+
+    statuses = ('ok', 'unconverged', 'low_sample')
+    series_dtype = np.dtype([('size', np.int64), ('model', np.int8), ('status', np.int8), ('err_norm', np.float64),
+                             ('n_popt', np.int32), ('n_perr', np.int32), ('start', np.int64), ('stop', np.int64)])
+    outlier_dtype = np.dtype([('series', np.int64), ('index', np.int64), ('t', np.float64), ('x', np.float64),
+                              ('residual', np.float64)])
+
+    def __init__(self, models: tuple, series: np.ndarray, popt: np.ndarray, perr: np.ndarray, ic_scores: np.ndarray,
+                 outliers: np.ndarray, params=Params):
+        self.models = tuple(models)
+        self.series = series
+        self.popt = popt
+        self.perr = perr
+        self.ic_scores = ic_scores
+        self.outliers = outliers
+        self.params = params
+
+    def __len__(self):
+        return len(self.series)
+
+    def __getitem__(self, i: int) -> CompactResult:
+        record = self.series[i]
+        outliers = self.outliers[record['start']:record['stop']]
+        return CompactResult(self.models[record['model']] if record['model'] >= 0 else None,
+                             self.popt[i, :record['n_popt']], self.perr[i, :record['n_perr']],
+                             outliers['index'], outliers['t'], outliers['x'], outliers['residual'],
+                             int(record['status']), float(record['err_norm']), int(record['size']), self.params)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def save(self, path: str):
+        """
+        Write the columns to a .npz file.
+        """
+        np.savez(path, models=np.array(self.models), series=self.series, popt=self.popt, perr=self.perr,
+                 ic_scores=self.ic_scores, outliers=self.outliers)
+
+    @classmethod
+    def load(cls, path: str, params=Params):
+        with np.load(path) as npz:
+            return cls(npz['models'].tolist(), npz['series'], npz['popt'], npz['perr'], npz['ic_scores'],
+                       npz['outliers'], params)
+
+
+class BatchAnomalyDetector:
+    """
+    Perform the model selection of :class:`~anko.anomaly_detector.AnomalyDetector` on many series in one call.
+
+    Series of equal length are stacked into 2D blocks, on which the normal test, the information criterion
+    and the models of :data:`~anko.models.registry` providing a vectorized :meth:`~anko.models.Model.fit_many`
+    are evaluated across the block. Only the models relying on :func:`scipy.optimize.curve_fit`
+    are still fitted series by series.
+
+    Args:
+        series (numpy.ndarray or list): 2D array with one series per row, or a (ragged) list of 1D series.
+        t (numpy.ndarray or list, optional): Time points, either one 1D array shared by all series or one per series.
+            Only used if ``params.scaleless_t`` is False.
+        params (Params, optional): Policies, thresholds and tolerances shared by all series.
+    """
+
+    def __init__(self, series, t=None, params=Params):
+        self.params = params
+        if isinstance(series, np.ndarray) and series.ndim == 2:
+            self.x = np.asarray(series, dtype=params.dtype)
+        else:
+            self.x = [np.asarray(x, dtype=params.dtype) for x in series]
+        if params.scaleless_t:
+            self.t = None
+        elif t is None:
+            raise ValueError("t must be given if Params.scaleless_t is False")
+        elif np.ndim(t[0]) == 0:
+            self.t = [np.asarray(t)] * len(self.x)
+        else:
+            self.t = [np.asarray(t_i) for t_i in t]
+
+    def __len__(self):
+        return len(self.x)
+
+    def fit(self) -> list:
+        """
+        Fit all series.
+
+        Returns:
+            list:
+                results (list[FittingResult]): One result per series, in the same order as the input.
+                Series shorter than ``params.min_sample_size`` are not fitted and carry
+                :attr:`ErrorCode.low_sample` instead.
+        """
+        results = [None] * len(self)
+        for size, idx in self._group_by_size().items():
+            if size < self.params.min_sample_size:
+                for i in idx:
+                    results[i] = FittingResult(error_code=ErrorCode.low_sample.format(size,
+                                                                                      self.params.min_sample_size))
+                continue
+            x = self.x if isinstance(self.x, np.ndarray) else np.stack([self.x[i] for i in idx])
+            t = np.arange(size) if self.t is None else np.stack([self.t[i] for i in idx])
+            for i, result in zip(idx, self._fit_block(t, x)):
+                results[i] = result
+        return results
+
+    def fit_columnar(self) -> BatchResult:
+        """
+        Same fit as :meth:`fit`, but the outliers of every block are labelled at once and collected in
+        the columns of a :class:`BatchResult`, without Python objects per outlier.
+
+        Returns:
+            BatchResult:
+                results (BatchResult): Columnar results, in the same order as the input.
+        """
+        params = self.params
+        models = (Gaussian.name,) + tuple(model_cls.name for model_cls in registry)
+        series = np.zeros(len(self), dtype=BatchResult.series_dtype)
+        series['model'] = -1
+        popt, perr, outliers = [None] * len(self), [None] * len(self), []
+        ic_scores = np.full((len(self), len(models)), np.nan)
+        for size, idx in self._group_by_size().items():
+            series['size'][idx] = size
+            if size < params.min_sample_size:
+                series['status'][idx] = BatchResult.statuses.index('low_sample')
+                continue
+            x = self.x if isinstance(self.x, np.ndarray) else np.stack([self.x[i] for i in idx])
+            t = np.arange(size) if self.t is None else np.stack([self.t[i] for i in idx])
+            t, results = self._select_block(t, x)
+            threshold = np.array([params.std_width if result.best_model == Gaussian.name
+                                  else getattr(params, "{}_res".format(result.best_model)) for result in results])
+            err_thres = np.array([getattr(params, "{}_err".format(result.best_model)) for result in results])
+            residual = np.stack([result.residual for result in results])
+            rows, cols = np.nonzero(_exceeds(residual, threshold[:, None]))
+            block_outliers = np.empty(rows.size, dtype=BatchResult.outlier_dtype)
+            block_outliers['series'] = np.asarray(idx)[rows]
+            block_outliers['index'] = cols
+            block_outliers['t'] = t[rows, cols]
+            block_outliers['x'] = x[rows, cols]
+            block_outliers['residual'] = residual[rows, cols]
+            outliers.append(block_outliers)
+
+            err_norm = np.array([np.linalg.norm(result.perr) for result in results])
+            series['err_norm'][idx] = err_norm
+            series['status'][idx] = np.where(err_norm > err_thres, BatchResult.statuses.index('unconverged'),
+                                             BatchResult.statuses.index('ok'))
+            for i, result in zip(idx, results):
+                series['model'][i] = models.index(result.best_model)
+                popt[i], perr[i] = np.ravel(result.popt), np.ravel(result.perr)
+                for name, ic_score in (result.ic_scores or {}).items():
+                    ic_scores[i, models.index(name)] = ic_score
+
+        series['n_popt'] = [0 if p is None else p.size for p in popt]
+        series['n_perr'] = [0 if p is None else p.size for p in perr]
+        outliers = np.concatenate(outliers) if outliers else np.empty(0, dtype=BatchResult.outlier_dtype)
+        outliers = outliers[np.argsort(outliers['series'], kind='stable')]
+        series['start'] = np.searchsorted(outliers['series'], np.arange(len(self)), side='left')
+        series['stop'] = np.searchsorted(outliers['series'], np.arange(len(self)), side='right')
+        return BatchResult(models, series, self._pad(popt, series['n_popt']), self._pad(perr, series['n_perr']),
+                           ic_scores, outliers, params)
+
+    @staticmethod
+    def _pad(rows: list, sizes: np.ndarray) -> np.ndarray:
+        padded = np.full((len(rows), sizes.max(initial=0)), np.nan)
+        for i, row in enumerate(rows):
+            if row is not None:
+                padded[i, :row.size] = row
+        return padded
+
+    def _group_by_size(self) -> dict:
+        if isinstance(self.x, np.ndarray):
+            return {self.x.shape[1]: list(range(len(self.x)))}
+        groups = defaultdict(list)
+        for i, x in enumerate(self.x):
+            groups[x.size].append(i)
+        return groups
+
+    def _score(self, x, x_pred, dof):
+        with np.errstate(divide='ignore'):
+            if self.params.info_criterion == InfoCriterion.AIC:
+                return ICScore.aic(x, x_pred, dof)
+            elif self.params.info_criterion == InfoCriterion.BIC:
+                return ICScore.bic(x, x_pred, dof)
+
+    def _residual(self, res):
+        norm = np.std(res, axis=-1, keepdims=True, dtype=np.float64)
+        mask_small(res, self.params.min_res)
+        if self.params.z_normalization:
+            np.divide(res, norm, out=res, where=norm != 0)
+        return res
+
+    def _fit_block(self, t, x) -> list:
+        t, results = self._select_block(t, x)
+        return [label_outliers(t_i, x_i, result, self.params) for t_i, x_i, result in zip(t, x, results)]
+
+    def _select_block(self, t, x) -> tuple:
+        # @Note: Results hold the residual of every data point, the outliers are labelled by the caller.
+        params = self.params
+        t = np.broadcast_to(t, x.shape)
+        results = [FittingResult() for _ in range(len(x))]
+        proceed_to_ansatzes = np.ones(len(x), dtype=bool)
+
+        moments = central_moments(x, axis=-1)
+        for i in np.flatnonzero(Gaussian.batch_is_normal_distribution(x, params.p_normality, moments=moments)):
+            model = Gaussian.from_params(x[i], params, stats=SeriesStats(x[i], moments=tuple(m[i] for m in moments)))
+            popt, perr = model.fit()
+            if np.dot(perr[1:], perr[1:]) < params.gaussian_err:
+                results[i].best_model = model.name
+                results[i].popt = popt
+                results[i].perr = perr
+                results[i].residual = model.residual(params.min_res)
+                proceed_to_ansatzes[i] = False
+
+        idx = np.flatnonzero(proceed_to_ansatzes)
+        if idx.size:
+            xs, ts = x[idx], t[idx]
+            names, popt, perr, ic_scores = [], {}, {}, []
+            best_score = np.full(idx.size, np.inf)
+            # @Note: Only the predictions of the best model so far are kept, one block instead of one per model.
+            best, best_pred = np.zeros(idx.size, dtype=int), np.empty(xs.shape, dtype=xs.dtype)
+            for model_cls in registry:
+                with np.errstate(divide='ignore'):
+                    lower_bound = ICScore.from_rss(model_cls.rss_lower_bound(ts, xs), xs.shape[-1], model_cls.dof,
+                                                   params.info_criterion)
+                rows = np.flatnonzero(~(lower_bound >= best_score))
+                if not rows.size:
+                    continue
+                name = model_cls.name
+                popt[name], perr[name] = [None] * idx.size, [None] * idx.size
+                fitted_popt, fitted_perr, x_pred = model_cls.fit_many(ts[rows], xs[rows], params)
+                # @Note: Scored in the type of the block, as the predictions of the single series fits.
+                x_pred = np.asarray(x_pred, dtype=xs.dtype)
+                for j, row in enumerate(rows):
+                    popt[name][row], perr[name][row] = fitted_popt[j], fitted_perr[j]
+                ic_score = np.full(idx.size, np.inf)
+                ic_score[rows] = self._score(xs[rows], x_pred, model_cls.batch_dof(fitted_popt))
+                better = ~(ic_score[rows] >= best_score[rows])
+                best[rows[better]], best_pred[rows[better]] = len(names), x_pred[better]
+                best_score = np.minimum(best_score, ic_score)
+                names.append(name)
+                ic_scores.append(ic_score)
+
+            residual = self._residual(np.subtract(xs, best_pred, out=best_pred))
+            for j, (i, b) in enumerate(zip(idx, best)):
+                results[i].best_model = names[b]
+                results[i].popt = popt[names[b]][j]
+                results[i].perr = perr[names[b]][j]
+                results[i].residual = residual[j]
+                results[i].ic_scores = {name: ic_score[j] for name, ic_score in zip(names, ic_scores)
+                                        if popt[name][j] is not None}
+        return t, results
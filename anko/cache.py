@@ -0,0 +1,206 @@
+import os
+import copy
+import time
+import pickle
+import hashlib
+import numpy as np
+from dataclasses import fields
+from collections import OrderedDict
+from .anomaly_detector import Params
+
+
+def series_key(t, x, params=Params) -> str:
+    """
+    Content hash of a series together with the parameters it is fitted with.
+
+    Args:
+        t (numpy.ndarray): Time points, ignored if ``params.scaleless_t`` is True.
+        x (numpy.ndarray): Values of the series.
+        params (Params, optional): Policies, thresholds and tolerances.
+
+    Returns:
+        str:
+            key (str): Hex digest, identical for equal inputs.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(repr(tuple((f.name, getattr(params, f.name)) for f in fields(Params))).encode())
+    arrays = (x,) if params.scaleless_t else (x, t)
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update("{}{}".format(a.dtype.str, a.shape).encode())
+        h.update(memoryview(a).cast('B'))
+    return h.hexdigest()
+
+
+class MemoryBackend:
+    """
+    In-memory store with least-recently-used eviction.
+
+    Args:
+        max_size (int, optional): Maximal number of entries, unbounded if None.
+        ttl (float, optional): Lifetime of an entry in seconds, unbounded if None.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._store = OrderedDict()
+
+    def __len__(self):
+        return len(self._store)
+
+    def get(self, key: str):
+        if key not in self._store:
+            return None
+        created, value = self._store[key]
+        if self.ttl is not None and time.monotonic() - created > self.ttl:
+            del self._store[key]
+            return None
+        self._store.move_to_end(key)
+        return value
+
+    def set(self, key: str, value):
+        self._store[key] = (time.monotonic(), value)
+        self._store.move_to_end(key)
+        while self.max_size is not None and len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+
+    def clear(self):
+        self._store.clear()
+
+
+class DiskBackend:
+    """
+    On-disk store keeping one pickle file per entry, with least-recently-used eviction based on modification times.
+
+    Args:
+        directory (str): Directory of the store, created if missing.
+        max_size (int, optional): Maximal number of entries, unbounded if None.
+        ttl (float, optional): Lifetime of an entry in seconds, unbounded if None.
+    """
+
+    suffix = '.pkl'
+
+    def __init__(self, directory: str, max_size: int = None, ttl: float = None):
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _entries(self) -> list:
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.suffix)]
+
+    def __len__(self):
+        return len(self._entries())
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                created, value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if self.ttl is not None and time.time() - created > self.ttl:
+            os.remove(path)
+            return None
+        # @Note: The modification time records the last access, the creation time is kept in the file.
+        os.utime(path)
+        return value
+
+    def set(self, key: str, value):
+        path = self._path(key)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        if self.max_size is not None:
+            entries = self._entries()
+            if len(entries) > self.max_size:
+                entries.sort(key=lambda entry: entry.stat().st_mtime)
+                for entry in entries[:len(entries) - self.max_size]:
+                    os.remove(entry.path)
+
+    def clear(self):
+        for entry in self._entries():
+            os.remove(entry.path)
+
+
+class ResultCache:
+    """
+    Memoization of :class:`~anko.anomaly_detector.FittingResult` keyed by the content of the series
+    and the parameters, see :func:`series_key`. Results are returned as copies, so they can be modified freely.
+
+    Args:
+        backend (optional): Object with get, set and clear methods, such as :class:`MemoryBackend` (default)
+            or :class:`DiskBackend`.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = MemoryBackend() if backend is None else backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+    def get(self, key: str):
+        result = self.backend.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(result)
+
+    def set(self, key: str, result):
+        self.backend.set(key, copy.deepcopy(result))
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = self.misses = 0
+
+    def fit(self, detector):
+        """
+        Cached version of :meth:`AnomalyDetector.fit <anko.anomaly_detector.AnomalyDetector.fit>`.
+
+        Args:
+            detector (AnomalyDetector): Detector holding the series.
+
+        Returns:
+            FittingResult:
+                result (FittingResult): Cached result if available, otherwise the result of detector.fit().
+        """
+        key = series_key(detector.t, detector.x, detector.params)
+        result = self.get(key)
+        if result is None:
+            result = detector.fit()
+            self.set(key, result)
+        return result
+
+    def fit_batch(self, detector) -> list:
+        """
+        Cached version of :meth:`BatchAnomalyDetector.fit <anko.batch.BatchAnomalyDetector.fit>`.
+        Only the series missing in the cache are fitted, in one batch.
+
+        Args:
+            detector (BatchAnomalyDetector): Detector holding the series.
+
+        Returns:
+            list:
+                results (list[FittingResult]): One result per series, in the same order as the input.
+        """
+        params = detector.params
+        keys = [series_key(None if detector.t is None else detector.t[i], x, params) for i, x in enumerate(detector.x)]
+        results = [self.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            t = None if detector.t is None else [detector.t[i] for i in missing]
+            fitted = type(detector)([detector.x[i] for i in missing], t, params).fit()
+            for i, result in zip(missing, fitted):
+                self.set(keys[i], result)
+                results[i] = result
+        return results
@@ -0,0 +1,372 @@
+import os
+import zipfile
+import numpy as np
+from .utils import ICScore, dagostino_pearson
+from .models import Gaussian, LinearRegression, Sgn, MAD
+from .anomaly_detector import Params, ErrorCode, FittingResult
+
+
+def load_series(path, key: str = None) -> np.ndarray:
+    """
+    Open a series stored with :func:`numpy.save` or :func:`numpy.savez` without reading it into memory.
+
+    ``.npy`` files are memory-mapped. Members of ``.npz`` archives are memory-mapped in place
+    if the archive is not compressed (:func:`numpy.savez`), and loaded into memory otherwise
+    (:func:`numpy.savez_compressed`).
+
+    Args:
+        path (str): Path to a ``.npy`` or ``.npz`` file.
+        key (str, optional): Member of the ``.npz`` archive, default to the first one.
+
+    Returns:
+        numpy.ndarray:
+            x (numpy.ndarray): Read-only :class:`numpy.memmap`, or an in-memory array for compressed archives.
+    """
+    path = os.fspath(path)
+    if not zipfile.is_zipfile(path):
+        return np.load(path, mmap_mode='r')
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        name = names[0] if key is None else key + '.npy'
+        if name not in names:
+            raise KeyError("{} is not a member of {}".format(key, path))
+        info = archive.getinfo(name)
+        if info.compress_type != zipfile.ZIP_STORED:
+            with archive.open(name) as f:
+                return np.lib.format.read_array(f)
+    with open(path, 'rb') as f:
+        # @Note: The member data follow its local file header, whose name and extra field lengths are at byte 26.
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = np.frombuffer(f.read(4), dtype='<u2')
+        f.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+
+
+class ChunkedAnomalyDetector:
+    """
+    Counterpart of :class:`~anko.anomaly_detector.AnomalyDetector` for series too long to be held in memory,
+    such as :class:`numpy.memmap` or the arrays returned by :func:`load_series`.
+
+    The series is never copied as a whole. Every statistic is accumulated over chunks of chunk_size points,
+    so the peak memory is O(chunk_size) regardless of the length of the series:
+
+    * the mean, the central moments for the normal test and the linear regression take two passes,
+    * the median and the median absolute deviation are selected exactly by narrowing a value range with
+      histogram counts, a few passes each,
+    * the Gaussian engine 'moments' needs no extra pass, unless robust, and with the engine 'histogram'
+      the histogram uses the bins numpy would choose with bins='auto', and only the histogram is fitted,
+    * the step model uses the breakpoint scan of :meth:`Sgn.scan <anko.models.Sgn.scan>` with a running sum.
+      It is only considered if t is non-decreasing.
+
+    The candidates are the Gaussian, :class:`~anko.models.LinearRegression`, :class:`~anko.models.MAD`
+    and :class:`~anko.models.Sgn` models. The result holds the outliers and their residuals,
+    as the one of :meth:`AnomalyDetector.fit <anko.anomaly_detector.AnomalyDetector.fit>`.
+    As there, the values are converted to ``params.dtype`` chunk by chunk, while sums and moments
+    are accumulated in float64.
+
+    Args:
+        t (numpy.ndarray or str): Time points, or a path for :func:`load_series`.
+            Ignored if ``params.scaleless_t`` is True.
+        x (numpy.ndarray or str): Values of the series, or a path for :func:`load_series`.
+        params (Params, optional): Policies, thresholds and tolerances.
+        chunk_size (int, optional): Number of points processed at once.
+    """
+
+    bins = 256
+
+    def __init__(self, t, x, params=Params, chunk_size: int = 1 << 20):
+        self.params = params
+        self.x = self._open(x)
+        if self.x.ndim != 1:
+            raise ValueError("x must be 1D, got shape {}".format(self.x.shape))
+        if self.x.size < params.min_sample_size:
+            raise ValueError(ErrorCode.low_sample.format(self.x.size, params.min_sample_size))
+        self.t = None if params.scaleless_t else self._open(t)
+        if self.t is not None and self.t.shape != self.x.shape:
+            raise ValueError("t and x must have the same shape, got {} and {}".format(self.t.shape, self.x.shape))
+        self.chunk_size = chunk_size
+        self._summary = None
+
+    @staticmethod
+    def _open(a) -> np.ndarray:
+        if isinstance(a, (str, os.PathLike)):
+            return load_series(a)
+        return np.asarray(a)
+
+    @property
+    def n(self) -> int:
+        return self.x.size
+
+    def chunks(self):
+        """
+        Iterate over (t, x) chunks, t as float64 and x as ``params.dtype`` arrays.
+        They may be views on the input, and must not be modified.
+        """
+        for start in range(0, self.n, self.chunk_size):
+            stop = min(start + self.chunk_size, self.n)
+            t = np.arange(start, stop, dtype=float) if self.t is None else np.asarray(self.t[start:stop], dtype=float)
+            yield t, np.asarray(self.x[start:stop], dtype=self.params.dtype)
+
+    def _t_at(self, i: int) -> float:
+        return float(i) if self.t is None else float(self.t[i])
+
+    def summary(self) -> dict:
+        """
+        Mean, central moments, extrema and the centered cross sums of t and x, computed in two passes.
+        """
+        if self._summary is not None:
+            return self._summary
+        n = self.n
+        sum_t = sum_x = 0.
+        x_min, x_max = np.inf, -np.inf
+        t_sorted, t_last = True, -np.inf
+        for t, x in self.chunks():
+            sum_t += t.sum()
+            sum_x += x.sum(dtype=np.float64)
+            x_min, x_max = min(x_min, x.min()), max(x_max, x.max())
+            t_sorted &= bool(t[0] >= t_last and np.all(np.diff(t) >= 0))
+            t_last = t[-1]
+        mean_t, mean_x = sum_t / n, sum_x / n
+        stt = stx = sxx = sx3 = sx4 = 0.
+        for t, x in self.chunks():
+            t = t - mean_t
+            x = np.subtract(x, mean_x, dtype=np.float64)
+            squared = x * x
+            stt += np.dot(t, t)
+            stx += np.dot(t, x)
+            sxx += squared.sum()
+            sx3 += np.dot(squared, x)
+            sx4 += np.dot(squared, squared)
+        self._summary = {'mean_t': mean_t, 'mean': mean_x, 'm2': sxx / n, 'm3': sx3 / n, 'm4': sx4 / n,
+                         'stt': stt, 'stx': stx, 'min': x_min, 'max': x_max, 't_sorted': t_sorted}
+        return self._summary
+
+    def select(self, k: int, transform=None, bounds: tuple = None) -> float:
+        """
+        Exact k-th smallest value (from 0) of the series, or of transform(x) if given.
+        The range holding it is narrowed down by histogram counts until its points fit into one chunk.
+
+        Args:
+            k (int): Order of the value.
+            transform (callable, optional): Elementwise function applied to every chunk of x.
+            bounds (tuple, optional): Minimum and maximum of the transformed values, if known.
+
+        Returns:
+            float:
+                value (float): The k-th smallest value.
+        """
+        transform = (lambda x: x) if transform is None else transform
+        if bounds is None:
+            lo, hi = np.inf, -np.inf
+            for _, x in self.chunks():
+                v = transform(x)
+                lo, hi = min(lo, v.min()), max(hi, v.max())
+        else:
+            lo, hi = bounds
+        # @Note: Values in [lo, hi] are searched, below counts the values under lo.
+        below = 0
+        while True:
+            edges = np.linspace(lo, hi, self.bins + 1)
+            if not np.all(np.diff(edges) > 0):
+                # @Note: The range cannot be split further, so it holds only a few distinct floats.
+                values = np.unique(np.concatenate([np.unique(v[(v >= lo) & (v <= hi)])
+                                                   for v in map(transform, (x for _, x in self.chunks()))]))
+                counts = np.zeros(values.size, dtype=np.int64)
+                for _, x in self.chunks():
+                    v = transform(x)
+                    counts += np.bincount(np.searchsorted(values, v[(v >= lo) & (v <= hi)]), minlength=values.size)
+                return float(values[np.searchsorted(np.cumsum(counts), k - below, side='right')])
+            counts = np.zeros(self.bins, dtype=np.int64)
+            for _, x in self.chunks():
+                v = transform(x)
+                counts += np.histogram(v[(v >= lo) & (v <= hi)], bins=edges)[0]
+            if counts.sum() <= self.chunk_size:
+                values = [transform(x) for _, x in self.chunks()]
+                values = np.concatenate([v[(v >= lo) & (v <= hi)] for v in values])
+                return float(np.partition(values, k - below)[k - below])
+            cumulative = np.cumsum(counts)
+            b = int(np.searchsorted(cumulative, k - below, side='right'))
+            below += int(cumulative[b - 1]) if b > 0 else 0
+            # @Note: Bins are half-open except the last one, so the upper edge is excluded by stepping below it.
+            lo, hi = edges[b], edges[b + 1] if b == self.bins - 1 else np.nextafter(edges[b + 1], -np.inf)
+
+    def quantile(self, q: float, transform=None, bounds: tuple = None) -> float:
+        """
+        Quantile with the linear interpolation of :func:`numpy.quantile`, see :meth:`select`.
+        """
+        index = q * (self.n - 1)
+        k = int(np.floor(index))
+        lower = self.select(k, transform, bounds)
+        if index == k:
+            return lower
+        # @Note: The next order statistic is lower itself if repeated, otherwise the smallest value above it.
+        n_le, upper = 0, np.inf
+        for _, x in self.chunks():
+            v = x if transform is None else transform(x)
+            n_le += np.count_nonzero(v <= lower)
+            above = v[v > lower]
+            if above.size:
+                upper = min(upper, above.min())
+        if n_le > k + 1:
+            upper = lower
+        return lower + (index - k) * (upper - lower)
+
+    def median(self) -> float:
+        summary = self.summary()
+        return self.quantile(0.5, bounds=(summary['min'], summary['max']))
+
+    def mad(self, median: float) -> float:
+        summary = self.summary()
+        bounds = (0., max(summary['max'] - median, median - summary['min']))
+        return self.quantile(0.5, transform=lambda x: abs(x - median), bounds=bounds)
+
+    def histogram(self) -> tuple:
+        """
+        Histogram with the bin edges of numpy's bins='auto', i.e. the smaller width of the Freedman-Diaconis
+        and the Sturges estimators, accumulated chunk by chunk.
+        """
+        summary = self.summary()
+        first, last = summary['min'], summary['max']
+        if first == last:
+            first, last = first - 0.5, last + 0.5
+        bounds = (summary['min'], summary['max'])
+        iqr = self.quantile(0.75, bounds=bounds) - self.quantile(0.25, bounds=bounds)
+        width = (summary['max'] - summary['min']) / (np.log2(self.n) + 1.0)
+        if iqr > 0:
+            width = min(width, 2.0 * iqr * self.n ** (-1.0 / 3.0))
+        n_bins = int(np.ceil((last - first) / width)) if width > 0 else 1
+        edges = np.linspace(first, last, n_bins + 1)
+        hist = np.zeros(n_bins, dtype=np.int64)
+        for _, x in self.chunks():
+            hist += np.histogram(x, bins=edges)[0]
+        return 0.5 * (edges[1:] + edges[:-1]), hist
+
+    def scan(self) -> tuple:
+        """
+        Chunked version of :meth:`Sgn.scan <anko.models.Sgn.scan>` for non-decreasing t, with the segment size and
+        effect size gates of ``params.sgn_min_size`` and ``params.sgn_min_effect``.
+
+        Returns:
+            tuple:
+                popt (numpy.ndarray): (a, b, t0).
+                perr (numpy.ndarray): Standard errors of (a, b, t0).
+                rss (float): Residual sum of squares.
+        """
+        summary = self.summary()
+        n, mean = self.n, summary['mean']
+        total = 0.
+        best_gain, best_k, best_left = -np.inf, 0, 0.
+        for start, (t, x) in zip(range(0, n, self.chunk_size), self.chunks()):
+            left_sum = total + np.cumsum(np.subtract(x, mean, dtype=np.float64))
+            total = left_sum[-1]
+            k = np.arange(start + 1, start + t.size + 1)
+            valid = (k >= self.params.sgn_min_size) & (n - k >= self.params.sgn_min_size)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                gain = left_sum ** 2 / k + left_sum ** 2 / (n - k)
+            # @Note: A split between equal time points is not a step.
+            t_next = np.append(t[1:], self._t_at(start + t.size) if start + t.size < n else np.inf)
+            gain[~valid | (t_next == t)] = -np.inf
+            j = int(np.argmax(gain))
+            if gain[j] > best_gain:
+                best_gain, best_k, best_left = gain[j], int(k[j]), left_sum[j]
+        is_step = np.isfinite(best_gain)
+        if not is_step:
+            best_gain, best_k = 0., 1
+        rss = max(n * summary['m2'] - best_gain, 0.)
+        a = mean + best_left / best_k
+        b = mean - best_left / (n - best_k)
+        if not is_step or abs(b - a) < self.params.sgn_min_effect * np.sqrt(rss / max(n - Sgn.dof, 1)):
+            a, b, rss = mean, mean, n * summary['m2']
+        t_left, t_right = self._t_at(best_k - 1), self._t_at(best_k)
+        sigma2 = rss / max(n - Sgn.dof, 1)
+        popt = np.array([a, b, 0.5 * (t_left + t_right)])
+        perr = np.array([np.sqrt(sigma2 / best_k), np.sqrt(sigma2 / (n - best_k)), 0.5 * (t_right - t_left)])
+        return popt, perr, rss
+
+    def fit(self) -> FittingResult:
+        """
+        Select the best model and pick up the anomalous points, in a bounded number of passes over the series.
+
+        Returns:
+            FittingResult:
+                result (FittingResult): Best model, its parameters and the anomalous points.
+        """
+        params, n = self.params, self.n
+        summary = self.summary()
+        mean, m2 = summary['mean'], summary['m2']
+        std = np.sqrt(m2)
+        result = FittingResult()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p_value = dagostino_pearson(summary['m3'] / m2 ** 1.5, summary['m4'] / m2 ** 2, n)[1]
+        if np.isfinite(p_value) and p_value >= params.p_normality:
+            loc, scale = mean, std
+            if params.gaussian_engine == 'histogram':
+                popt, perr = Gaussian.fit_histogram(*self.histogram(), mean, std)
+            else:
+                if params.gaussian_robust:
+                    loc = self.median()
+                    scale = Gaussian.mad_scale * self.mad(loc)
+                popt, perr = Gaussian.fit_moments(n, loc, scale, params.gaussian_robust)
+            if np.dot(perr[1:], perr[1:]) < params.gaussian_err:
+                result.best_model, result.popt, result.perr = Gaussian.name, popt, perr
+                return self._label_outliers(result, lambda t: loc, scale, params.std_width, True)
+
+        candidates = {}
+        stt, stx = summary['stt'], summary['stx']
+        slope = stx / stt if stt > 0 else 0.
+        intercept = mean - slope * summary['mean_t']
+        rss = max(n * m2 - slope * stx, 0.)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = stx / np.sqrt(stt * n * m2) if stt * m2 > 0 else (np.nan if stx == 0 else 0.)
+            std_err = np.sqrt((1 - min(r * r, 1.)) * m2 / (stt / n) / (n - 2))
+        candidates[LinearRegression.name] = (np.array([intercept, slope]), std_err, rss,
+                                             lambda t: intercept + slope * t)
+
+        median = self.median()
+        candidates[MAD.name] = ([], self.mad(median), n * (m2 + (mean - median) ** 2), lambda t: median)
+
+        if summary['t_sorted']:
+            popt, perr, rss = self.scan()
+            a, b, t0 = popt
+            candidates[Sgn.name] = (popt, perr, rss, lambda t: Sgn.func(t, a, b, t0))
+
+        dof = {LinearRegression.name: LinearRegression.dof, MAD.name: MAD.dof, Sgn.name: Sgn.dof}
+        with np.errstate(divide='ignore'):
+            result.ic_scores = {name: ICScore.from_rss(c[2], n, dof[name], params.info_criterion)
+                                for name, c in candidates.items()}
+        result.best_model = min(result.ic_scores.items(), key=lambda k: k[1])[0]
+        result.popt, result.perr, rss, predict = candidates[result.best_model]
+        # @Note: The least-squares residuals have zero mean, the one of the median is mean - median.
+        offset = mean - median if result.best_model == MAD.name else 0.
+        norm = np.sqrt(max(rss / n - offset ** 2, 0.))
+        return self._label_outliers(result, predict, norm, getattr(params, "{}_res".format(result.best_model)),
+                                    params.z_normalization)
+
+    def _label_outliers(self, result: FittingResult, predict, norm: float, threshold: float,
+                        standardized: bool) -> FittingResult:
+        params = self.params
+        outliers, residuals = [], []
+        for t, x in self.chunks():
+            res = x - predict(t)
+            res[abs(res) < params.min_res] = 0
+            if standardized and norm != 0:
+                res /= norm
+            outlier_idx = np.flatnonzero(abs(res) > threshold)
+            if outlier_idx.size:
+                outliers.extend(zip(t[outlier_idx].tolist(), x[outlier_idx].tolist()))
+                residuals.append(res[outlier_idx])
+        result.outliers = outliers
+        result.residual = np.concatenate(residuals) if residuals else np.empty(0)
+
+        err_norm = np.linalg.norm(result.perr)
+        err_thres = getattr(params, "{}_err".format(result.best_model))
+        if err_norm > err_thres:
+            result.error_code = ErrorCode.unconverged.format(result.best_model, err_norm, err_thres)
+        return result
@@ -0,0 +1,312 @@
+import os
+import sys
+import csv
+import json
+import math
+import zipfile
+import argparse
+import itertools
+import numpy as np
+from dataclasses import fields
+from concurrent.futures import ProcessPoolExecutor
+from .utils import InfoCriterion
+from .anomaly_detector import Params
+from .chunked import load_series
+
+
+def parse_params(overrides: list) -> Params:
+    """
+    Build :class:`~anko.anomaly_detector.Params` from ``name=value`` strings,
+    converting every value to the type of the field. An instance is returned rather than a subclass,
+    such that it can be sent to worker processes.
+    """
+    types = {f.name: f.type for f in fields(Params)}
+    values = {}
+    for item in overrides:
+        name, sep, value = item.partition('=')
+        if not sep or name not in types:
+            raise argparse.ArgumentTypeError("expected <field>=<value> with a field of Params, got {}".format(item))
+        values[name] = _convert(value, types[name], getattr(Params, name))
+    return Params(**values)
+
+
+def _convert(value: str, annotation, default):
+    if value.lower() == 'none':
+        return None
+    if annotation in (InfoCriterion, 'InfoCriterion'):
+        return InfoCriterion[value.upper()]
+    if annotation in (bool, 'bool'):
+        if value.lower() not in ('true', 'false', '1', '0', 'yes', 'no'):
+            raise argparse.ArgumentTypeError("expected a boolean, got {}".format(value))
+        return value.lower() in ('true', '1', 'yes')
+    if annotation in (int, 'int'):
+        return int(value)
+    if annotation in (float, 'float') or isinstance(default, float):
+        return float(value)
+    return value
+
+
+def read_series(path: str, id_column: str = 'id', t_column: str = 't', x_column: str = 'x'):
+    """
+    Iterate over the series stored in a file, reading one series at a time.
+
+    * ``.npz``: every member is a series, 2D members hold one series per row.
+    * ``.npy``: memory-mapped, a 1D array is one series, a 2D array holds one series per row.
+    * ``.csv`` and ``.parquet``: long format with one row per data point, consecutive rows with the same id_column
+      form a series. Without id_column the whole file is one series, and without t_column t is the row index.
+      Parquet requires pyarrow.
+
+    Yields:
+        tuple:
+            series_id (str): Name of the series within the file.
+            t (numpy.ndarray): Time points.
+            x (numpy.ndarray): Values.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.npz', '.npy'):
+        yield from _read_arrays(path, extension)
+    elif extension == '.csv':
+        yield from _group_rows(_read_csv_rows(path, id_column, t_column, x_column))
+    elif extension in ('.parquet', '.pq'):
+        yield from _group_rows(_read_parquet_rows(path, id_column, t_column, x_column))
+    else:
+        raise ValueError("unsupported file type {}".format(path))
+
+
+def _read_arrays(path: str, extension: str):
+    def rows(name, a):
+        if a.ndim == 1:
+            yield name, np.arange(a.size), a
+        else:
+            for i in range(len(a)):
+                yield "{}[{}]".format(name, i), np.arange(a.shape[1]), a[i]
+
+    if extension == '.npy':
+        yield from rows(os.path.basename(path), np.load(path, mmap_mode='r'))
+        return
+    # @Note: Members are memory-mapped, such that only the rows of the current batch are read.
+    with zipfile.ZipFile(path) as archive:
+        members = archive.infolist()
+    for member in members:
+        name = member.filename[:-len('.npy')] if member.filename.endswith('.npy') else member.filename
+        if member.compress_type != zipfile.ZIP_STORED:
+            raise ValueError("member {} of {} is compressed and would be read whole, "
+                             "store the series with numpy.savez instead of numpy.savez_compressed".format(name, path))
+        yield from rows(name, load_series(path, name))
+
+
+def _read_csv_rows(path: str, id_column: str, t_column: str, x_column: str):
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        if x_column not in reader.fieldnames:
+            raise ValueError("column {} not found in {}".format(x_column, path))
+        has_id, has_t = id_column in reader.fieldnames, t_column in reader.fieldnames
+        for i, row in enumerate(reader):
+            yield row[id_column] if has_id else '', float(row[t_column]) if has_t else i, float(row[x_column])
+
+
+def _read_parquet_rows(path: str, id_column: str, t_column: str, x_column: str):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("reading parquet files requires pyarrow")
+    parquet = pq.ParquetFile(path)
+    names = parquet.schema_arrow.names
+    columns = [c for c in (id_column, t_column, x_column) if c in names]
+    offset = 0
+    for batch in parquet.iter_batches(columns=columns):
+        n = batch.num_rows
+        ids = batch.column(id_column).to_pylist() if id_column in names else itertools.repeat('', n)
+        t = batch.column(t_column).to_numpy() if t_column in names else np.arange(offset, offset + n)
+        x = batch.column(x_column).to_numpy()
+        yield from zip(ids, t.tolist(), x.tolist())
+        offset += n
+
+
+def _group_rows(rows):
+    for series_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+        _, t, x = zip(*group)
+        yield str(series_id), np.array(t, dtype=float), np.array(x, dtype=float)
+
+
+def _batched(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _tolist(a):
+    return None if a is None else np.asarray(a, dtype=float).tolist()
+
+
+def to_record(source: str, series_id: str, size: int, result) -> dict:
+    """
+    JSON-serializable summary of the result of one series.
+    """
+    outliers = result.outliers or []
+    residual = [] if result.residual is None or not outliers else np.asarray(result.residual).tolist()
+    return {
+        'source': source,
+        'series': series_id,
+        'size': size,
+        'model': result.best_model,
+        'popt': _tolist(result.popt),
+        'perr': _tolist(result.perr),
+        'error_code': result.error_code,
+        'outliers': [{'t': float(t), 'x': float(x), 'residual': r}
+                     for (t, x), r in zip(outliers, residual or [None] * len(outliers))],
+    }
+
+
+class JsonLinesWriter:
+
+    def __init__(self, path: str):
+        self._file = sys.stdout if path == '-' else open(path, 'w')
+
+    def write(self, records: list):
+        for record in records:
+            self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class ParquetWriter:
+    """
+    Write one row per outlier, series without outliers are kept as one row with null t, x and residual.
+    """
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("writing parquet files requires pyarrow")
+        self._pa = pa
+        self._schema = pa.schema([('source', pa.string()), ('series', pa.string()), ('size', pa.int64()),
+                                  ('model', pa.string()), ('error_code', pa.string()),
+                                  ('t', pa.float64()), ('x', pa.float64()), ('residual', pa.float64())])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, records: list):
+        columns = {name: [] for name in self._schema.names}
+        for record in records:
+            for outlier in record['outliers'] or [{'t': None, 'x': None, 'residual': None}]:
+                for name in ('source', 'series', 'size', 'model', 'error_code'):
+                    columns[name].append(record[name])
+                for name in ('t', 'x', 'residual'):
+                    columns[name].append(outlier[name])
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def scan(inputs: list, output: str = '-', output_format: str = 'jsonl', params=Params, n_jobs: int = 1,
+         batch_size: int = 1024, chunk_size: int = None, id_column: str = 'id', t_column: str = 't',
+         x_column: str = 'x', only_outliers: bool = False) -> int:
+    """
+    Detect anomalies in every series of the input files and write the results batch by batch,
+    such that only batch_size series are held in memory at once. One pool of n_jobs worker processes
+    serves all batches, and chunk_size defaults to ceil(batch_size / n_jobs), such that every worker gets a chunk.
+
+    Returns:
+        int:
+            n_series (int): Number of series scanned.
+    """
+    # @Note: anko.parallel needs multiprocessing.shared_memory, hence the late import, such that --help works without.
+    from .parallel import ParallelAnomalyDetector
+    writer = ParquetWriter(output) if output_format == 'parquet' else JsonLinesWriter(output)
+    series = ((path, series_id, t, x) for path in inputs
+              for series_id, t, x in read_series(path, id_column, t_column, x_column))
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    if chunk_size is None:
+        chunk_size = math.ceil(batch_size / n_jobs)
+    executor = ProcessPoolExecutor(n_jobs) if n_jobs > 1 else None
+    n_series = 0
+    try:
+        for batch in _batched(series, batch_size):
+            t = None if params.scaleless_t else [t for _, _, t, _ in batch]
+            results = ParallelAnomalyDetector([x for _, _, _, x in batch], t, params, n_jobs=n_jobs,
+                                              chunk_size=chunk_size, executor=executor).fit()
+            records = [to_record(path, series_id, np.size(x), result)
+                       for (path, series_id, _, x), result in zip(batch, results)]
+            if only_outliers:
+                records = [record for record in records if record['outliers']]
+            writer.write(records)
+            n_series += len(batch)
+    finally:
+        writer.close()
+        if executor is not None:
+            executor.shutdown()
+    return n_series
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='anko', description='Anomaly detection on time series.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    parser_scan = commands.add_parser('scan', help='scan the series stored in .npz, .npy, .csv or .parquet files')
+    parser_scan.add_argument('inputs', nargs='+', help='input files')
+    parser_scan.add_argument('-o', '--output', default='-', help='output file, default to stdout')
+    parser_scan.add_argument('-f', '--format', dest='output_format', choices=('jsonl', 'parquet'), default='jsonl',
+                             help='output format, parquet requires pyarrow')
+    parser_scan.add_argument('-p', '--param', dest='params', action='append', default=[], metavar='FIELD=VALUE',
+                             help='override a field of Params, e.g. -p std_width=2 -p info_criterion=BIC')
+    parser_scan.add_argument('-j', '--jobs', dest='n_jobs', type=int, default=1,
+                             help='number of worker processes, -1 for one per CPU')
+    parser_scan.add_argument('--batch-size', type=int, default=1024, help='number of series read at once')
+    parser_scan.add_argument('--chunk-size', type=int, default=None,
+                             help='number of series handed to a worker, default to batch size / jobs')
+    parser_scan.add_argument('--id-column', default='id', help='series id column of csv and parquet inputs')
+    parser_scan.add_argument('--t-column', default='t', help='time column of csv and parquet inputs')
+    parser_scan.add_argument('--x-column', default='x', help='value column of csv and parquet inputs')
+    parser_scan.add_argument('--only-outliers', action='store_true', help='skip series without outliers')
+    parser_serve = commands.add_parser('serve', help='answer detection requests over HTTP, micro-batching them')
+    parser_serve.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser_serve.add_argument('--port', type=int, default=8080, help='port to listen on')
+    parser_serve.add_argument('--unix-socket', dest='path', help='listen on this unix socket instead of host:port')
+    parser_serve.add_argument('-p', '--param', dest='params', action='append', default=[], metavar='FIELD=VALUE',
+                              help='override a field of Params, e.g. -p std_width=2 -p info_criterion=BIC')
+    parser_serve.add_argument('-j', '--jobs', dest='n_jobs', type=int, default=1,
+                              help='number of worker processes fitting the batches, 1 for a thread of the server')
+    parser_serve.add_argument('--max-batch-size', type=int, default=64, help='maximal number of series fitted at once')
+    parser_serve.add_argument('--max-wait', type=float, default=0.005,
+                              help='maximal time in seconds a request waits for others to join its batch')
+    return parser
+
+
+def main(argv: list = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        params = parse_params(args.params)
+    except (argparse.ArgumentTypeError, ValueError, KeyError) as e:
+        parser.error(str(e))
+    if args.command == 'serve':
+        return _serve(args, params)
+    n_series = scan(args.inputs, args.output, args.output_format, params, args.n_jobs, args.batch_size,
+                    args.chunk_size, args.id_column, args.t_column, args.x_column, args.only_outliers)
+    if args.output != '-':
+        print("scanned {} series".format(n_series), file=sys.stderr)
+    return 0
+
+
+def _serve(args, params: Params) -> int:
+    # @Note: anko.service reuses to_record, hence the late import.
+    import asyncio
+    from .service import serve
+    executor = None if args.n_jobs == 1 else ProcessPoolExecutor(None if args.n_jobs == -1 else args.n_jobs)
+    try:
+        asyncio.run(serve(args.host, args.port, args.path, params, args.max_batch_size, args.max_wait, executor))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return 0
@@ -1,43 +1,207 @@
+import heapq
+import itertools
 import numpy as np
 import collections
-from scipy.stats import linregress, normaltest
-from scipy.optimize import curve_fit
-from sklearn.cluster import DBSCAN as skDBSCAN
-from .utils import InfoCriterion, ICScore, fitting_residual, median_absolute_deviation
+from .utils import InfoCriterion, ICScore, SeriesStats, fitting_residual, mask_small, median_and_mad, normal_test
+from .utils import _float_dtype
+from .profiling import stage, counted
+
+
+def curve_fit(*args, **kwargs):
+    """
+    :func:`scipy.optimize.curve_fit`, imported on the first call.
+    """
+    # @Note: Importing scipy takes longer than most fits, short-lived jobs that never run an optimizer skip it.
+    from scipy.optimize import curve_fit
+    return curve_fit(*args, **kwargs)
+
+
+class ModelRegistry:
+    """
+    Fitting ansatzes taking part in the model selection of :class:`~anko.anomaly_detector.AnomalyDetector`.
+    Models are iterated cheapest first according to their cost attribute, registration order breaking ties.
+    A registered model needs the attributes name, dof and cost, and ``Params`` must carry the threshold
+    ``<name>_res`` and tolerance ``<name>_err`` used for its residual.
+    """
+
+    def __init__(self):
+        self._models = collections.OrderedDict()
+
+    def register(self, model_cls):
+        """
+        Register a subclass of :class:`Model`. Can be used as class decorator.
+        """
+        self._models[model_cls.name] = model_cls
+        return model_cls
+
+    def unregister(self, name: str):
+        return self._models.pop(name)
+
+    def __getitem__(self, name: str):
+        return self._models[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._models
+
+    def __len__(self):
+        return len(self._models)
+
+    def __iter__(self):
+        return iter(sorted(self._models.values(), key=lambda model_cls: model_cls.cost))
+
+
+registry = ModelRegistry()
 
 
 class Model:
+    cost = 1
+    profiler = None
 
-    def __init__(self, t, x):
+    def __init__(self, t, x, stats=None):
         self.t = t
         self.x = x
+        self.stats = SeriesStats(x) if stats is None else stats
         self.x_pred = None
 
+    @property
+    def x_pred(self) -> np.ndarray:
+        """
+        Predictions of the last fit, held in the floating type of x, e.g. in float32 for a float32 series.
+        """
+        return self._x_pred
+
+    @x_pred.setter
+    def x_pred(self, x_pred: np.ndarray):
+        self._x_pred = None if x_pred is None else np.asarray(x_pred, dtype=_float_dtype(np.asarray(self.x).dtype))
+
+    @classmethod
+    def from_params(cls, t, x, params, stats=None):
+        """
+        Construct the model with the options taken from params.
+        """
+        return cls(t, x, stats=stats)
+
+    @classmethod
+    def rss_lower_bound(cls, t, x, stats=None):
+        """
+        Lower bound on the residual sum of squares this model can reach on x, along the last axis.
+        Used to skip models that cannot beat the information criterion of the best model found so far.
+        The default is the trivial bound 0.
+        """
+        return np.zeros(np.shape(x)[:-1])
+
+    @classmethod
+    def batch_dof(cls, popt):
+        """
+        Degrees of freedom of the fits returned by :meth:`fit_many`, for models whose number of parameters
+        depends on the fit. The default is the class attribute dof.
+        """
+        return cls.dof
+
+    @classmethod
+    def fit_many(cls, t, x, params):
+        """
+        Fit the model on series of equal length stacked along the rows of x.
+        The default implementation fits the series one by one, models with a vectorized fit override it.
+
+        Args:
+            t (numpy.ndarray): Time points, either 1D shared by all series or 2D with the same shape as x.
+            x (numpy.ndarray): 2D array, one series per row.
+            params (Params): Policies, thresholds and tolerances.
+
+        Returns:
+            tuple:
+                popt (list): Fitted parameters of each series.
+                perr (list): Errors of the fitted parameters of each series.
+                x_pred (numpy.ndarray): Predictions with the same shape as x.
+        """
+        models = [cls.from_params(t_i, x_i, params) for t_i, x_i in zip(np.broadcast_to(t, np.shape(x)), x)]
+        popt, perr = zip(*[model.fit() for model in models])
+        x_pred = np.stack([np.broadcast_to(model.x_pred, np.shape(model.x)) for model in models])
+        return list(popt), list(perr), x_pred
+
     def score(self, info_criterion=InfoCriterion.AIC):
         if info_criterion == InfoCriterion.AIC:
             return ICScore.aic(self.x, self.x_pred, self.dof)
         elif info_criterion == InfoCriterion.BIC:
             return ICScore.bic(self.x, self.x_pred, self.dof)
 
-    def residual(self, popt, mask_min, standardized):
+    def residual(self, popt, mask_min, standardized, out=None):
         return fitting_residual(self.t, self.x, self.func, popt,
                                 mask_min=mask_min,
-                                standardized=standardized)
+                                standardized=standardized,
+                                y_predict=self.x_pred,
+                                out=out)
 
 
 class Gaussian:
+    r"""
+    Normal distribution of the values, regardless of the time points.
+
+    The default engine 'moments' takes the maximum likelihood estimates, the mean and the standard deviation,
+    as :math:`x_0` and :math:`\sigma`, with the amplitude :math:`a = n / (\sqrt{2\pi}\sigma)` of n times the density,
+    and their asymptotic standard errors :math:`(a/\sqrt{2n}, \sigma/\sqrt{n}, \sigma/\sqrt{2n})`.
+    With robust, the median and 1.4826 times the median absolute deviation are taken instead,
+    with the larger standard errors of these estimators, and the residual is standardized by them.
+
+    The engine 'histogram' fits :meth:`func` on a histogram of the values with :func:`scipy.optimize.curve_fit`,
+    the amplitude being then in counts per bin.
+
+    Args:
+        x (numpy.ndarray): Values of the series.
+        engine (str, optional): 'moments' (default) or 'histogram'.
+        robust (bool, optional): Use the median and the median absolute deviation with the engine 'moments'.
+        stats (SeriesStats, optional): Statistics of x shared with other models.
+    """
     name = 'gaussian'
+    engines = ('moments', 'histogram')
+    profiler = None
+    # @Note: Scale of the MAD of a normal distribution, and asymptotic ratios of the standard errors of the median
+    #  and of the scaled MAD to the ones of the mean and of the standard deviation.
+    mad_scale = 1.4826
+    median_inefficiency = np.sqrt(np.pi / 2)
+    mad_inefficiency = 1.6496
 
-    def __init__(self, x):
+    def __init__(self, x, engine='moments', robust=False, stats=None):
+        if engine not in self.engines:
+            raise ValueError("engine must be one of {}, got {}".format(self.engines, engine))
         self.x = x
+        self.engine = engine
+        self.robust = robust
+        self.stats = SeriesStats(x) if stats is None else stats
+
+    @classmethod
+    def from_params(cls, x, params, stats=None):
+        return cls(x, engine=params.gaussian_engine, robust=params.gaussian_robust, stats=stats)
+
+    @property
+    def loc(self) -> float:
+        return self.stats.median if self.robust else self.stats.mean
+
+    @property
+    def scale(self) -> float:
+        return self.mad_scale * self.stats.mad if self.robust else self.stats.std
 
     def is_normal_distribution(self, p_normality=1e-3):
-        try:
-            normality = normaltest(self.x)
-        except ValueError:
-            normality = [np.inf, np.inf]
+        p_value = normal_test(self.x, moments=self.stats.moments)[1]
+        return p_value >= p_normality and np.isfinite(p_value)
+
+    @staticmethod
+    def batch_is_normal_distribution(x, p_normality=1e-3, moments=None):
+        """
+        Vectorized version of :meth:`is_normal_distribution` for series of equal length stacked along the rows of x.
 
-        return normality[1] >= p_normality and np.isfinite(normality[1])
+        Args:
+            x (numpy.ndarray): 2D array, one series per row.
+            p_normality (float, optional): Threshold of the p-value.
+            moments (tuple, optional): Output of :func:`~anko.utils.central_moments` for x along the rows.
+
+        Returns:
+            numpy.ndarray:
+                is_normal (numpy.ndarray): Boolean array, one entry per series.
+        """
+        p_value = normal_test(x, axis=-1, moments=moments)[1]
+        return np.isfinite(p_value) & (p_value >= p_normality)
 
     @staticmethod
     def binning(x, bins='auto'):
@@ -57,115 +221,971 @@ class Gaussian:
     def func(x, a, x0, sigma):
         return a * np.exp(-(x - x0) ** 2 / (2 * sigma ** 2))
 
-    def fit(self, bins='auto', maxfev=2000, bounds=[0, 1e+6]):
-        bin_edges, hist = self.binning(self.x, bins)
-        a_sg = max(hist) * 0.9
-        m_sg = np.mean(self.x)
-        std_sg = np.std(self.x)
-        popt, pcov = curve_fit(self.func, bin_edges, hist, p0=[a_sg, m_sg, std_sg], maxfev=maxfev, bounds=bounds)
+    def fit(self, bins='auto', maxfev=2000, bounds=[0, 1e+6], p0=None):
+        """
+        Estimate the parameters (a, x0, sigma) of :meth:`func` and their errors.
+        bins, maxfev, bounds and p0 only apply to the engine 'histogram'.
+        """
+        if self.engine == 'moments':
+            return self.fit_moments(self.stats.size, self.loc, self.scale, self.robust)
+        with stage(self.profiler, 'gaussian.binning'):
+            bin_edges, hist = self.binning(self.x, bins)
+        return self.fit_histogram(bin_edges, hist, self.stats.mean, self.stats.std, maxfev=maxfev, bounds=bounds,
+                                  p0=p0, profiler=self.profiler)
+
+    @classmethod
+    def fit_moments(cls, n, loc, scale, robust=False) -> tuple:
+        """
+        Closed-form parameters and errors of the engine 'moments' from the location and scale estimates,
+        broadcast over arrays of series.
+
+        Returns:
+            tuple:
+                popt (numpy.ndarray): (a, x0, sigma) along the last axis.
+                perr (numpy.ndarray): Standard errors of popt.
+        """
+        n, loc, scale = np.broadcast_arrays(*map(np.asarray, (n, loc, scale)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a = n / (np.sqrt(2 * np.pi) * scale)
+            loc_err = (cls.median_inefficiency if robust else 1.) * scale / np.sqrt(n)
+            scale_err = (cls.mad_inefficiency if robust else 1.) * scale / np.sqrt(2 * n)
+            a_err = a * scale_err / scale
+        return np.stack([a, loc, scale], axis=-1), np.stack([a_err, loc_err, scale_err], axis=-1)
+
+    @classmethod
+    def fit_histogram(cls, bin_centers, hist, mean, std, maxfev=2000, bounds=[0, 1e+6], p0=None, profiler=None):
+        """
+        Fit :meth:`func` on a histogram, starting from the sample mean and standard deviation unless p0 is given.
+        """
+        if p0 is None:
+            p0 = [max(hist) * 0.9, mean, std]
+        popt, pcov = curve_fit(counted(profiler, cls.name, cls.func), bin_centers, hist,
+                               p0=np.clip(p0, *bounds), maxfev=maxfev, bounds=bounds)
         perr = np.sqrt(np.diag(pcov))
         return popt, perr
 
-    def residual(self, mask_min):
-        mean_centered_series = self.x - np.mean(self.x)
-        mean_centered_series[np.where(abs(mean_centered_series) < mask_min)] = 0
-        return mean_centered_series / np.std(self.x)
+    def residual(self, mask_min, out=None):
+        if out is None:
+            out = np.empty(np.shape(self.x), dtype=_float_dtype(np.asarray(self.x).dtype))
+        centered_series = np.subtract(self.x, self.loc, out=out)
+        mask_small(centered_series, mask_min)
+        centered_series /= self.scale
+        return centered_series
 
 
+@registry.register
 class LinearRegression(Model):
     name = 'linear'
     dof = 2
+    cost = 1
 
-    def __init__(self, t, x):
-        super(LinearRegression, self).__init__(t, x)
+    def __init__(self, t, x, stats=None):
+        super(LinearRegression, self).__init__(t, x, stats)
 
     @staticmethod
     def func(t, a, b):
         return a + b*t
 
-    def fit(self):
-        slope, intercept, r_value, p_value, std_err = linregress(self.t, self.x)
-        self.x_pred = np.polyval([slope, intercept], self.t)
-        return np.array([intercept, slope]), std_err
+    def fit(self, p0=None):
+        popt, std_err, x_pred = self.batch_fit(self.t, np.asarray(self.x)[None])
+        self.x_pred = x_pred[0]
+        return popt[0], std_err[0]
+
+    @staticmethod
+    def batch_fit(t, x):
+        """
+        Vectorized least-squares line fit for series of equal length stacked along the rows of x.
+        The outcome agrees with :func:`scipy.stats.linregress` applied to each row.
+
+        Args:
+            t (numpy.ndarray): Time points, either 1D shared by all series or 2D with the same shape as x.
+            x (numpy.ndarray): 2D array, one series per row.
 
+        Returns:
+            tuple:
+                popt (numpy.ndarray): Array of shape (k, 2) holding (intercept, slope) of each series.
+                perr (numpy.ndarray): Standard error of the slope of each series.
+                x_pred (numpy.ndarray): Predictions with the same shape as x.
+        """
+        t = np.broadcast_to(t, np.shape(x))
+        n = t.shape[-1]
+        t_mean = np.mean(t, axis=-1, keepdims=True)
+        x_mean = np.mean(x, axis=-1, keepdims=True, dtype=np.float64)
+        t_centered = t - t_mean
+        x_centered = x - x_mean
+        ssxm = np.mean(t_centered ** 2, axis=-1)
+        ssym = np.mean(x_centered ** 2, axis=-1)
+        ssxym = np.mean(t_centered * x_centered, axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.where(ssxm * ssym == 0, np.where(ssxym == 0, np.nan, 0.), ssxym / np.sqrt(ssxm * ssym))
+            slope = ssxym / ssxm
+            std_err = np.sqrt((1 - np.clip(r, -1, 1) ** 2) * ssym / ssxm / (n - 2))
+        intercept = x_mean[..., 0] - slope * t_mean[..., 0]
+        x_pred = intercept[:, None] + slope[:, None] * t
+        return np.stack([intercept, slope], axis=-1), std_err, x_pred
 
+    @classmethod
+    def fit_many(cls, t, x, params):
+        return cls.batch_fit(t, x)
+
+
+@registry.register
+class ExpDecay(Model):
+    r"""
+    Exponential decay :math:`a e^{-\alpha t}`, e.g. of queue drains or cache warmups.
+
+    If x keeps one sign, the fit is the least-squares line through :math:`\log|x|` weighted by :math:`x^2`,
+    the variance of :math:`\log|x|` being about :math:`\sigma^2/x^2`, a few vectorized passes over x.
+    Otherwise the logarithm breaks down at zero and at sign changes, and :func:`scipy.optimize.curve_fit` is run,
+    warm-started from p0 or else from the log-linear fit, which takes up to maxfev evaluations of the model.
+    It is only run if x shows a decay, see :meth:`shows_decay`. Otherwise, e.g. on noise around zero, popt is nan
+    and the fit gets infinite degrees of freedom, such that the model is never selected.
+
+    Args:
+        t (numpy.ndarray): Time points.
+        x (numpy.ndarray): Values of the series.
+        stats (SeriesStats, optional): Statistics of x shared with other models.
+    """
+    name = 'exp_decay'
+    dof = 2
+    cost = 1
+
+    def __init__(self, t, x, stats=None):
+        super(ExpDecay, self).__init__(t, x, stats)
+
+    @classmethod
+    def fit_many(cls, t, x, params):
+        t = np.broadcast_to(t, np.shape(x))
+        popt, perr, x_pred = cls.log_linear(t, x)
+        popt, perr = list(popt), list(perr)
+        for i in np.flatnonzero(~cls.is_one_signed(x)):
+            model = cls.from_params(t[i], x[i], params)
+            popt[i], perr[i] = model.fit()
+            x_pred[i] = model.x_pred
+        return popt, perr, x_pred
+
+    @classmethod
+    def batch_dof(cls, popt):
+        # @Note: A nan popt marks a series without decay, see fit.
+        return np.where(np.any(np.isnan(popt), axis=-1), np.inf, cls.dof)
+
+    @staticmethod
+    def func(t: np.ndarray, a: float, alpha: float) -> np.ndarray:
+        with np.errstate(over='ignore'):
+            return a * np.exp(-alpha * t)
+
+    @staticmethod
+    def is_one_signed(x: np.ndarray) -> np.ndarray:
+        return np.all(np.greater(x, 0), axis=-1) | np.all(np.less(x, 0), axis=-1)
+
+    @staticmethod
+    def shows_decay(x: np.ndarray, x_pred: np.ndarray) -> np.ndarray:
+        """
+        Whether x shows a decay: either the log-linear fit x_pred has a smaller residual sum of squares than the
+        mean, which catches fast decays, or the mean of the first half of x is farther from zero than the one of the
+        second half by 3 standard errors, which catches slow decays buried in noise.
+        """
+        n = np.shape(x)[-1]
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            x_mean = np.mean(x, axis=-1, keepdims=True)
+            fast = np.sum((x - x_pred) ** 2, axis=-1) < np.sum((x - x_mean) ** 2, axis=-1)
+            first, second = np.mean(x[..., :n // 2], axis=-1), np.mean(x[..., n // 2:], axis=-1)
+            std_err = np.std(x, axis=-1) * np.sqrt(1 / (n // 2) + 1 / (n - n // 2))
+            slow = np.sign(first) * (first - second) > 3 * std_err
+        return fast | slow
+
+    def fit(self, maxfev: int = 2000, p0=None):
+        popt, perr, x_pred = self.log_linear(self.t, self.x)
+        if self.is_one_signed(self.x):
+            self.x_pred = x_pred
+            return popt, perr
+        if not self.shows_decay(self.x, x_pred):
+            self.dof = np.inf
+            self.x_pred = np.full_like(self.x, self.stats.mean)
+            return np.full(2, np.nan), np.full(2, np.inf)
+        if p0 is None:
+            p0 = popt if np.all(np.isfinite(popt)) else [self.stats.mean, 0.]
+        try:
+            with np.errstate(over='ignore', invalid='ignore'):
+                popt, pcov = curve_fit(counted(self.profiler, self.name, self.func), self.t, self.x,
+                                       p0=p0, maxfev=maxfev)
+            perr = np.sqrt(np.diag(pcov))
+        except RuntimeError:
+            # @Note: Keep the initial guess, the infinite errors mark the fit as unconverged if it gets selected.
+            popt, perr = np.asarray(p0, dtype=float), np.full(2, np.inf)
+        self.x_pred = self.func(self.t, *popt)
+        return popt, perr
+
+    @staticmethod
+    def log_linear(t, x):
+        r"""
+        Vectorized weighted least-squares line through :math:`\log|x|`, with weights :math:`x^2`.
+        The sign of a is the one of the largest value in magnitude, and zeros do not take part.
+        The errors are propagated from the residual sum of squares of x, such that a series of one sign gets
+        the errors of the weighted linear regression.
+
+        Args:
+            t (numpy.ndarray): Time points, either 1D or with the same shape as x.
+            x (numpy.ndarray): Series, 1D or 2D with one series per row.
+
+        Returns:
+            tuple:
+                popt (numpy.ndarray): (a, alpha) along the last axis.
+                perr (numpy.ndarray): Standard errors of (a, alpha) along the last axis.
+                x_pred (numpy.ndarray): Predictions with the same shape as x.
+        """
+        x = np.asarray(x, dtype=float)
+        t = np.broadcast_to(t, x.shape)
+        n = x.shape[-1]
+        weight = x ** 2
+        with np.errstate(divide='ignore'):
+            y = np.where(weight > 0, np.log(np.abs(x)), 0.)
+        sign = np.sign(np.take_along_axis(x, np.argmax(weight, axis=-1)[..., None], axis=-1))
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            total = np.sum(weight, axis=-1, keepdims=True)
+            t_mean = np.sum(weight * t, axis=-1, keepdims=True) / total
+            y_mean = np.sum(weight * y, axis=-1, keepdims=True) / total
+            # @Note: Centering t at its weighted mean keeps the prediction finite even if a overflows.
+            t_centered = t - t_mean
+            stt = np.sum(weight * t_centered ** 2, axis=-1, keepdims=True)
+            alpha = -np.sum(weight * t_centered * (y - y_mean), axis=-1, keepdims=True) / stt
+            x_pred = sign * np.exp(y_mean - alpha * t_centered)
+            log_a = y_mean + alpha * t_mean
+            sigma2 = np.sum((x - x_pred) ** 2, axis=-1, keepdims=True) / max(n - ExpDecay.dof, 1)
+            a = sign * np.exp(log_a)
+            popt = np.concatenate([a, alpha], axis=-1)
+            perr = np.concatenate([np.abs(a) * np.sqrt(sigma2 * (1 / total + t_mean ** 2 / stt)),
+                                   np.sqrt(sigma2 / stt)], axis=-1)
+        return popt, perr, x_pred
+
+
+@registry.register
 class Sgn(Model):
     name = 'sgn'
     dof = 3
+    cost = 3
+    engines = ('scan', 'curve_fit')
+
+    def __init__(self, t, x, engine='scan', min_size=5, min_effect=1., stats=None):
+        super(Sgn, self).__init__(t, x, stats)
+        if engine not in self.engines:
+            raise ValueError("engine must be one of {}, got {}".format(self.engines, engine))
+        self.engine = engine
+        self.min_size = min_size
+        self.min_effect = min_effect
 
-    def __init__(self, t, x):
-        super(Sgn, self).__init__(t, x)
+    @classmethod
+    def from_params(cls, t, x, params, stats=None):
+        return cls(t, x, engine=params.sgn_engine, min_size=params.sgn_min_size, min_effect=params.sgn_min_effect,
+                   stats=stats)
+
+    @classmethod
+    def fit_many(cls, t, x, params):
+        if params.sgn_engine == 'scan':
+            return cls.scan(t, x, min_size=params.sgn_min_size, min_effect=params.sgn_min_effect)
+        return super(Sgn, cls).fit_many(t, x, params)
 
     @staticmethod
     def func(t: np.ndarray, a: float, b: float, t0: float) -> np.ndarray:
         return (b-a)/2 * np.sign(t-t0) + (a+b)/2
 
-    def fit(self, maxfev: int=2000, bounds=[0, 1e+6]):
-        a_sg = self.x[0]
-        b_sg = self.x[-1]
-        t0_sg = self.t[np.argmax(np.diff(self.x))]
-        popt, pcov = curve_fit(self.func, self.t, self.x, p0=[a_sg, b_sg, t0_sg], maxfev=maxfev, bounds=bounds)
+    def fit(self, maxfev: int=2000, bounds=[0, 1e+6], p0=None):
+        if self.engine == 'scan':
+            popt, perr, self.x_pred = self.scan(self.t, self.x, stats=self.stats, min_size=self.min_size,
+                                                min_effect=self.min_effect)
+            return popt, perr
+        if p0 is None:
+            p0 = [self.x[0], self.x[-1], self.t[np.argmax(np.diff(self.x))]]
+        popt, pcov = curve_fit(counted(self.profiler, self.name, self.func), self.t, self.x,
+                               p0=np.clip(p0, *bounds), maxfev=maxfev, bounds=bounds)
         perr = np.sqrt(np.diag(pcov))
         self.x_pred = self.func(self.t, popt[0], popt[1], popt[2])
         return popt, perr
 
+    @staticmethod
+    def scan(t, x, stats=None, min_size=1, min_effect=0.):
+        r"""
+        Exact least-squares fit of the step function by scanning every possible breakpoint.
+        For the split after the k-th point (in time order), the levels a and b are the means of the two segments, and
+
+        .. math::
+            \mathcal{RSS}_k = \sum_i x_i^2 - S_k^2/k - (S_n-S_k)^2/(n-k),
+
+        with :math:`S_k` the cumulative sum, so all n-1 candidates are scored in O(n).
+        The breakpoint t0 is placed halfway between the two points adjacent to the best split,
+        and its error is half of their distance.
+
+        The best split over n - 1 candidates beats the line on pure noise, mostly by cutting off a few extreme values
+        of skewed noise. So both segments hold at least min_size points, and a step |b - a| below min_effect times
+        the pooled standard deviation of the segments falls back to the flat fit a = b = mean(x),
+        which always scores worse than the linear model.
 
+        Args:
+            t (numpy.ndarray): Time points, either 1D or with the same shape as x.
+            x (numpy.ndarray): Series, 1D or 2D with one series per row.
+            stats (SeriesStats, optional): Statistics of a 1D series, whose mean, variance and cumulative sum are reused
+                if t is already in order.
+            min_size (int, optional): Minimal number of points of each segment.
+            min_effect (float, optional): Minimal step, in units of the pooled standard deviation.
+
+        Returns:
+            tuple:
+                popt (numpy.ndarray): (a, b, t0) along the last axis.
+                perr (numpy.ndarray): Standard errors of (a, b, t0) along the last axis.
+                x_pred (numpy.ndarray): Predictions with the same shape as x.
+        """
+        x = np.asarray(x)
+        t = np.broadcast_to(t, x.shape)
+        t_sorted, x_sorted = t, x
+        if np.any(np.diff(t, axis=-1) < 0):
+            order = np.argsort(t, axis=-1, kind='stable')
+            t_sorted = np.take_along_axis(t, order, axis=-1)
+            x_sorted = np.take_along_axis(x, order, axis=-1)
+        n = x.shape[-1]
+        k = np.arange(1, n)
+
+        if stats is not None and x_sorted is x:
+            x_mean, left_sum, sum_squares = stats.mean, stats.cumsum, n * stats.moments[1]
+        else:
+            x_mean = np.mean(x_sorted, axis=-1, keepdims=True, dtype=np.float64)
+            x_centered = x_sorted - x_mean
+            left_sum = np.cumsum(x_centered, axis=-1)
+            sum_squares = np.sum(x_centered ** 2, axis=-1, keepdims=True)
+        right_sum = left_sum[..., -1:] - left_sum[..., :-1]
+        left_sum = left_sum[..., :-1]
+        gain = left_sum ** 2 / k + right_sum ** 2 / (n - k)
+        gain[np.diff(t_sorted, axis=-1) == 0] = -np.inf
+        gain[..., (k < min_size) | (n - k < min_size)] = -np.inf
+
+        best = np.argmax(gain, axis=-1)[..., None]
+        n_left = best + 1
+        best_gain = np.take_along_axis(gain, best, axis=-1)
+        rss = np.maximum(sum_squares - best_gain, 0)
+        a = x_mean + np.take_along_axis(left_sum, best, axis=-1) / n_left
+        b = x_mean + np.take_along_axis(right_sum, best, axis=-1) / (n - n_left)
+        is_step = np.isfinite(best_gain) & (np.abs(b - a) >= min_effect * np.sqrt(rss / max(n - Sgn.dof, 1)))
+        a, b = np.where(is_step, a, x_mean), np.where(is_step, b, x_mean)
+        rss = np.where(is_step, rss, sum_squares)
+        t_left = np.take_along_axis(t_sorted, best, axis=-1)
+        t_right = np.take_along_axis(t_sorted, best + 1, axis=-1)
+
+        sigma2 = rss / max(n - Sgn.dof, 1)
+        popt = np.concatenate([a, b, 0.5 * (t_left + t_right)], axis=-1)
+        perr = np.concatenate([np.sqrt(sigma2 / n_left), np.sqrt(sigma2 / (n - n_left)), 0.5 * (t_right - t_left)],
+                              axis=-1)
+        x_pred = Sgn.func(t, a, b, popt[..., 2:])
+        return popt, perr, x_pred
+
+
+@registry.register
 class MAD(Model):
     name = 'mad'
     dof = 0
+    cost = 2
 
-    def __init__(self, t, x):
-        super(MAD, self).__init__(t, x)
+    def __init__(self, t, x, stats=None):
+        super(MAD, self).__init__(t, x, stats)
 
     def func(self, t):
-        return np.median(self.x)
+        return self.stats.median
 
-    def fit(self):
+    def fit(self, p0=None):
         self.x_pred = self.func(self.t)
-        perr = median_absolute_deviation(self.x)
+        perr = self.stats.mad
         return [], perr
 
+    @staticmethod
+    def batch_fit(x):
+        """
+        Vectorized version of :meth:`fit` for series of equal length stacked along the rows of x.
+
+        Args:
+            x (numpy.ndarray): 2D array, one series per row.
+
+        Returns:
+            tuple:
+                perr (numpy.ndarray): Median absolute deviation of each series.
+                x_pred (numpy.ndarray): Predictions (the row medians) with the same shape as x.
+        """
+        median, perr = median_and_mad(x, axis=-1)
+        return perr, np.broadcast_to(median[..., None], np.shape(x))
+
+    @classmethod
+    def fit_many(cls, t, x, params):
+        perr, x_pred = cls.batch_fit(x)
+        return [[]] * len(x), perr, x_pred
+
+    @classmethod
+    def rss_lower_bound(cls, t, x, stats=None):
+        """
+        The residual sum of squares around the median is cheap to obtain, so the bound is exact.
+        """
+        if stats is not None:
+            return stats.size * (stats.moments[1] + (stats.mean - stats.median) ** 2)
+        return np.sum((x - np.median(x, axis=-1, keepdims=True)) ** 2, axis=-1, dtype=np.float64)
+
+
+@registry.register
+class ChangePoint(Model):
+    r"""
+    Piecewise-constant series with several level shifts, generalizing :class:`Sgn` to k change points.
+
+    The change points are found by binary segmentation: the split of a segment maximizing the decrease of the
+    residual sum of squares is scored in O(length) from the cumulative sum (see :meth:`Sgn.scan`), and the best
+    split over all segments, kept in a heap, is accepted one at a time, up to max_change_points.
+    The number of change points is the one minimizing the information criterion with :math:`2k+1` degrees of freedom
+    (k+1 levels and k change points), so a fit costs O(n log k) for balanced splits.
+    Since the best split is a maximum over many candidates, AIC tends to split pure noise,
+    hence the stricter BIC by default. Skewed noise still passes BIC, so as in :meth:`Sgn.scan`, a segment is only
+    split if the step is at least min_effect times the pooled standard deviation of its two parts. If the whole series
+    is not split, the fit keeps the best change point between two levels equal to the mean, which always scores worse
+    than the linear model. A series shorter than 2 * min_size has no split at all, its fit is the mean with infinite
+    degrees of freedom, such that the model is never selected.
+
+    Args:
+        t (numpy.ndarray): Time points.
+        x (numpy.ndarray): Values of the series.
+        max_change_points (int, optional): Maximal number of change points.
+        min_size (int, optional): Minimal number of points of a segment, such that isolated outliers are not
+            taken as segments.
+        info_criterion (InfoCriterion, optional): Criterion choosing the number of change points,
+            independent of the one comparing the models.
+        min_effect (float, optional): Minimal step, in units of the pooled standard deviation.
+        stats (SeriesStats, optional): Statistics of x shared with other models.
+    """
+    name = 'changepoint'
+    # @Note: Degrees of freedom with one change point, fits set their own, see batch_dof.
+    dof = 3
+    cost = 4
+
+    def __init__(self, t, x, max_change_points=10, min_size=10, info_criterion=InfoCriterion.BIC, min_effect=1.,
+                 stats=None):
+        super(ChangePoint, self).__init__(t, x, stats)
+        self.max_change_points = max_change_points
+        self.min_size = min_size
+        self.info_criterion = info_criterion
+        self.min_effect = min_effect
+
+    @classmethod
+    def from_params(cls, t, x, params, stats=None):
+        return cls(t, x, max_change_points=params.changepoint_max, min_size=params.changepoint_min_size,
+                   info_criterion=params.changepoint_info_criterion, min_effect=params.changepoint_min_effect,
+                   stats=stats)
+
+    @classmethod
+    def batch_dof(cls, popt):
+        return np.array([np.size(p) if np.size(p) > 1 else np.inf for p in popt])
+
+    @staticmethod
+    def func(t: np.ndarray, *popt) -> np.ndarray:
+        """
+        Levels popt[:k+1] separated by the change points popt[k+1:].
+        """
+        k = (len(popt) - 1) // 2
+        levels, change_points = np.asarray(popt[:k + 1]), np.asarray(popt[k + 1:])
+        return levels[np.searchsorted(change_points, t, side='right')]
+
+    def fit(self, p0=None):
+        popt, perr, self.x_pred = self.segment(self.t, self.x, self.max_change_points, self.min_size,
+                                               self.info_criterion, self.min_effect, stats=self.stats)
+        self.dof = popt.size if popt.size > 1 else np.inf
+        return popt, perr
+
+    @staticmethod
+    def segment(t, x, max_change_points=10, min_size=10, info_criterion=InfoCriterion.BIC, min_effect=1.,
+                stats=None):
+        """
+        Binary segmentation of the series, see :class:`ChangePoint`.
+
+        Args:
+            t (numpy.ndarray): Time points.
+            x (numpy.ndarray): Values of the series.
+            max_change_points (int, optional): Maximal number of change points.
+            min_size (int, optional): Minimal number of points of a segment.
+            info_criterion (InfoCriterion, optional): Criterion choosing the number of change points.
+            min_effect (float, optional): Minimal step, in units of the pooled standard deviation.
+            stats (SeriesStats, optional): Statistics of x, whose mean, variance and cumulative sum are reused
+                if t is already in order.
+
+        Returns:
+            tuple:
+                popt (numpy.ndarray): The k+1 levels followed by the k change points, each halfway between
+                    the two points around it.
+                perr (numpy.ndarray): Standard errors of the levels, and half the gaps around the change points.
+                x_pred (numpy.ndarray): Predictions with the same shape as x.
+        """
+        t, x = np.asarray(t), np.asarray(x)
+        t_sorted, x_sorted = t, x
+        if np.any(np.diff(t) < 0):
+            order = np.argsort(t, kind='stable')
+            t_sorted, x_sorted = t[order], x[order]
+        n = x.size
+        if stats is not None and x_sorted is x:
+            x_mean, cumsum, sum_squares = stats.mean, stats.cumsum, n * stats.moments[1]
+        else:
+            x_mean = np.mean(x_sorted, dtype=np.float64)
+            x_centered = x_sorted - x_mean
+            cumsum, sum_squares = np.cumsum(x_centered), np.dot(x_centered, x_centered)
+        cumsum = np.concatenate([[0.], cumsum])
+        squares = np.concatenate([[0.], np.cumsum((x_sorted - x_mean) ** 2, dtype=np.float64)])
+        splittable = np.diff(t_sorted) != 0
+        min_size = max(min_size, 1)
+
+        def best_split(start, stop):
+            # @Note: Segment [start, stop) is split into [start, k) and [k, stop).
+            k = np.arange(start + min_size, stop - min_size + 1)
+            if not k.size:
+                return None
+            total, left = cumsum[stop] - cumsum[start], cumsum[k] - cumsum[start]
+            gain = left ** 2 / (k - start) + (total - left) ** 2 / (stop - k) - total ** 2 / (stop - start)
+            gain[~splittable[k - 1]] = -np.inf
+            best = np.argmax(gain)
+            return None if not np.isfinite(gain[best]) else (-gain[best], int(k[best]), start, stop)
+
+        def is_step(split):
+            negative_gain, k, start, stop = split
+            total, left = cumsum[stop] - cumsum[start], cumsum[k] - cumsum[start]
+            rss = max(squares[stop] - squares[start] - total ** 2 / (stop - start) + negative_gain, 0.)
+            step = left / (k - start) - (total - left) / (stop - k)
+            return abs(step) >= min_effect * np.sqrt(rss / max(stop - start - Sgn.dof, 1))
+
+        root = best_split(0, n)
+        heap = [split for split in [root] if split is not None and is_step(split)]
+        rss, splits, best_count, best_score = sum_squares, [], 0, np.inf
+        while heap and len(splits) < max_change_points:
+            negative_gain, k, start, stop = heapq.heappop(heap)
+            rss = max(rss + negative_gain, 0.)
+            splits.append(k)
+            with np.errstate(divide='ignore'):
+                score = ICScore.from_rss(rss, n, 2 * len(splits) + 1, info_criterion)
+            if score < best_score:
+                best_count, best_score = len(splits), score
+            for split in (best_split(start, k), best_split(k, stop)):
+                if split is not None and is_step(split):
+                    heapq.heappush(heap, split)
+
+        flat = not best_count and root is not None
+        bounds = np.array([0, root[1], n] if flat else [0] + sorted(splits[:best_count]) + [n])
+        sizes = np.diff(bounds)
+        levels = x_mean + np.diff(cumsum[bounds]) / sizes
+        if flat:
+            levels[:] = x_mean
+        change_points = 0.5 * (t_sorted[bounds[1:-1] - 1] + t_sorted[bounds[1:-1]])
+        x_pred = ChangePoint.func(t, *levels, *change_points)
+        dof = levels.size + change_points.size
+        sigma2 = np.sum((x - x_pred) ** 2) / max(n - dof, 1)
+        popt = np.concatenate([levels, change_points])
+        perr = np.concatenate([np.sqrt(sigma2 / sizes), 0.5 * (t_sorted[bounds[1:-1]] - t_sorted[bounds[1:-1] - 1])])
+        return popt, perr, x_pred
+
+
+@registry.register
+class Seasonal(Model):
+    r"""
+    Linear trend plus a periodic profile, for metrics with e.g. daily or weekly cycles.
+
+    The samples are taken as evenly spaced in time order. After removing the least-squares line,
+    the candidate periods are the ones of the n_candidates highest peaks of the periodogram
+    :math:`|\mathrm{rfft}(x)|^2`, among the frequencies with at least min_cycles cycles and a period of
+    at least 2 samples (and at most max_period), rounded down and up to integer numbers of samples, such that the
+    series holds at least min_cycles full cycles.
+    Noise has periodogram peaks too, so a series is only taken as seasonal if its highest peak passes Fisher's g test
+    at the level significance, otherwise the fit is the least-squares line with a flat profile of period 1.
+    For each candidate p, the profile is the mean of the detrended values at each of the p phases, centered such that
+    the trend keeps the mean, and the line is refitted once without the profile. The candidate with the lowest
+    information criterion is kept, such that e.g. a weekly period covering a daily one is preferred to the stronger
+    daily peak.
+    A fit costs O(n log n), and :meth:`fit_many` transforms all the series of a batch in one FFT.
+
+    The parameters are (intercept, slope, p) followed by the p values of the profile, so the degrees of freedom are
+    p + 2 (the profile has one constraint), and a flat fit scores worse than the linear model. The error of p is half
+    the gap between the periods of the neighbouring frequencies of the periodogram.
+
+    Args:
+        t (numpy.ndarray): Time points.
+        x (numpy.ndarray): Values of the series.
+        min_cycles (int, optional): Minimal number of cycles of the period within the series.
+        max_period (int, optional): Maximal period in number of samples, default to half of the series.
+        n_candidates (int, optional): Number of periodogram peaks tried.
+        info_criterion (InfoCriterion, optional): Criterion choosing among the candidate periods.
+        significance (float, optional): Level of Fisher's g test on the highest periodogram peak.
+        stats (SeriesStats, optional): Statistics of x shared with other models.
+    """
+    name = 'seasonal'
+    # @Note: Degrees of freedom of the flat fit, fits set their own, see batch_dof.
+    dof = 3
+    cost = 3
+
+    def __init__(self, t, x, min_cycles=2, max_period=None, n_candidates=3, info_criterion=InfoCriterion.AIC,
+                 significance=1e-2, stats=None):
+        super(Seasonal, self).__init__(t, x, stats)
+        self.min_cycles = min_cycles
+        self.max_period = max_period
+        self.n_candidates = n_candidates
+        self.info_criterion = info_criterion
+        self.significance = significance
+
+    @classmethod
+    def from_params(cls, t, x, params, stats=None):
+        return cls(t, x, min_cycles=params.seasonal_min_cycles, max_period=params.seasonal_max_period,
+                   n_candidates=params.seasonal_candidates, info_criterion=params.info_criterion,
+                   significance=params.seasonal_significance, stats=stats)
+
+    @classmethod
+    def batch_dof(cls, popt):
+        return np.array([np.size(p) - 1 for p in popt])
+
+    @classmethod
+    def fit_many(cls, t, x, params):
+        return cls.decompose(t, x, params.seasonal_min_cycles, params.seasonal_max_period, params.seasonal_candidates,
+                             params.info_criterion, params.seasonal_significance)
+
+    @staticmethod
+    def func(t: np.ndarray, intercept: float, slope: float, period: float, *profile) -> np.ndarray:
+        """
+        Trend plus the profile at the phase of each point, counting the points in time order.
+        """
+        position = np.argsort(np.argsort(t, kind='stable'), kind='stable')
+        return intercept + slope * t + np.asarray(profile)[position % int(period)]
+
+    def fit(self, p0=None):
+        popt, perr, x_pred = self.decompose(self.t, self.x, self.min_cycles, self.max_period, self.n_candidates,
+                                            self.info_criterion, self.significance)
+        self.x_pred = x_pred[0]
+        self.dof = popt[0].size - 1
+        return popt[0], perr[0]
+
+    @staticmethod
+    def decompose(t, x, min_cycles=2, max_period=None, n_candidates=3, info_criterion=InfoCriterion.AIC,
+                  significance=1e-2):
+        """
+        Fit the seasonal model on one series, or on series of equal length stacked along the rows of x.
+
+        Args:
+            t (numpy.ndarray): Time points, either 1D shared by all series or with the same shape as x.
+            x (numpy.ndarray): Series, 1D or 2D with one series per row.
+            min_cycles (int, optional): Minimal number of cycles of the period within the series.
+            max_period (int, optional): Maximal period in number of samples.
+            n_candidates (int, optional): Number of periodogram peaks tried.
+            info_criterion (InfoCriterion, optional): Criterion choosing among the candidate periods.
+            significance (float, optional): Level of Fisher's g test on the highest periodogram peak.
+
+        Returns:
+            tuple:
+                popt (list): Parameters of each series, see :class:`Seasonal`.
+                perr (list): Standard errors of the trend and of the profile, and the error of the period.
+                x_pred (numpy.ndarray): Predictions with the same shape as x, 2D.
+        """
+        x = np.atleast_2d(x)
+        t = np.broadcast_to(t, x.shape)
+        t_sorted, x_sorted, order = t, x, None
+        if np.any(np.diff(t, axis=-1) < 0):
+            order = np.argsort(t, axis=-1, kind='stable')
+            t_sorted = np.take_along_axis(t, order, axis=-1)
+            x_sorted = np.take_along_axis(x, order, axis=-1)
+        m, n = x.shape
+
+        t_mean = np.mean(t_sorted, axis=-1, keepdims=True)
+        x_mean = np.mean(x_sorted, axis=-1, keepdims=True, dtype=np.float64)
+        t_centered = t_sorted - t_mean
+        x_centered = x_sorted - x_mean
+        stt = np.sum(t_centered ** 2, axis=-1, keepdims=True)
+
+        def trend(y):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(stt > 0, np.sum(t_centered * y, axis=-1, keepdims=True) / stt, 0.)
+
+        slope_0 = trend(x_centered)
+
+        def fit_period(period):
+            # @Note: One bincount over (series, phase) pairs averages the profiles of all series at once.
+            width = period.max()
+            phase = np.arange(n) % period[:, None]
+            bins = (np.arange(m)[:, None] * width + phase).ravel()
+            counts = np.bincount(bins, minlength=m * width).reshape(m, width)
+
+            def seasonality(y):
+                profile = np.bincount(bins, weights=y.ravel(), minlength=m * width).reshape(m, width)
+                profile /= np.maximum(counts, 1)
+                offset = np.sum(profile, axis=-1, keepdims=True) / period[:, None]
+                return profile - offset, offset
+
+            # @Note: The line is refitted once without the profile, since the cycles bias the first slope.
+            profile, _ = seasonality(x_centered - slope_0 * t_centered)
+            slope = trend(x_centered - np.take_along_axis(profile, phase, axis=-1))
+            profile, offset = seasonality(x_centered - slope * t_centered)
+            x_pred = x_mean + offset + slope * t_centered + np.take_along_axis(profile, phase, axis=-1)
+            return slope, profile, offset, counts, x_pred
+
+        power = np.abs(np.fft.rfft(x_centered - slope_0 * t_centered, axis=-1)) ** 2
+        k_max = n // 2
+        k_min = min(max(min_cycles, 1, -(-n // max_period) if max_period else 1), k_max)
+        period_max = max(min(n // max(min_cycles, 1), max_period or n), 1)
+
+        # @Note: Fisher's g test, with the first term of the exact series as p-value, an upper bound of it.
+        spectrum = power[:, 1:(n + 1) // 2]
+        n_freq = spectrum.shape[-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            g = np.max(spectrum[:, k_min - 1:], axis=-1, initial=0.) / np.sum(spectrum, axis=-1)
+            seasonal = n_freq * (1 - g) ** (n_freq - 1) <= significance
+        # @Note: Only local maxima are ranked, such that the leakage around a strong peak does not take all the slots.
+        padded = np.pad(power, ((0, 0), (1, 1)), constant_values=-np.inf)
+        is_peak = (power >= padded[:, :-2]) & (power >= padded[:, 2:])
+        power = np.where(is_peak, power, -np.inf)[:, k_min:k_max + 1]
+        n_candidates = max(min(n_candidates, power.shape[-1]), 1)
+        candidates = k_min + np.argsort(-power, axis=-1, kind='stable')[:, :n_candidates]
+
+        fits = []
+        # @Note: The series without a significant peak keep the line, no candidate can replace it.
+        best_score, choice = np.where(seasonal, np.inf, -np.inf), np.zeros(m, dtype=int)
+        x_pred = np.asarray(x_mean + slope_0 * t_centered, dtype=_float_dtype(x.dtype))
+        # @Note: n / cycles is rarely a whole number of samples, both roundings are tried.
+        for k, (cycles, rounding) in enumerate(itertools.product(candidates.T, (np.floor, np.ceil))):
+            period = np.clip(rounding(n / cycles).astype(int), 1, period_max)
+            slope, profile, offset, counts, fitted = fit_period(period)
+            dof = period + 2
+            rss = np.sum((x_sorted - fitted) ** 2, axis=-1)
+            with np.errstate(divide='ignore'):
+                score = ICScore.from_rss(rss, n, dof, info_criterion)
+            sigma2 = rss / np.maximum(n - dof, 1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                popt = np.stack([(x_mean + offset - slope * t_mean)[:, 0], slope[:, 0], period], axis=-1)
+                perr = np.stack([np.sqrt(sigma2 * (1 / n + t_mean[:, 0] ** 2 / stt[:, 0])),
+                                 np.sqrt(sigma2 / stt[:, 0]),
+                                 0.5 * (n / np.maximum(cycles - 1, 1) - n / (cycles + 1))], axis=-1)
+                profile_err = np.sqrt(sigma2[:, None] / counts)
+            # @Note: Only the predictions of the best candidate so far are kept, the parameters of all are small.
+            better = score < best_score
+            best_score[better], choice[better], x_pred[better] = score[better], k, fitted[better]
+            fits.append((popt, perr, profile, profile_err))
+
+        rss = np.sum((x_sorted - x_mean - slope_0 * t_centered) ** 2, axis=-1)
+        sigma2 = rss / max(n - 2, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            line_popt = np.stack([(x_mean - slope_0 * t_mean)[:, 0], slope_0[:, 0]], axis=-1)
+            line_perr = np.stack([np.sqrt(sigma2 * (1 / n + t_mean[:, 0] ** 2 / stt[:, 0])),
+                                  np.sqrt(sigma2 / stt[:, 0])], axis=-1)
+
+        popt, perr = [], []
+        for i, c in enumerate(choice):
+            if not seasonal[i]:
+                popt.append(np.concatenate([line_popt[i], [1., 0.]]))
+                perr.append(np.concatenate([line_perr[i], [0., 0.]]))
+                continue
+            trend_popt, trend_perr, profile, profile_err = fits[c]
+            period = int(trend_popt[i, 2])
+            popt.append(np.concatenate([trend_popt[i], profile[i, :period]]))
+            perr.append(np.concatenate([trend_perr[i], profile_err[i, :period]]))
+        if order is not None:
+            x_pred_sorted, x_pred = x_pred, np.empty_like(x_pred)
+            np.put_along_axis(x_pred, order, x_pred_sorted, axis=-1)
+        return popt, perr, x_pred
+
 
 class DBSCAN:
+    r"""
+    Density-based clustering of the data points, where the points in no dense region (noise) are the outliers.
+
+    Two points are neighbours if :math:`|x_i-x_j| \le x_{eps}` and, if t_eps is given, :math:`|t_i-t_j| \le t_{eps}`.
+    A point with at least min_samples neighbours (itself included) is a core point, clusters are the connected
+    components of core points, and the non-core points next to a core point are border points.
+
+    The default engine 'sweep' exploits the low dimension instead of a generic tree query:
+
+    * Without t_eps, the values are sorted once, neighbour counts are differences of two binary searches,
+      and two consecutive core points belong to the same cluster iff their gap is at most x_eps,
+      which costs O(n log n).
+    * With t_eps, the points are sorted by t, and pairs (i, i+d) are compared for d = 1, 2, ...
+      as long as some pair is within t_eps. The core points are merged with
+      :func:`scipy.sparse.csgraph.connected_components` every time about n edges have been collected.
+      The time is O(n w), where w is the number of points within t_eps, and the memory is O(n).
+
+    The engine 'sklearn' delegates to :class:`sklearn.cluster.DBSCAN` with the Chebyshev metric on the rescaled
+    coordinates, and gives the same core and noise points.
+
+    Args:
+        t (numpy.ndarray): Time points, only used if t_eps is given.
+        x (numpy.ndarray): Values of the series.
+        engine (str, optional): 'sweep' (default) or 'sklearn'.
+        stats (SeriesStats, optional): Statistics of x shared with other models.
+    """
     name = "dbscan"
+    engines = ('sweep', 'sklearn')
+    profiler = None
 
-    def __init__(self, x):
-        # @TODO: To be implemented...
-        self.x = x
-        self.X = np.concatenate(
-            (
-                np.arange(1, self.n + 1).reshape(self.n, 1),
-                x.reshape(self.n, 1)
-            ),
-            axis=1
-        )
+    def __init__(self, t, x, engine='sweep', stats=None):
+        if engine not in self.engines:
+            raise ValueError("engine must be one of {}, got {}".format(self.engines, engine))
+        self.t = t
+        self.x = np.asarray(x)
+        self.engine = engine
+        self.stats = SeriesStats(self.x) if stats is None else stats
+        self.x_eps = None
+        self.core_sample_mask = None
+
+    @classmethod
+    def from_params(cls, t, x, params, stats=None):
+        return cls(t, x, engine=params.dbscan_engine, stats=stats)
 
     @property
     def n(self):
         return self.x.size
 
-    def fit(self, eps=0.9, min_samples=3):
-        eps *= np.diff(np.histogram_bin_edges(self.x, bins='auto'))[0]
-        # eps *= median_absolute_deviation(self.x)
-        print(np.diff(np.histogram_bin_edges(self.x, bins='auto'))[0])
-        print(median_absolute_deviation(self.x))
-
-        db = skDBSCAN(
-            eps,
-            min_samples,
-            metric='euclidean',
-            metric_params=None,
-            algorithm='auto',
-            leaf_size=30,
-            p=None,
-            n_jobs=None
-        ).fit(self.X)
-
-        labels = db.labels_
+    def scale_eps(self, eps: float) -> float:
+        """
+        Neighbourhood radius in x, given in units of the width of the histogram bins chosen by numpy ('auto').
+        """
+        return eps * np.diff(np.histogram_bin_edges(self.x, bins='auto')[:2])[0]
+
+    def fit(self, eps: float = 0.9, min_samples: int = 3, t_eps: float = None) -> dict:
+        """
+        Cluster the data points.
+
+        Args:
+            eps (float, optional): Radius of the neighbourhood in x, see :meth:`scale_eps`.
+                The radius in the units of x is kept in the attribute x_eps.
+            min_samples (int, optional): Number of neighbours, the point itself included, making a core point.
+            t_eps (float, optional): Radius of the neighbourhood in t. If None, only the values are clustered.
+
+        Returns:
+            dict:
+                n_clusters (int): Number of clusters.
+                n_noise (int): Number of noise points.
+                labels (numpy.ndarray): Cluster index of every point, -1 for noise.
+        """
+        self.x_eps = x_eps = self.scale_eps(eps)
+        if self.engine == 'sklearn':
+            labels, self.core_sample_mask = self._sklearn(self.t, self.x, x_eps, min_samples, t_eps)
+        elif t_eps is None:
+            labels, self.core_sample_mask = self.sweep_1d(self.x, x_eps, min_samples)
+        else:
+            labels, self.core_sample_mask = self.sweep_2d(self.t, self.x, x_eps, t_eps, min_samples,
+                                                          profiler=self.profiler)
         # @Note: Number of clusters in labels, ignoring noise if present.
-        n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-        n_noise = list(labels).count(-1)
+        n_clusters = int(labels.max()) + 1 if labels.size else 0
+        n_noise = int(np.count_nonzero(labels == -1))
         out = {"n_clusters": n_clusters,
                "n_noise": n_noise,
                "labels": labels}
         return out
+
+    @staticmethod
+    def sweep_1d(x, x_eps: float, min_samples: int) -> tuple:
+        """
+        Exact DBSCAN of the values x, see :class:`DBSCAN`.
+
+        Returns:
+            tuple:
+                labels (numpy.ndarray): Cluster index of every point, -1 for noise.
+                core (numpy.ndarray): Boolean mask of the core points.
+        """
+        n = np.size(x)
+        order = np.argsort(x, kind='stable')
+        xs = np.asarray(x)[order]
+        count = np.searchsorted(xs, xs + x_eps, side='right') - np.searchsorted(xs, xs - x_eps, side='left')
+        core = count >= min_samples
+        core_idx = np.flatnonzero(core)
+        labels = np.full(n, -1)
+        if core_idx.size:
+            labels[core_idx] = np.concatenate([[0], np.cumsum(np.diff(xs[core_idx]) > x_eps)])
+            # @Note: A border point joins the cluster of the closest core point, found next to it in sorted order.
+            after = np.minimum(np.searchsorted(core_idx, np.arange(n)), core_idx.size - 1)
+            before = np.maximum(after - 1, 0)
+            gap_after = abs(xs[core_idx[after]] - xs)
+            gap_before = abs(xs - xs[core_idx[before]])
+            nearest = np.where(gap_before <= gap_after, core_idx[before], core_idx[after])
+            border = ~core & (np.minimum(gap_before, gap_after) <= x_eps)
+            labels[border] = labels[nearest[border]]
+        out_labels, out_core = np.empty(n, dtype=int), np.empty(n, dtype=bool)
+        out_labels[order], out_core[order] = labels, core
+        return out_labels, out_core
+
+    @staticmethod
+    def sweep_2d(t, x, x_eps: float, t_eps: float, min_samples: int, profiler=None) -> tuple:
+        """
+        Exact DBSCAN of the points (t, x) with the box neighbourhood of :class:`DBSCAN`.
+
+        Returns:
+            tuple:
+                labels (numpy.ndarray): Cluster index of every point, -1 for noise.
+                core (numpy.ndarray): Boolean mask of the core points.
+        """
+        t, x = np.broadcast_to(t, np.shape(x)), np.asarray(x)
+        n = x.size
+        order = np.argsort(t, kind='stable')
+        ts, xs = t[order], x[order]
+
+        def neighbours(d, close_t=None):
+            if close_t is None:
+                close_t = ts[d:] - ts[:-d] <= t_eps
+            return close_t & (abs(xs[d:] - xs[:-d]) <= x_eps)
+
+        # @Note: t is sorted, so once no pair at offset d is within t_eps, no pair at a larger offset is either.
+        max_offset = 0
+        count = np.ones(n, dtype=int)
+        with stage(profiler, 'dbscan.count'):
+            for d in range(1, n):
+                close_t = ts[d:] - ts[:-d] <= t_eps
+                if not close_t.any():
+                    break
+                max_offset = d
+                mask = neighbours(d, close_t)
+                count[:-d] += mask
+                count[d:] += mask
+        core = count >= min_samples
+
+        component = np.arange(n)
+        edges, n_edges = [], 0
+        nearest_core = np.full(n, -1)
+
+        def merge():
+            from scipy.sparse import coo_matrix
+            from scipy.sparse.csgraph import connected_components
+            i, j = np.concatenate([np.arange(n)] + [e[0] for e in edges]), \
+                np.concatenate([component] + [e[1] for e in edges])
+            graph = coo_matrix((np.ones(i.size, dtype=bool), (i, j)), shape=(n, n))
+            labels = connected_components(graph, directed=False)[1]
+            # @Note: Represent each component by its first point, such that it can be linked again in the next merge.
+            first = np.unique(labels, return_index=True)[1]
+            return first[labels]
+
+        with stage(profiler, 'dbscan.connect'):
+            for d in range(1, max_offset + 1):
+                i = np.flatnonzero(neighbours(d))
+                j = i + d
+                both = core[i] & core[j]
+                edges.append((i[both], j[both]))
+                n_edges += np.count_nonzero(both)
+                nearest_core[j[core[i] & ~core[j]]] = i[core[i] & ~core[j]]
+                nearest_core[i[core[j] & ~core[i]]] = j[core[j] & ~core[i]]
+                if n_edges >= n:
+                    component, edges, n_edges = merge(), [], 0
+            if edges:
+                component = merge()
+
+        labels = np.full(n, -1)
+        labels[core] = np.unique(component[core], return_inverse=True)[1]
+        border = ~core & (nearest_core >= 0)
+        labels[border] = labels[nearest_core[border]]
+        out_labels, out_core = np.empty(n, dtype=int), np.empty(n, dtype=bool)
+        out_labels[order], out_core[order] = labels, core
+        return out_labels, out_core
+
+    @staticmethod
+    def _sklearn(t, x, x_eps: float, min_samples: int, t_eps: float = None) -> tuple:
+        try:
+            from sklearn.cluster import DBSCAN as skDBSCAN
+        except ImportError:
+            raise ImportError("the engine 'sklearn' requires scikit-learn, install anko[sklearn]")
+        # @Note: Rescale each coordinate by its radius, such that the box neighbourhood is the unit Chebyshev ball.
+        if x_eps > 0:
+            columns = [np.asarray(x, dtype=float) / x_eps]
+        else:
+            columns = [2. * np.unique(x, return_inverse=True)[1].ravel()]
+        if t_eps is not None:
+            columns.append(np.broadcast_to(t, np.shape(x)) / t_eps)
+        db = skDBSCAN(eps=1., min_samples=min_samples, metric='chebyshev').fit(np.stack(columns, axis=-1))
+        core = np.zeros(np.size(x), dtype=bool)
+        core[db.core_sample_indices_] = True
+        return db.labels_, core
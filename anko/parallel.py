@@ -0,0 +1,171 @@
+import os
+import contextlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from .anomaly_detector import Params
+from .batch import BatchAnomalyDetector
+
+
+class SharedSeries:
+    """
+    Pack a list of 1D series into one flat block of shared memory, so that worker processes
+    can attach to it by name instead of receiving every series pickled.
+
+    Args:
+        series (list): List of 1D arrays, possibly of different lengths.
+        dtype (numpy.dtype, optional): Type of the block, default to the common type of the series.
+    """
+
+    def __init__(self, series, dtype=None):
+        series = [np.asarray(x) for x in series]
+        self.dtype = np.result_type(*series) if dtype is None else np.dtype(dtype)
+        self.offsets = np.concatenate([[0], np.cumsum([x.size for x in series])])
+        self._shm = shared_memory.SharedMemory(create=True, size=max(int(self.offsets[-1]) * self.dtype.itemsize, 1))
+        buf = np.ndarray((self.offsets[-1],), dtype=self.dtype, buffer=self._shm.buf)
+        for x, start in zip(series, self.offsets[:-1]):
+            buf[start:start + x.size] = x
+        del buf
+
+    @property
+    def handle(self) -> tuple:
+        """
+        Picklable description of the block, see :meth:`attach`.
+        """
+        return self._shm.name, self.dtype.str, self.offsets
+
+    @staticmethod
+    def attach(handle, start, stop):
+        """
+        Attach to the block described by handle and return views on the series start, ..., stop-1.
+
+        Returns:
+            tuple:
+                shm (multiprocessing.shared_memory.SharedMemory): The attached block, to be closed by the caller
+                once the views are released.
+                series (list): Views on the requested series.
+        """
+        name, dtype, offsets = handle
+        shm = shared_memory.SharedMemory(name=name)
+        buf = np.ndarray((offsets[-1],), dtype=dtype, buffer=shm.buf)
+        return shm, [buf[offsets[i]:offsets[i + 1]] for i in range(start, stop)]
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _fit_shared_chunk(x_handle, t_handle, start, stop, params):
+    x_shm, series = SharedSeries.attach(x_handle, start, stop)
+    t_shm, t = SharedSeries.attach(t_handle, start, stop) if t_handle is not None else (None, None)
+    try:
+        return BatchAnomalyDetector(series, t, params).fit()
+    finally:
+        del series, t
+        x_shm.close()
+        if t_shm is not None:
+            t_shm.close()
+
+
+def _fit_chunk(series, t, params):
+    return BatchAnomalyDetector(series, t, params).fit()
+
+
+class ParallelAnomalyDetector:
+    """
+    Spread the fitting of many series over a pool of workers.
+    Series are cut into chunks of consecutive series, every chunk is fitted by
+    :class:`~anko.batch.BatchAnomalyDetector`, and the results are returned in the input order
+    regardless of which worker finishes first.
+
+    With the process backend, the input arrays are copied once into shared memory and
+    workers only receive the name of the block together with the range of series to fit.
+
+    Args:
+        series (numpy.ndarray or list): 2D array with one series per row, or a (ragged) list of 1D series.
+        t (numpy.ndarray or list, optional): Time points, either one 1D array shared by all series or one per series.
+            Only used if ``params.scaleless_t`` is False.
+        params (Params, optional): Policies, thresholds and tolerances shared by all series.
+        n_jobs (int, optional): Number of workers. None or -1 means one per CPU, and 1 fits in the calling process.
+        chunk_size (int, optional): Number of series handed to a worker at once.
+        backend (str, optional): Either 'process' or 'thread'.
+        executor (concurrent.futures.Executor, optional): Pool of the kind of backend, reused instead of starting
+            a new one for this fit, e.g. across the batches of a scan. It is not shut down by the detector.
+    """
+
+    backends = ('process', 'thread')
+
+    def __init__(self, series, t=None, params=Params, n_jobs: int = None, chunk_size: int = 256,
+                 backend: str = 'process', executor=None):
+        if backend not in self.backends:
+            raise ValueError("backend must be one of {}, got {}".format(self.backends, backend))
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive, got {}".format(chunk_size))
+        self.x = list(series)
+        self.params = params
+        if params.scaleless_t:
+            self.t = None
+        elif t is None:
+            raise ValueError("t must be given if Params.scaleless_t is False")
+        elif np.ndim(t[0]) == 0:
+            self.t = [np.asarray(t)] * len(self.x)
+        else:
+            self.t = list(t)
+        self.n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+        self.chunk_size = chunk_size
+        self.backend = backend
+        self.executor = executor
+
+    @property
+    def chunks(self) -> list:
+        return [(start, min(start + self.chunk_size, len(self.x))) for start in range(0, len(self.x), self.chunk_size)]
+
+    def fit(self) -> list:
+        """
+        Fit all series.
+
+        Returns:
+            list:
+                results (list[FittingResult]): One result per series, in the same order as the input.
+        """
+        if self.n_jobs == 1 or len(self.chunks) <= 1:
+            return BatchAnomalyDetector(self.x, self.t, self.params).fit()
+        if self.backend == 'thread':
+            return self._fit_threads()
+        return self._fit_processes()
+
+    def _pool(self, executor_cls):
+        if self.executor is not None:
+            return contextlib.nullcontext(self.executor)
+        return executor_cls(max_workers=self.n_jobs)
+
+    def _fit_threads(self) -> list:
+        with self._pool(ThreadPoolExecutor) as executor:
+            futures = [
+                executor.submit(_fit_chunk, self.x[start:stop],
+                                None if self.t is None else self.t[start:stop], self.params)
+                for start, stop in self.chunks
+            ]
+            return [result for future in futures for result in future.result()]
+
+    def _fit_processes(self) -> list:
+        with SharedSeries(self.x, self.params.dtype) as x_shared:
+            t_shared = SharedSeries(self.t) if self.t is not None else None
+            try:
+                with self._pool(ProcessPoolExecutor) as executor:
+                    futures = [
+                        executor.submit(_fit_shared_chunk, x_shared.handle,
+                                        None if t_shared is None else t_shared.handle,
+                                        start, stop, self.params)
+                        for start, stop in self.chunks
+                    ]
+                    return [result for future in futures for result in future.result()]
+            finally:
+                if t_shared is not None:
+                    t_shared.close()
@@ -0,0 +1,102 @@
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class FitProfile:
+    """
+    Timing record of one fit, attached to :attr:`FittingResult.profile <anko.anomaly_detector.FittingResult>`.
+
+    Stage names are dotted, e.g. ``gaussian.fit`` and its sub-stage ``gaussian.binning``,
+    so the durations of nested stages are also contained in their parent stage.
+    Statistics of :class:`~anko.utils.SeriesStats` are computed lazily,
+    and are accounted to the first stage requesting them.
+
+    Args:
+        stages (dict): Accumulated wall time in seconds of each stage, in order of first occurrence.
+        nfev (dict): Number of function evaluations of :func:`scipy.optimize.curve_fit` per model.
+        converged (dict): Per fitted model, whether the norm of its errors is within the tolerance ``<name>_err``.
+            False if the optimizer gave up.
+        total (float): Wall time in seconds of the whole fit.
+    """
+    stages: dict = field(default_factory=dict)
+    nfev: dict = field(default_factory=dict)
+    converged: dict = field(default_factory=dict)
+    total: float = 0.
+
+
+class _NullStage:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_stage = _NullStage()
+
+
+class _Stage:
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """
+    Collect a :class:`FitProfile` and forward every stage duration to the hooks.
+
+    Args:
+        hooks (iterable, optional): Callables ``hook(stage, seconds)`` invoked when a stage ends,
+            e.g. to feed a metrics client.
+    """
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.profile = FitProfile()
+
+    def stage(self, name: str):
+        return _Stage(self, name)
+
+    def record(self, name: str, seconds: float):
+        self.profile.stages[name] = self.profile.stages.get(name, 0.) + seconds
+        for hook in self.hooks:
+            hook(name, seconds)
+
+    def counted(self, name: str, func):
+        """
+        Wrap func such that its calls are counted in ``profile.nfev[name]``.
+        """
+        nfev = self.profile.nfev
+        nfev.setdefault(name, 0)
+
+        def wrapper(*args):
+            nfev[name] += 1
+            return func(*args)
+        return wrapper
+
+
+def stage(profiler, name: str):
+    """
+    Context manager timing the stage name on profiler, or doing nothing if profiler is None.
+    """
+    return _null_stage if profiler is None else profiler.stage(name)
+
+
+def counted(profiler, name: str, func):
+    """
+    Count the evaluations of func on profiler, see :meth:`Profiler.counted`. Return func itself if profiler is None.
+    """
+    return func if profiler is None else profiler.counted(name, func)
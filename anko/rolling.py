@@ -0,0 +1,122 @@
+import numpy as np
+from .utils import ICScore, dagostino_pearson
+from .models import Gaussian, LinearRegression, MAD
+from .anomaly_detector import Params
+from .streaming import SortedWindow
+
+
+class RollingAnomalyDetector:
+    """
+    Detect anomalies in long series by selecting a model per sliding window, so that regime changes are followed.
+
+    The statistics of all windows are obtained at once from prefix sums of t, x and their products,
+    which gives the linear regression, its residual sum of squares and the moments for the normal test
+    of every window in O(1). Medians for the MAD model are maintained by a :class:`~anko.streaming.SortedWindow`
+    that only absorbs the points entering and leaving between consecutive windows.
+    As in :class:`~anko.streaming.OnlineAnomalyDetector`, the candidates are the Gaussian, linear and MAD models.
+
+    Every point is judged by the window whose center is closest to it, so flags are computed in a single O(n) pass.
+
+    Args:
+        t (numpy.ndarray): Time points, ignored if ``params.scaleless_t`` is True.
+        x (numpy.ndarray): Values of the series.
+        window (int): Number of points per window.
+        stride (int, optional): Number of points between the starts of consecutive windows. Default to window // 2.
+        params (Params, optional): Policies, thresholds and tolerances.
+    """
+
+    def __init__(self, t, x, window: int, stride: int = None, params=Params):
+        self.params = params
+        self.x = np.asarray(x)
+        if window < params.min_sample_size:
+            raise ValueError("window {} is less than Params.min_sample_size {}".format(window, params.min_sample_size))
+        if self.x.size < window:
+            raise ValueError("number of data points {} is less than window {}".format(self.x.size, window))
+        self.window = window
+        self.stride = max(window // 2, 1) if stride is None else stride
+        if self.stride < 1:
+            raise ValueError("stride must be positive, got {}".format(self.stride))
+        self.t = np.arange(self.x.size) if params.scaleless_t else np.asarray(t)
+        starts = np.arange(0, self.x.size - window + 1, self.stride)
+        if starts[-1] + window < self.x.size:
+            starts = np.append(starts, self.x.size - window)
+        self.starts = starts
+        self.best_models = None
+
+    def _window_sums(self, *arrays) -> list:
+        sums = []
+        for a in arrays:
+            prefix = np.concatenate([[0.], np.cumsum(a, dtype=float)])
+            sums.append(prefix[self.starts + self.window] - prefix[self.starts])
+        return sums
+
+    def _window_medians(self) -> np.ndarray:
+        medians = np.empty(len(self.starts))
+        if self.stride >= self.window:
+            for k, start in enumerate(self.starts):
+                medians[k] = np.median(self.x[start:start + self.window])
+            return medians
+        sorted_window = SortedWindow(self.x[self.starts[0]:self.starts[0] + self.window].tolist())
+        medians[0] = sorted_window.median
+        for k in range(1, len(self.starts)):
+            prev, start = self.starts[k - 1], self.starts[k]
+            for value in self.x[prev:start].tolist():
+                sorted_window.remove(value)
+            for value in self.x[prev + self.window:start + self.window].tolist():
+                sorted_window.add(value)
+            medians[k] = sorted_window.median
+        return medians
+
+    def fit(self) -> np.ndarray:
+        """
+        Select a model for every window and flag the outliers.
+
+        Returns:
+            numpy.ndarray:
+                is_outlier (numpy.ndarray): Boolean array with the same size as x. The model selected for each window
+                is kept in :attr:`best_models`, and the first index of each window in :attr:`starts`.
+        """
+        params, n = self.params, self.window
+        # @Note: Standardize before accumulating, such that differences of prefix sums keep their precision.
+        t_shift, x_shift = self.t[0], np.mean(self.x)
+        x_scale = np.std(self.x) or 1.
+        t = self.t - t_shift
+        y = (self.x - x_shift) / x_scale
+        st, stt, stx, sx, sxx, sx3, sx4 = self._window_sums(t, t * t, t * y, y, y * y, y ** 3, y ** 4)
+
+        mean_t, mean_y = st / n, sx / n
+        m2 = np.maximum(sxx / n - mean_y ** 2, 0)
+        m3 = sx3 / n - 3 * mean_y * sxx / n + 2 * mean_y ** 3
+        m4 = sx4 / n - 4 * mean_y * sx3 / n + 6 * mean_y ** 2 * sxx / n - 3 * mean_y ** 4
+        stt_c = stt - n * mean_t ** 2
+        stx_c = stx - n * mean_t * mean_y
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(stt_c > 0, stx_c / stt_c, 0.)
+            p_value = dagostino_pearson(m3 / m2 ** 1.5, m4 / m2 ** 2, n)[1]
+        intercept = mean_y - slope * mean_t
+        median = (self._window_medians() - x_shift) / x_scale
+
+        rss_linear = np.maximum(n * m2 - slope * stx_c, 0)
+        rss_mad = n * m2 + n * (mean_y - median) ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ic_linear = ICScore.from_rss(rss_linear, n, LinearRegression.dof, params.info_criterion)
+            ic_mad = ICScore.from_rss(rss_mad, n, MAD.dof, params.info_criterion)
+            ic_mean = ICScore.from_rss(n * m2, n, 1, params.info_criterion)
+        is_gaussian = np.isfinite(p_value) & (p_value >= params.p_normality) & (m2 > 0) & (ic_mean <= ic_linear)
+        is_linear = ~is_gaussian & (ic_linear <= ic_mad)
+        is_mad = ~is_gaussian & ~is_linear
+        self.best_models = np.where(is_gaussian, Gaussian.name, np.where(is_linear, LinearRegression.name, MAD.name))
+
+        # @Note: Per window, the prediction is level + slope * t and the residual is compared to norm * threshold.
+        level = np.where(is_linear, intercept, np.where(is_mad, median, mean_y)) * x_scale + x_shift
+        slope = np.where(is_linear, slope, 0.) * x_scale
+        norm = np.where(is_linear, np.sqrt(rss_linear / n), np.sqrt(m2)) * x_scale
+        standardized = is_gaussian | params.z_normalization
+        norm = np.where(standardized & (norm != 0), norm, 1.)
+        threshold = np.where(is_gaussian, params.std_width,
+                             np.where(is_linear, params.linear_res, params.mad_res))
+
+        centers = self.starts + 0.5 * (n - 1)
+        owner = np.searchsorted(0.5 * (centers[:-1] + centers[1:]), np.arange(self.x.size))
+        res = self.x - (level[owner] + slope[owner] * t)
+        return (abs(res) >= params.min_res) & (abs(res) / norm[owner] > threshold[owner])
@@ -0,0 +1,228 @@
+import json
+import asyncio
+import numpy as np
+from .anomaly_detector import Params
+from .batch import BatchAnomalyDetector
+from .cli import to_record
+
+
+class MicroBatcher:
+    """
+    Collect series submitted concurrently from coroutines and fit them together with
+    :class:`~anko.batch.BatchAnomalyDetector` in an executor, so the event loop is never blocked by a fit.
+
+    A batch is dispatched as soon as it holds max_batch_size series, or max_wait seconds after its first series
+    arrived, whichever comes first. Batches are fitted concurrently with the collection of the next one,
+    so a request waits at most max_wait plus the fit of its batch.
+
+    Args:
+        params (Params, optional): Policies, thresholds and tolerances shared by all series.
+        max_batch_size (int, optional): Maximal number of series fitted at once.
+        max_wait (float, optional): Maximal time in seconds a series waits for others to join its batch.
+        executor (concurrent.futures.Executor, optional): Executor running the fits,
+            default to the one of the event loop.
+    """
+
+    def __init__(self, params=Params, max_batch_size: int = 64, max_wait: float = 0.005, executor=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be positive, got {}".format(max_batch_size))
+        self.params = params
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self.n_batches = 0
+        self._queue = None
+        self._task = None
+        self._fits = set()
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._collect())
+
+    async def close(self):
+        """
+        Stop collecting, wait for the batches being fitted and fail the series still waiting.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._fits:
+            await asyncio.gather(*self._fits, return_exceptions=True)
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("MicroBatcher is closed"))
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def submit(self, x, t=None):
+        """
+        Fit one series together with the ones submitted around the same time.
+
+        Args:
+            x (numpy.ndarray): Values of the series.
+            t (numpy.ndarray, optional): Time points, required if ``params.scaleless_t`` is False.
+
+        Returns:
+            FittingResult:
+                result (FittingResult): Same result as :meth:`~anko.batch.BatchAnomalyDetector.fit`.
+
+        Raises:
+            ValueError: If x or t is not a 1D array of finite numbers, before the series joins a batch.
+        """
+        if t is None and not self.params.scaleless_t:
+            raise ValueError("t must be given if Params.scaleless_t is False")
+        # @Note: Invalid input fails here, such that it cannot make the other series of its batch fail.
+        x = np.asarray(x, dtype=self.params.dtype)
+        if x.ndim != 1:
+            raise ValueError("x must be 1D, got shape {}".format(x.shape))
+        if not np.all(np.isfinite(x)):
+            raise ValueError("x must only hold finite values")
+        if t is not None:
+            t = np.asarray(t, dtype=np.float64)
+            if t.shape != x.shape:
+                raise ValueError("t and x must have the same shape, got {} and {}".format(t.shape, x.shape))
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((x, t, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.n_batches += 1
+            task = asyncio.ensure_future(self._fit(batch))
+            self._fits.add(task)
+            task.add_done_callback(self._fits.discard)
+
+    async def _fit(self, batch: list):
+        series = [x for x, _, _ in batch]
+        t = None if self.params.scaleless_t else [t for _, t, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, BatchAnomalyDetector(series, t, self.params).fit)
+        except Exception as e:
+            if len(batch) > 1:
+                # @Note: The series are fitted one by one, such that an error only reaches the future of its series.
+                await asyncio.gather(*[self._fit([item]) for item in batch])
+                return
+            if not batch[0][2].done():
+                batch[0][2].set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class DetectionServer:
+    """
+    Minimal HTTP/1.1 server in front of a :class:`MicroBatcher`, listening on TCP or on a unix socket.
+
+    * ``GET /health`` answers ``{"status": "ok"}``.
+    * ``POST /fit`` takes ``{"x": [...], "t": [...], "id": ...}`` (t and id optional),
+      or ``{"series": [...]}`` with a list of such objects, and answers with one record per series
+      in the format of ``anko scan``.
+
+    Connections are kept alive unless the client asks to close them.
+
+    Args:
+        batcher (MicroBatcher): Batcher fitting the submitted series.
+    """
+
+    reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+    def __init__(self, batcher: MicroBatcher):
+        self.batcher = batcher
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080, path: str = None):
+        """
+        Start listening on host:port, or on the unix socket path if given.
+
+        Returns:
+            asyncio.base_events.Server:
+                server (asyncio.base_events.Server): The listening server.
+        """
+        await self.batcher.start()
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path=path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, payload = await self._route(method, target, body)
+                data = json.dumps(payload).encode()
+                writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n".format(
+                    status, self.reasons[status], len(data)).encode('latin-1') + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, target: str, body: bytes) -> tuple:
+        if target == '/health':
+            return 200, {'status': 'ok'}
+        if target != '/fit':
+            return 404, {'error': "unknown path {}".format(target)}
+        if method != 'POST':
+            return 405, {'error': "use POST on /fit"}
+        try:
+            request = json.loads(body)
+            requests = request['series'] if 'series' in request else [request]
+            results = await asyncio.gather(*[self.batcher.submit(r['x'], r.get('t')) for r in requests])
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'error': "{}: {}".format(type(e).__name__, e)}
+        records = [to_record(None, r.get('id'), len(r['x']), result) for r, result in zip(requests, results)]
+        for record in records:
+            del record['source']
+        return 200, records if 'series' in request else records[0]
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8080, path: str = None, params=Params,
+                max_batch_size: int = 64, max_wait: float = 0.005, executor=None):
+    """
+    Run a :class:`DetectionServer` until cancelled.
+    """
+    async with MicroBatcher(params, max_batch_size, max_wait, executor) as batcher:
+        server = await DetectionServer(batcher).start(host, port, path)
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,420 @@
+import itertools
+import math
+import numpy as np
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from .utils import ICScore, dagostino_pearson
+from .models import Gaussian, LinearRegression, MAD
+from .anomaly_detector import Params
+
+
+class SortedWindow:
+    """
+    Multiset of values kept in sorted order, giving the exact median and median absolute deviation.
+
+    The values are held in sorted blocks of at most 2 * load values, with a Fenwick tree over the block lengths,
+    so an insertion or removal costs O(log n) to find its place plus the shift of one block, O(load),
+    the median costs O(log n) and the median absolute deviation O(log(n)^2).
+
+    Args:
+        values (iterable, optional): Initial values.
+    """
+    load = 512
+
+    def __init__(self, values=()):
+        values = sorted(values)
+        self._blocks = [values[i:i + self.load] for i in range(0, len(values), self.load)]
+        self._len = len(values)
+        self._rebuild()
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._blocks)
+
+    def add(self, value: float):
+        if not self._blocks:
+            self._blocks.append([value])
+            self._len += 1
+            self._rebuild()
+            return
+        b = min(bisect_left(self._maxes, value), len(self._blocks) - 1)
+        block = self._blocks[b]
+        insort(block, value)
+        self._maxes[b] = block[-1]
+        self._len += 1
+        if len(block) > 2 * self.load:
+            self._blocks[b:b + 1] = [block[:self.load], block[self.load:]]
+            self._rebuild()
+        else:
+            self._update(b, 1)
+
+    def remove(self, value: float):
+        b = bisect_left(self._maxes, value)
+        block = self._blocks[b]
+        del block[bisect_left(block, value)]
+        self._len -= 1
+        if block:
+            self._maxes[b] = block[-1]
+            self._update(b, -1)
+        else:
+            del self._blocks[b]
+            self._rebuild()
+
+    @property
+    def median(self) -> float:
+        n = self._len
+        if n % 2:
+            return self._value(n // 2)
+        return 0.5 * (self._value(n // 2 - 1) + self._value(n // 2))
+
+    @property
+    def mad(self) -> float:
+        r"""
+        Median absolute deviation. The distances :math:`|x_i - median(x)|` of the values below and above the median
+        form two sorted sequences, so their k-th smallest element is found by bisection without materializing them.
+        """
+        n = self._len
+        if n % 2:
+            return self._kth_deviation(n // 2)
+        return 0.5 * (self._kth_deviation(n // 2 - 1) + self._kth_deviation(n // 2))
+
+    def _rebuild(self):
+        # @Note: Splits and emptied blocks happen at most once per load updates, the O(n / load) rebuild is amortized.
+        self._maxes = [block[-1] for block in self._blocks]
+        tree = [0] + [len(block) for block in self._blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _update(self, b: int, delta: int):
+        i = b + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _rank(self, value: float) -> int:
+        """
+        Number of values less than value.
+        """
+        b = bisect_left(self._maxes, value)
+        i, rank = b, 0
+        while i > 0:
+            rank += self._tree[i]
+            i -= i & -i
+        return rank + (bisect_left(self._blocks[b], value) if b < len(self._blocks) else 0)
+
+    def _value(self, k: int) -> float:
+        """
+        k-th smallest value, counting from 0.
+        """
+        tree, b = self._tree, 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            if b + step < len(tree) and tree[b + step] <= k:
+                b += step
+                k -= tree[b]
+            step >>= 1
+        return self._blocks[b][k]
+
+    def _kth_deviation(self, k: int) -> float:
+        median = self.median
+        split = self._rank(median)
+        n_left, n_right = split, self._len - split
+
+        def left(i):
+            return median - self._value(split - 1 - i)
+
+        def right(j):
+            return self._value(split + j) - median
+
+        # @Note: Smallest number i of deviations taken from the left, such that the (k+1) smallest are covered.
+        lo, hi = max(0, k + 1 - n_right), min(k + 1, n_left)
+        while lo < hi:
+            i = (lo + hi) // 2
+            if left(i) < right(k - i):
+                lo = i + 1
+            else:
+                hi = i
+        j = k + 1 - lo
+        return max(left(lo - 1) if lo > 0 else -np.inf, right(j - 1) if j > 0 else -np.inf)
+
+
+class _P2Quantile:
+    """
+    Extended P-square estimate of the median of a stream (Jain and Chlamtac, 1985), started from sorted values.
+    The markers hold the quantiles 0, 1/(m-1), ..., 1, and each insertion moves the inner markers by at most one
+    position, adjusting their heights by piecewise-parabolic interpolation between their neighbours.
+    An extreme value only moves the outer markers, the ones in between shield the median from it.
+    """
+
+    def __init__(self, values: list, markers: int):
+        self.increments = [i / (markers - 1) for i in range(markers)]
+        self.desired = [1 + (len(values) - 1) * f for f in self.increments]
+        self.positions = [int(round(d)) for d in self.desired]
+        self.heights = [values[i - 1] for i in self.positions]
+
+    @property
+    def value(self) -> float:
+        return self.heights[len(self.heights) // 2]
+
+    def add(self, value: float):
+        q, n, m = self.heights, self.positions, len(self.heights)
+        if value < q[0]:
+            q[0] = value
+        elif value > q[-1]:
+            q[-1] = value
+        for i in range(bisect_right(q, value, 1, m - 1), m):
+            n[i] += 1
+        for i in range(m):
+            self.desired[i] += self.increments[i]
+        for i in range(1, m - 1):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                above, below = n[i + 1] - n[i], n[i] - n[i - 1]
+                height = q[i] + d / (above + below) * ((below + d) * (q[i + 1] - q[i]) / above
+                                                       + (above - d) * (q[i] - q[i - 1]) / below)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+
+class MedianSketch:
+    """
+    Median and median absolute deviation of an unbounded stream of values in fixed memory.
+
+    The first size values are kept exactly in a :class:`SortedWindow`. Beyond, the median is tracked by the extended
+    P-square algorithm with markers started from the exact order statistics, and the median absolute deviation by a
+    second estimate on the distances to the median at the time of insertion. The estimates follow ranks rather than
+    values, such that an isolated extreme value or a heavy tail does not move them, unlike a histogram spanning
+    the range of the values. An insertion costs O(markers), the median and the median absolute deviation O(1).
+
+    Args:
+        values (iterable, optional): Initial values.
+        size (int, optional): Number of values kept exactly before switching to the estimates.
+        markers (int, optional): Number of markers of each estimate, odd.
+    """
+
+    def __init__(self, values=(), size: int = 4096, markers: int = 9):
+        self.size = max(size, markers)
+        self.markers = markers
+        self._exact = SortedWindow()
+        self._median = self._mad = None
+        self._n = 0
+        for value in values:
+            self.add(value)
+
+    def __len__(self):
+        return self._n
+
+    def add(self, value: float):
+        if not math.isfinite(value):
+            raise ValueError("cannot sketch the non-finite value {}".format(value))
+        self._n += 1
+        if self._median is None:
+            self._exact.add(value)
+            if self._n > self.size:
+                self._start_estimates()
+            return
+        self._mad.add(abs(value - self._median.value))
+        self._median.add(value)
+
+    @property
+    def median(self) -> float:
+        if self._median is None:
+            return self._exact.median
+        return self._median.value
+
+    @property
+    def mad(self) -> float:
+        if self._mad is None:
+            return self._exact.mad
+        return self._mad.value
+
+    def _start_estimates(self):
+        values = list(self._exact)
+        median = self._exact.median
+        self._median = _P2Quantile(values, self.markers)
+        self._mad = _P2Quantile(sorted(abs(value - median) for value in values), self.markers)
+        self._exact = None
+
+
+class OnlineAnomalyDetector:
+    """
+    Incremental counterpart of :class:`~anko.anomaly_detector.AnomalyDetector` for series arriving point by point.
+
+    Running sums of t, x and their products are kept for the linear regression,
+    power sums up to the 4th order for the normal test of the Gaussian branch,
+    and for the median used by the MAD model, a :class:`SortedWindow` of the window points or, without window,
+    a :class:`MedianSketch` of fixed size.
+    Each new point is checked against the model selected from the points seen so far, then absorbed into the statistics,
+    so :meth:`update` costs O(log n) in a window, and O(1) otherwise.
+
+    Compared to the batch detector, the Gaussian branch replaces the histogram fit by requiring that
+    a linear trend does not score better than the constant mean, and the step model :class:`~anko.models.Sgn`
+    is not considered, since its breakpoint needs the whole series.
+
+    Args:
+        params (Params, optional): Policies, thresholds and tolerances.
+        window (int, optional): If given, only the latest window points are kept, older ones expire.
+    """
+
+    def __init__(self, params=Params, window: int = None):
+        if window is not None and window < params.min_sample_size:
+            raise ValueError("window {} is less than Params.min_sample_size {}".format(window, params.min_sample_size))
+        self.params = params
+        self.window = window
+        self.best_model = None
+        self._points = deque()
+        self._quantiles = SortedWindow() if window is not None else MedianSketch()
+        self._count = 0
+        self._reset_sums(0., 0.)
+
+    @property
+    def n(self) -> int:
+        return self._n
+
+    @property
+    def mean(self) -> float:
+        return self._x_shift + self._sx / self._n
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(self._central_moments()[0])
+
+    @property
+    def median(self) -> float:
+        return self._quantiles.median
+
+    @property
+    def mad(self) -> float:
+        return self._quantiles.mad
+
+    def update(self, t, x) -> bool:
+        """
+        Check a new data point and add it to the series.
+
+        Args:
+            t (float): Time point, ignored if ``params.scaleless_t`` is True.
+            x (float): Value.
+
+        Returns:
+            bool:
+                is_outlier (bool): Whether the point is anomalous with respect to the previous points.
+                Always False as long as fewer than ``params.min_sample_size`` points have been seen.
+        """
+        if self.params.scaleless_t:
+            t = self._count
+        self._count += 1
+        is_outlier = False
+        if self._n >= self.params.min_sample_size:
+            is_outlier = self._is_outlier(t, x)
+        self._push(t, x)
+        return is_outlier
+
+    def _reset_sums(self, t_shift, x_shift):
+        # @Note: Sums are accumulated on shifted values to limit the loss of precision.
+        self._t_shift, self._x_shift = t_shift, x_shift
+        self._n = 0
+        self._st = self._stt = self._stx = 0.
+        self._sx = self._sxx = self._sx3 = self._sx4 = 0.
+        self._since_rebase = 0
+
+    def _accumulate(self, t, x, sign):
+        t = t - self._t_shift
+        x = x - self._x_shift
+        self._n += sign
+        self._st += sign * t
+        self._stt += sign * t * t
+        self._stx += sign * t * x
+        self._sx += sign * x
+        self._sxx += sign * x * x
+        self._sx3 += sign * x ** 3
+        self._sx4 += sign * x ** 4
+
+    def _push(self, t, x):
+        t, x = float(t), float(x)
+        if self._n == 0:
+            self._reset_sums(t, x)
+        self._accumulate(t, x, 1)
+        self._quantiles.add(x)
+        if self.window is None:
+            return
+        self._points.append((t, x))
+        if len(self._points) > self.window:
+            t_old, x_old = self._points.popleft()
+            self._accumulate(t_old, x_old, -1)
+            self._quantiles.remove(x_old)
+        self._since_rebase += 1
+        if self._since_rebase >= self.window:
+            self._rebase()
+
+    def _rebase(self):
+        # @Note: Subtracting expired points lets rounding errors drift, recompute once per window (amortized O(1)).
+        t_shift, x_shift = self._points[0]
+        self._reset_sums(t_shift, x_shift)
+        for t, x in self._points:
+            self._accumulate(t, x, 1)
+
+    def _central_moments(self) -> tuple:
+        n = self._n
+        mean = self._sx / n
+        m2 = max(self._sxx / n - mean ** 2, 0.)
+        m3 = self._sx3 / n - 3 * mean * self._sxx / n + 2 * mean ** 3
+        m4 = self._sx4 / n - 4 * mean * self._sx3 / n + 6 * mean ** 2 * self._sxx / n - 3 * mean ** 4
+        return m2, m3, m4
+
+    def _is_normal_distribution(self) -> bool:
+        m2, m3, m4 = self._central_moments()
+        if m2 == 0:
+            return False
+        p_value = dagostino_pearson(m3 / m2 ** 1.5, m4 / m2 ** 2, self._n)[1]
+        return np.isfinite(p_value) and p_value >= self.params.p_normality
+
+    def _select_model(self) -> tuple:
+        """
+        Returns the name of the best model, the residual function and the norm of the residuals.
+        """
+        n = self._n
+        mean_t = self._st / n
+        mean_x = self._sx / n
+        var_x = self._central_moments()[0]
+        stt = self._stt - n * mean_t ** 2
+        stx = self._stx - n * mean_t * mean_x
+        slope = stx / stt if stt > 0 else 0.
+        intercept = mean_x - slope * mean_t
+        rss_linear = max(n * var_x - slope * stx, 0.)
+        with np.errstate(divide='ignore'):
+            ic_linear = ICScore.from_rss(rss_linear, n, LinearRegression.dof, self.params.info_criterion)
+            # @Note: Without the histogram fit, the Gaussian branch is only taken if no trend beats the constant mean.
+            if self._is_normal_distribution() and \
+                    ICScore.from_rss(n * var_x, n, 1, self.params.info_criterion) <= ic_linear:
+                return Gaussian.name, lambda t, x: x - self.mean, np.sqrt(var_x)
+            median = self.median
+            rss_mad = n * var_x + n * (self._x_shift + mean_x - median) ** 2
+            ic_scores = {
+                LinearRegression.name: ic_linear,
+                MAD.name: ICScore.from_rss(rss_mad, n, MAD.dof, self.params.info_criterion),
+            }
+        best_model = min(ic_scores.items(), key=lambda k: k[1])[0]
+        if best_model == LinearRegression.name:
+            def residual(t, x):
+                return x - self._x_shift - intercept - slope * (t - self._t_shift)
+            return best_model, residual, np.sqrt(rss_linear / n)
+        return best_model, lambda t, x: x - median, np.sqrt(var_x)
+
+    def _is_outlier(self, t, x) -> bool:
+        self.best_model, residual, norm = self._select_model()
+        res = residual(t, x)
+        if abs(res) < self.params.min_res:
+            return False
+        if self.best_model == Gaussian.name:
+            return norm > 0 and abs(res) / norm > self.params.std_width
+        if self.params.z_normalization and norm != 0:
+            res /= norm
+        return abs(res) > getattr(self.params, "{}_res".format(self.best_model))
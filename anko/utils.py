@@ -10,7 +10,7 @@ class InfoCriterion(Enum):
 class ICScore:
 
     @staticmethod
-    def aic(y: np.ndarray, y_predict: np.ndarray, p: int) -> float:
+    def aic(y: np.ndarray, y_predict: np.ndarray, p: int, axis: int = -1) -> float:
         r"""
         Compute Akaike information criterion for model selection.
 
@@ -23,20 +23,21 @@ class ICScore:
             y (numpy.ndarray): Data samples.
             y_predict (numpy.ndarray): Prediction by fitting.
             p (int): Fitting degrees of freedom, i.e. the number of parameters to fit with.
+            axis (int, optional): Axis along which the samples of one series lie.
+                For 2D input, one score per series is returned.
 
         Returns:
             float:
                 aic_score (float):
 
         """
-        n = len(y)
+        n = np.shape(y)[axis]
         res = np.subtract(y, y_predict)
-        rss = np.sum(np.power(res, 2))
-        aic_score = n * np.log(rss / n) + 2 * p
-        return aic_score
+        rss = np.sum(np.square(res), axis=axis, dtype=np.float64)
+        return ICScore.aic_from_rss(rss, n, p)
 
     @staticmethod
-    def bic(y: np.ndarray, y_predict: np.ndarray, p: int) -> float:
+    def bic(y: np.ndarray, y_predict: np.ndarray, p: int, axis: int = -1) -> float:
         r"""
         Compute Bayesian information criterion for model selection.
 
@@ -49,21 +50,50 @@ class ICScore:
             y (numpy.ndarray): Data samples.
             y_predict (numpy.ndarray): Prediction by fitting.
             p (int): Fitting degrees of freedom, i.e. the number of parameters to fit with.
+            axis (int, optional): Axis along which the samples of one series lie.
+                For 2D input, one score per series is returned.
 
         Returns:
             float:
                 bic_score (float):
 
         """
-        n = len(y)
+        n = np.shape(y)[axis]
         res = np.subtract(y, y_predict)
-        rss = np.sum(np.power(res, 2))
-        bic_score = n * np.log(rss / n) + p * np.log(n)
-        return bic_score
+        rss = np.sum(np.square(res), axis=axis, dtype=np.float64)
+        return ICScore.bic_from_rss(rss, n, p)
+
+    @staticmethod
+    def aic_from_rss(rss: float, n: int, p: int) -> float:
+        """
+        Same as :meth:`aic`, but starting from the residual sum of squares of n data samples.
+        Infinite degrees of freedom, e.g. of a model that cannot be fitted on the series, give an infinite score.
+        """
+        with np.errstate(invalid='ignore'):
+            return np.where(np.isposinf(p), np.inf, n * np.log(rss / n) + 2 * p)[()]
+
+    @staticmethod
+    def bic_from_rss(rss: float, n: int, p: int) -> float:
+        """
+        Same as :meth:`bic`, but starting from the residual sum of squares of n data samples.
+        Infinite degrees of freedom give an infinite score.
+        """
+        with np.errstate(invalid='ignore'):
+            return np.where(np.isposinf(p), np.inf, n * np.log(rss / n) + p * np.log(n))[()]
+
+    @staticmethod
+    def from_rss(rss: float, n: int, p: int, info_criterion: InfoCriterion = InfoCriterion.AIC) -> float:
+        """
+        Dispatch to :meth:`aic_from_rss` or :meth:`bic_from_rss` according to info_criterion.
+        """
+        if info_criterion == InfoCriterion.AIC:
+            return ICScore.aic_from_rss(rss, n, p)
+        elif info_criterion == InfoCriterion.BIC:
+            return ICScore.bic_from_rss(rss, n, p)
 
 
 def fitting_residual(x: np.ndarray, y: np.ndarray, func, args, mask_min: float = None,
-                     standardized: bool = False) -> np.ndarray:
+                     standardized: bool = False, y_predict: np.ndarray = None, out: np.ndarray = None) -> np.ndarray:
     """
     Compute the fitting residual.
 
@@ -72,24 +102,154 @@ def fitting_residual(x: np.ndarray, y: np.ndarray, func, args, mask_min: float =
         y (numpy.ndarray): y coordinate of input data points.
         func (callable): Fitting function.
         args (numpy.ndarray): Best estimated arguments of fitting function.
-        mask_min (float, optional): If not None, mask resuduals that are smaller than mask_min to zero. This is always performed before standardization.
+        mask_min (float, optional): If not None, mask resuduals that are smaller than mask_min to zero.
+            This is always performed before standardization.
         standardized (bool, optional): Standardize residual to z-score formalism.
+        y_predict (numpy.ndarray, optional): Prediction of func at x, if already available.
+        out (numpy.ndarray, optional): Float buffer with the shape of y receiving the residual,
+            such that no array of the length of y is allocated apart from the boolean mask.
 
     Returns:
         numpy.ndarray:
             res (numpy.ndarray): Residual of each corresponding data points (x, y).
 
     """
-    y_predict = func(x, *args)
-    res = np.subtract(y, y_predict)
-    norm = np.std(res)
+    if y_predict is None:
+        y_predict = func(x, *args)
+    res = np.subtract(y, y_predict, out=out)
+    norm = _std(res)
     if mask_min is not None:
-        res[np.where(abs(res) < mask_min)] = 0
+        mask_small(res, mask_min)
     if standardized and norm != 0:
         res /= norm
     return res
 
 
+def _std(x: np.ndarray) -> float:
+    # @Note: Same as np.std, without the temporary array of deviations. Sums are accumulated in float64,
+    #  since the difference of the two moments cancels most of the digits of float32.
+    mean = np.mean(x, dtype=np.float64)
+    sum_squares = np.dot(x, x) if x.dtype == np.float64 else np.sum(np.square(x), dtype=np.float64)
+    return np.sqrt(max(sum_squares / x.size - mean * mean, 0.))
+
+
+def _float_dtype(dtype) -> np.dtype:
+    # @Note: Floating types are kept, e.g. float32 series are not promoted, integers are taken as float64.
+    dtype = np.dtype(dtype)
+    return dtype if np.issubdtype(dtype, np.floating) else np.dtype(float)
+
+
+def mask_small(res: np.ndarray, mask_min: float) -> np.ndarray:
+    """
+    Set the entries of res with magnitude smaller than mask_min to zero, in place.
+    """
+    small = np.greater(res, -mask_min)
+    np.logical_and(small, np.less(res, mask_min), out=small)
+    np.copyto(res, 0, where=small)
+    return res
+
+
+def dagostino_pearson(skewness: np.ndarray, kurtosis: np.ndarray, n: int) -> tuple:
+    r"""
+    D'Agostino and Pearson's omnibus test of normality, evaluated from the (biased) sample moments
+
+    .. math::
+        g_1 = m_3/m_2^{3/2}, \quad b_2 = m_4/m_2^2.
+
+    Both moments are transformed into approximately standard normal variables :math:`Z_1, Z_2`,
+    and :math:`K^2 = Z_1^2 + Z_2^2` follows a chi-squared distribution with 2 degrees of freedom.
+    This reproduces :func:`scipy.stats.normaltest`, but only requires the moments,
+    which can be maintained incrementally or computed for many series at once.
+
+    Args:
+        skewness (numpy.ndarray): Sample skewness :math:`g_1`.
+        kurtosis (numpy.ndarray): Sample (Pearson) kurtosis :math:`b_2`, which is 3 for normal distribution.
+        n (int): Number of data samples, at least 8.
+
+    Returns:
+        tuple:
+            statistic (numpy.ndarray): :math:`K^2`.
+            p_value (numpy.ndarray): p-value of the test, nan if n < 8.
+
+    """
+    if n < 8:
+        nan = np.full(np.shape(skewness), np.nan)
+        return nan, nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = skewness * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+        beta2 = (3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3)) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+        mean_b2 = 3.0 * (n - 1) / (n + 1)
+        var_b2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.) * (n + 3) * (n + 5))
+        x = (kurtosis - mean_b2) / np.sqrt(var_b2)
+        sqrt_beta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt((6.0 * (n + 3) * (n + 5)) /
+                                                                               (n * (n - 2) * (n - 3)))
+        a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / (sqrt_beta1 ** 2)))
+        term1 = 1 - 2 / (9.0 * a)
+        denom = 1 + x * np.sqrt(2 / (a - 4.0))
+        term2 = np.sign(denom) * np.where(denom == 0.0, np.nan, np.power((1 - 2.0 / a) / np.abs(denom), 1 / 3.0))
+        z_kurt = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+        statistic = z_skew ** 2 + z_kurt ** 2
+    return statistic, np.exp(-0.5 * statistic)
+
+
+def central_moments(x: np.ndarray, axis: int = -1) -> tuple:
+    r"""
+    Compute the mean and the (biased) central moments up to the 4th order in one pass over the deviations,
+
+    .. math::
+        m_k = \frac{1}{n}\sum_i (x_i-\mu)^k.
+
+    Args:
+        x (numpy.ndarray): Input values.
+        axis (int, optional): Axis along which the moments are computed.
+
+    Returns:
+        tuple:
+            mean, m2, m3, m4 (numpy.ndarray): Moments with the axis reduced.
+
+    """
+    # @Note: The deviations keep the floating type of x, the means are accumulated in float64.
+    x = np.asarray(x)
+    mean = np.mean(x, axis=axis, keepdims=True, dtype=np.float64)
+    deviation = np.subtract(x, mean, dtype=_float_dtype(x.dtype))
+    squared = deviation * deviation
+    m2 = np.mean(squared, axis=axis, dtype=np.float64)
+    m3 = np.mean(squared * deviation, axis=axis, dtype=np.float64)
+    m4 = np.mean(squared * squared, axis=axis, dtype=np.float64)
+    return np.squeeze(mean, axis=axis), m2, m3, m4
+
+
+def normal_test(x: np.ndarray, axis: int = -1, moments: tuple = None) -> tuple:
+    """
+    Test whether samples are drawn from a normal distribution, see :func:`dagostino_pearson`.
+    Equivalent to :func:`scipy.stats.normaltest`, but the moments are computed with NumPy directly,
+    and can be shared with other computations through the moments argument.
+
+    Args:
+        x (numpy.ndarray): Input values, 1D or 2D with one series per row.
+        axis (int, optional): Axis along which the test is performed.
+        moments (tuple, optional): Output of :func:`central_moments` for x, if already available.
+
+    Returns:
+        tuple:
+            statistic (numpy.ndarray): :math:`K^2`.
+            p_value (numpy.ndarray): p-value of the test, nan if there are fewer than 8 samples or if x is constant.
+
+    """
+    _, m2, m3, m4 = central_moments(x, axis=axis) if moments is None else moments
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skewness = m3 / m2 ** 1.5
+        kurtosis = m4 / m2 ** 2
+    return dagostino_pearson(skewness, kurtosis, np.shape(x)[axis])
+
+
 def z_score(x: np.ndarray) -> np.ndarray:
     r"""
     Perform z-score normalizaion on input array x.
@@ -108,7 +268,7 @@ def z_score(x: np.ndarray) -> np.ndarray:
     return (x - np.mean(x)) / np.std(x)
 
 
-def median_absolute_deviation(x: np.ndarray) -> np.ndarray:
+def median_absolute_deviation(x: np.ndarray, axis: int = None) -> np.ndarray:
     r"""
     Calculate the median absolute deviation. The is a robust statistical measurement defined by
 
@@ -117,12 +277,14 @@ def median_absolute_deviation(x: np.ndarray) -> np.ndarray:
 
     Args:
         x (numpy.ndarray): Input values.
+        axis (int, optional): Axis along which the medians are computed.
+            The default is to compute over the flattened array.
 
     Returns:
         numpy.ndarray:
             mad (numpy.ndarray): Output array.
     """
-    return np.median(abs(x - np.median(x)))
+    return median_and_mad(x, axis=axis)[1]
 
 
 def modified_z_score(x: np.ndarray) -> np.ndarray:
@@ -140,4 +302,182 @@ def modified_z_score(x: np.ndarray) -> np.ndarray:
     Returns:
 
     """
-    return 0.6745 * (x - np.median(x)) / median_absolute_deviation(x)
+    median, mad = median_and_mad(x)
+    return 0.6745 * (x - median) / mad
+
+
+def _partition_median(buffer: np.ndarray) -> np.ndarray:
+    # @Note: Partially sort the last axis of buffer in place, such that both middle elements are in position.
+    n = buffer.shape[-1]
+    buffer.partition(sorted({(n - 1) // 2, n // 2}), axis=-1)
+    return 0.5 * (buffer[..., (n - 1) // 2] + buffer[..., n // 2])
+
+
+def median_and_mad(x: np.ndarray, axis: int = None, approximate: bool = False, bins: int = 4096) -> tuple:
+    r"""
+    Compute the median and the median absolute deviation together.
+
+    The exact mode copies x once, finds the median by :func:`numpy.partition` in place,
+    overwrites the copy with the absolute deviations and partitions it again, so each median costs O(n)
+    and no further temporary of the size of x is allocated.
+
+    The approximate mode never copies x: it sketches the distribution by a histogram of bins equal-width bins
+    between the minimum and the maximum, accumulated over blocks of the series, and interpolates the median
+    inside its bin; the same is done for the absolute deviations. Since an extreme value squeezes the body of the
+    distribution into a few bins, the bin holding the median is binned again in a further pass over x while it holds
+    more than 2 / bins of the values, up to 4 passes. The error is within one bin width of the last pass.
+
+    Args:
+        x (numpy.ndarray): Input values.
+        axis (int, optional): Axis along which the statistics are computed, e.g. -1 for one series per row.
+            The default is to compute over the flattened array.
+        approximate (bool, optional): Use the histogram sketch instead of the exact selection.
+        bins (int, optional): Number of bins of the sketch.
+
+    Returns:
+        tuple:
+            median (numpy.ndarray): Median with the axis reduced.
+            mad (numpy.ndarray): Median absolute deviation with the axis reduced.
+    """
+    x = np.asarray(x)
+    if axis is None:
+        x, axis = x.reshape(1, -1), -1
+        squeeze = True
+    else:
+        x = np.moveaxis(x, axis, -1)
+        squeeze = False
+    if approximate:
+        rows = x.reshape(-1, x.shape[-1])
+        median = _sketch_median(rows, lambda block, idx: block, bins)
+        mad = _sketch_median(rows, lambda block, idx: abs(block - median[idx, None]), bins)
+        median, mad = median.reshape(x.shape[:-1]), mad.reshape(x.shape[:-1])
+    else:
+        buffer = np.array(x, dtype=_float_dtype(x.dtype))
+        median = _partition_median(buffer)
+        np.subtract(buffer, median[..., None], out=buffer)
+        np.abs(buffer, out=buffer)
+        mad = _partition_median(buffer)
+    if squeeze:
+        return median[0], mad[0]
+    return median, mad
+
+
+def _sketch_median(x: np.ndarray, transform, bins: int, block_size: int = 1 << 16, max_passes: int = 4) -> np.ndarray:
+    # @Note: x holds one series per row, transform(block, rows) maps a block of columns to the sketched values.
+    k, n = x.shape
+    rows = np.arange(k)
+    blocks = [slice(start, start + block_size) for start in range(0, n, block_size)]
+    lo, hi = np.full(k, np.inf), np.full(k, -np.inf)
+    for block in blocks:
+        values = transform(x[:, block], rows)
+        lo, hi = np.minimum(lo, values.min(axis=-1)), np.maximum(hi, values.max(axis=-1))
+    width = (hi - lo) / bins
+    # @Note: All values of a flat row are equal to lo, any other bin width would move them to a bin centre.
+    flat = width == 0
+    width[flat] = 1.
+    rank = 0.5 * n
+    for n_pass in range(max_passes):
+        # @Note: Values below the range only count in the rank, values above it are dropped with the extra bin.
+        counts = np.zeros((k, bins + 1), dtype=np.int64)
+        below = np.zeros(k, dtype=np.int64)
+        for block in blocks:
+            values = transform(x[:, block], rows)
+            index = np.floor((values - lo[:, None]) / width[:, None])
+            below += np.sum(index < 0, axis=-1)
+            index = np.where((index >= 0) & (values <= hi[:, None]), np.minimum(index, bins - 1), bins).astype(np.intp)
+            index += (bins + 1) * rows[:, None]
+            counts += np.bincount(index.ravel(), minlength=k * (bins + 1)).reshape(k, bins + 1)
+        counts = counts[:, :bins]
+        cumulative = below[:, None] + np.cumsum(counts, axis=-1)
+        b = np.minimum(np.sum(cumulative < rank, axis=-1), bins - 1)
+        before = np.where(b > 0, cumulative[rows, b - 1], below)
+        # @Note: An extreme value squeezes the body into a few bins, the bin of the middle rank is then binned again.
+        refine = ~flat & (counts[rows, b] > 2 * n / bins) & (width > np.abs(lo) * 1e-12)
+        if not np.any(refine) or n_pass == max_passes - 1:
+            break
+        lo = np.where(refine, lo + b * width, lo)
+        hi = np.where(refine, lo + width, hi)
+        width = np.where(refine, width / bins, width)
+    # @Note: Interpolate linearly inside the bin holding the middle rank.
+    fraction = (rank - before) / np.maximum(counts[rows, b], 1)
+    return np.where(flat, lo, lo + (b + np.clip(fraction, 0, 1)) * width)
+
+
+class SeriesStats:
+    """
+    Per-series statistics context, shared by all models fitted on the same series.
+    Every statistic is computed lazily on first access and cached, such that e.g. the median needed by the MAD model
+    and by the median absolute deviation is only computed once.
+
+    Args:
+        x (numpy.ndarray): Input values.
+        moments (tuple, optional): Output of :func:`central_moments` for x, if already available.
+    """
+
+    def __init__(self, x: np.ndarray, moments: tuple = None):
+        self.x = x
+        self._cache = {}
+        if moments is not None:
+            self._cache['moments'] = moments
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def size(self) -> int:
+        return np.size(self.x)
+
+    @property
+    def moments(self) -> tuple:
+        """
+        Mean and central moments up to the 4th order, see :func:`central_moments`.
+        """
+        return self._cached('moments', lambda: central_moments(self.x))
+
+    @property
+    def mean(self) -> float:
+        return self.moments[0]
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(self.moments[1])
+
+    @property
+    def sorted(self) -> np.ndarray:
+        return self._cached('sorted', lambda: np.sort(self.x))
+
+    @property
+    def median(self) -> float:
+        def compute():
+            if 'sorted' not in self._cache:
+                # @Note: Keep the partitioned copy, such that mad can reuse it, see median_and_mad.
+                self._cache['partitioned'] = np.array(self.x, dtype=_float_dtype(np.asarray(self.x).dtype))
+                return _partition_median(self._cache['partitioned'])
+            n = self.size
+            return 0.5 * (self.sorted[(n - 1) // 2] + self.sorted[n // 2])
+        return self._cached('median', compute)
+
+    @property
+    def mad(self) -> float:
+        """
+        Median absolute deviation, see :func:`median_and_mad`.
+        """
+        def compute():
+            median = self.median
+            deviation = self._cache.pop('partitioned', None)
+            if deviation is None:
+                deviation = np.subtract(self.x, median, dtype=_float_dtype(np.asarray(self.x).dtype))
+            else:
+                np.subtract(deviation, median, out=deviation)
+            np.abs(deviation, out=deviation)
+            return _partition_median(deviation)
+        return self._cached('mad', compute)
+
+    @property
+    def cumsum(self) -> np.ndarray:
+        """
+        Cumulative sum of the deviations from the mean.
+        """
+        return self._cached('cumsum', lambda: np.cumsum(self.x - self.mean, dtype=np.float64))
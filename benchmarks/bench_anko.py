@@ -0,0 +1,272 @@
+"""
+Benchmark suite of anko.
+
+Every target is timed on synthetic series (linear, step, gaussian, heavy-tailed, constant and seasonal)
+of increasing length, and on the series stored in test/test_series.npz. One JSON record per (target, generator, size)
+is written, holding wall time, fits per second, peak memory traced by tracemalloc and the number of function evaluations
+spent in scipy.optimize.curve_fit.
+
+The import time of the entry points is measured in fresh interpreters, together with the heavy optional
+dependencies (scipy, sklearn, asyncio) they load up front.
+
+Usage:
+    python benchmarks/bench_anko.py --max-size 1e5 --output bench.jsonl
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import contextlib
+import functools
+import tracemalloc
+import warnings
+import io
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+import anko  # noqa: E402
+from anko import models  # noqa: E402
+from anko.anomaly_detector import AnomalyDetector, Params  # noqa: E402
+from anko.batch import BatchAnomalyDetector  # noqa: E402
+
+
+GENERATORS = {
+    'linear': lambda rng, n: 0.5 * np.arange(n) + 100 + rng.normal(0, 1, size=n),
+    'step': lambda rng, n: np.where(np.arange(n) < n // 3, 100., 160.) + rng.normal(0, 1, size=n),
+    'gaussian': lambda rng, n: rng.normal(100, 10, size=n),
+    'heavy_tailed': lambda rng, n: 100 + rng.standard_t(2, size=n),
+    'constant': lambda rng, n: np.full(n, 100.),
+    'seasonal': lambda rng, n: 100 + 10 * np.sin(2 * np.pi * np.arange(n) / 24) + rng.normal(0, 1, size=n),
+}
+
+
+class CurveFitCounter:
+    """
+    Wrap anko.models.curve_fit to count the evaluations of the fitted function.
+    """
+
+    def __init__(self):
+        self.nfev = 0
+        self._curve_fit = models.curve_fit
+
+    def __enter__(self):
+        def counted_curve_fit(f, *args, **kwargs):
+            @functools.wraps(f)
+            def counted(*f_args):
+                self.nfev += 1
+                return f(*f_args)
+            return self._curve_fit(counted, *args, **kwargs)
+        models.curve_fit = counted_curve_fit
+        return self
+
+    def __exit__(self, *exc):
+        models.curve_fit = self._curve_fit
+
+
+class SgnCurveFitParams(Params):
+    sgn_engine = 'curve_fit'
+
+
+def target_detector(t, x):
+    AnomalyDetector(t, x).fit()
+
+
+def target_detector_curve_fit(t, x):
+    AnomalyDetector(t, x, SgnCurveFitParams).fit()
+
+
+def target_gaussian(t, x):
+    models.Gaussian(x).fit()
+
+
+def target_gaussian_histogram(t, x):
+    models.Gaussian(x, engine='histogram').fit()
+
+
+def target_sgn(t, x):
+    models.Sgn(t, x).fit()
+
+
+def target_sgn_curve_fit(t, x):
+    models.Sgn(t, x, engine='curve_fit').fit()
+
+
+def target_linear(t, x):
+    models.LinearRegression(t, x).fit()
+
+
+def target_mad(t, x):
+    models.MAD(t, x).fit()
+
+
+def target_exp_decay(t, x):
+    models.ExpDecay(t, x).fit()
+
+
+def target_changepoint(t, x):
+    models.ChangePoint(t, x).fit()
+
+
+def target_seasonal(t, x):
+    models.Seasonal(t, x).fit()
+
+
+def target_dbscan(t, x):
+    models.DBSCAN(t, x).fit()
+
+
+# @Note: Largest series length worth running per target, the optimizer-based ones do not scale.
+TARGETS = {
+    'detector': (target_detector, 10 ** 7),
+    'detector_curve_fit': (target_detector_curve_fit, 10 ** 5),
+    'gaussian': (target_gaussian, 10 ** 7),
+    'gaussian_histogram': (target_gaussian_histogram, 10 ** 7),
+    'sgn': (target_sgn, 10 ** 7),
+    'sgn_curve_fit': (target_sgn_curve_fit, 10 ** 5),
+    'linear': (target_linear, 10 ** 7),
+    'mad': (target_mad, 10 ** 7),
+    'exp_decay': (target_exp_decay, 10 ** 7),
+    'changepoint': (target_changepoint, 10 ** 7),
+    'seasonal': (target_seasonal, 10 ** 7),
+    'dbscan': (target_dbscan, 10 ** 7),
+}
+
+
+def measure(func, repeat: int) -> dict:
+    """
+    Run func repeat times, report the best wall time, and the peak memory and curve_fit evaluations of one run.
+    A target raising an exception is reported with its error message instead.
+    """
+    try:
+        func()
+    except Exception as e:
+        return {'error': "{}: {}".format(type(e).__name__, e), 'wall_time': None, 'peak_memory': None,
+                'curve_fit_nfev': None}
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    with CurveFitCounter() as counter:
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'wall_time': min(times), 'peak_memory': peak, 'curve_fit_nfev': counter.nfev}
+
+
+def run_once(func, *args):
+    def call():
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(*args)
+    return call
+
+
+def read_corpus() -> list:
+    path = os.path.join(ROOT, 'test', 'test_series.npz')
+    with np.load(path) as npzfile:
+        return [npzfile['arr_%i' % i] for i in range(len(npzfile.files))]
+
+
+IMPORTS = ('anko.anomaly_detector', 'anko.batch', 'anko.cli')
+HEAVY_MODULES = ('scipy', 'sklearn', 'asyncio')
+
+
+def bench_import(repeat):
+    code = ("import sys, time; start = time.perf_counter(); import {}; elapsed = time.perf_counter() - start; "
+            "print(elapsed, *sorted(set(m.partition('.')[0] for m in sys.modules) & set({!r})))")
+    for module in IMPORTS:
+        runs = [subprocess.run([sys.executable, '-c', code.format(module, HEAVY_MODULES)], cwd=ROOT, check=True,
+                               stdout=subprocess.PIPE, universal_newlines=True).stdout.split()
+                for _ in range(repeat)]
+        yield {'target': 'import', 'generator': module, 'wall_time': min(float(run[0]) for run in runs),
+               'heavy_modules': runs[0][1:]}
+
+
+def bench_series(targets, sizes, repeat, rng):
+    for name in targets:
+        func, max_size = TARGETS[name]
+        for generator, generate in GENERATORS.items():
+            for size in sizes:
+                if size > max_size:
+                    continue
+                x = generate(rng, size)
+                t = np.arange(size)
+                record = measure(run_once(func, t, x), repeat)
+                record.update(target=name, generator=generator, size=size, batch_size=1,
+                              fits_per_second=record['wall_time'] and 1 / record['wall_time'])
+                yield record
+
+
+def bench_corpus(targets, repeat):
+    corpus = [x for x in read_corpus() if x.size >= Params.min_sample_size]
+
+    def fit_corpus(func):
+        for x in corpus:
+            try:
+                run_once(func, np.arange(x.size), x)()
+            except (RuntimeError, ValueError):
+                pass
+
+    for name in targets:
+        record = measure(functools.partial(fit_corpus, TARGETS[name][0]), repeat)
+        record.update(target=name, generator='corpus', size=int(sum(x.size for x in corpus)),
+                      batch_size=len(corpus), fits_per_second=record['wall_time'] and len(corpus) / record['wall_time'])
+        yield record
+
+
+def bench_batch(sizes, batch_sizes, repeat, rng):
+    for generator, generate in GENERATORS.items():
+        for size in sizes:
+            for batch_size in batch_sizes:
+                if size * batch_size > 10 ** 7:
+                    continue
+                series = np.stack([generate(rng, size) for _ in range(batch_size)])
+                record = measure(run_once(lambda: BatchAnomalyDetector(series).fit()), repeat)
+                record.update(target='batch', generator=generator, size=size, batch_size=batch_size,
+                              fits_per_second=record['wall_time'] and batch_size / record['wall_time'])
+                yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', nargs='+', choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument('--min-size', type=float, default=10)
+    parser.add_argument('--max-size', type=float, default=1e7)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write JSON lines to this file instead of stdout.')
+    args = parser.parse_args(argv)
+
+    sizes = [10 ** k for k in range(int(np.log10(args.min_size)), int(np.log10(args.max_size)) + 1)]
+    rng = np.random.RandomState(args.seed)
+    meta = {'anko': anko.__version__, 'numpy': np.__version__, 'python': platform.python_version(),
+            'machine': platform.machine(), 'timestamp': time.time()}
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            records = (bench_import(args.repeat),
+                       bench_series(args.targets, sizes, args.repeat, rng),
+                       bench_corpus(args.targets, args.repeat),
+                       bench_batch([size for size in sizes if size >= Params.min_sample_size],
+                                   args.batch_sizes, args.repeat, rng))
+            for group in records:
+                for record in group:
+                    record.update(meta)
+                    out.write(json.dumps(record) + '\n')
+                    out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
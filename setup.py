@@ -18,17 +18,23 @@ setup(
     url='https://github.com/tanlin2013/anko',
     download_url='https://github.com/tanlin2013/anko/archive/v%s.tar.gz' % __version__,
     keywords=['statistics', 'time series', 'anomaly detection'],
+    python_requires='>=3.8',
     install_requires=[
         'numpy>=1.16.4',
         'scipy>=1.2.1',
     ],
+    extras_require={
+        'sklearn': ['scikit-learn>=0.22'],
+    },
+    entry_points={
+        'console_scripts': ['anko=anko.cli:main'],
+    },
     classifiers=[
         'Development Status :: 3 - Alpha',
         # Chose either "3 - Alpha", "4 - Beta" or "5 - Production/Stable" as the current state of your package
         'Intended Audience :: Developers',  # Define that your audience are developers
         'Topic :: Scientific/Engineering :: Mathematics',
         'License :: OSI Approved :: MIT License',  # Pick a license
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
     ],
 )
@@ -3,7 +3,8 @@
 import numpy as np
 import os
 import unittest
-from anko.anomaly_detector import AnomalyDetector
+from anko.anomaly_detector import AnomalyDetector, Params
+from anko.models import registry
 # =============================================================================
 # import sys
 # sys.path.append('../anko')
@@ -72,6 +73,117 @@ class TestAnomalyDetector(unittest.TestCase):
             statsdata = agent.check()
             statsdata["series"] = series[i]
             print(statsdata)
-      
+
+
+class TestWarmStart(unittest.TestCase):
+
+    def test_skip_lost_models(self):
+        class WarmParams(Params):
+            sgn_engine = 'curve_fit'
+            # @Note: The exact change point fit would beat the approximate one of curve_fit.
+            changepoint_max = 0
+            skip_ic_margin = 50.
+
+        t = np.arange(1, 100 + 1)
+        series = 6. * t + 10 + np.random.RandomState(0).normal(0, 1, size=100)
+        previous = AnomalyDetector(t, series, WarmParams).fit()
+        best_score = min(previous.ic_scores.values())
+        lost = {name for name, score in previous.ic_scores.items() if score - best_score > WarmParams.skip_ic_margin}
+        self.assertIn('sgn', lost)
+        result = AnomalyDetector(t, series + 1, WarmParams).fit(previous=previous)
+        self.assertEqual(result.best_model, 'linear')
+        # @Note: The seasonal model nests the line, it stays within the margin on noise and is fitted again.
+        self.assertTrue(lost.isdisjoint(result.ic_scores))
+
+    def test_seed_from_previous(self):
+        class WarmParams(Params):
+            sgn_engine = 'curve_fit'
+            # @Note: The exact change point fit would beat the approximate one of curve_fit.
+            changepoint_max = 0
+
+        t = np.arange(1, 100 + 1)
+        series = 20. * (np.sign(t - 40.5) + 2)
+        previous = AnomalyDetector(t, series, WarmParams).fit()
+        previous.popt = np.array([20., 60., 40.5])
+        result = AnomalyDetector(t, series, WarmParams).fit(previous=previous)
+        self.assertEqual(result.best_model, 'sgn')
+        np.testing.assert_allclose(result.popt, [20, 60, 40.5], atol=1)
+
+
+class TestModelSelection(unittest.TestCase):
+
+    def test_short_circuit(self):
+        t = np.arange(1, 100 + 1)
+        result = AnomalyDetector(t, 6. * t + 10).fit()
+        self.assertEqual(result.best_model, 'linear')
+        self.assertEqual(set(result.ic_scores), {'linear'})
+
+    def test_registry_order(self):
+        self.assertEqual([model_cls.name for model_cls in registry],
+                         ['linear', 'exp_decay', 'mad', 'sgn', 'seasonal', 'changepoint'])
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        t = np.arange(1, 100 + 1)
+        self.assertIsNone(AnomalyDetector(t, 6. * t + 10).fit().profile)
+
+    def test_stages_and_hooks(self):
+        class ProfiledParams(Params):
+            sgn_engine = 'curve_fit'
+            # @Note: The exact change point fit would beat the approximate one of curve_fit.
+            changepoint_max = 0
+
+        t = np.arange(1, 100 + 1)
+        series = 20. * (np.sign(t - 40.5) + 2)
+        calls = []
+        result = AnomalyDetector(t, series, ProfiledParams, hooks=[lambda *args: calls.append(args)]).fit()
+        profile = result.profile
+        self.assertEqual(result.best_model, 'sgn')
+        for name in ['normal_test', 'linear.fit', 'sgn.fit', 'sgn.score', 'sgn.residual', 'label_outliers']:
+            self.assertIn(name, profile.stages)
+        self.assertGreater(profile.nfev['sgn'], 0)
+        self.assertTrue(profile.converged['sgn'])
+        self.assertGreaterEqual(profile.total, profile.stages['sgn.fit'])
+        self.assertEqual(set(name for name, _ in calls), set(profile.stages))
+
+
+class TestDtype(unittest.TestCase):
+
+    class Float32Params(Params):
+        dtype = 'float32'
+
+    def test_float32(self):
+        t = np.arange(1, 500 + 1)
+        series = 1e4 + 0.5 * t + np.random.RandomState(0).normal(0, 1, size=500)
+        series[[100, 300]] += 20
+        detector = AnomalyDetector(t, series.astype(int), self.Float32Params)
+        self.assertEqual(detector.x.dtype, np.float32)
+        result = detector.fit()
+        expected = AnomalyDetector(t, series.astype(int)).fit()
+        self.assertEqual(result.residual.dtype, np.float32)
+        self.assertEqual(result.best_model, expected.best_model)
+        self.assertEqual([t for t, _ in result.outliers], [t for t, _ in expected.outliers])
+        np.testing.assert_allclose(result.popt, expected.popt, rtol=1e-6)
+
+
+class TestZeroCopy(unittest.TestCase):
+
+    def test_no_copy(self):
+        t = np.arange(1, 100 + 1)
+        series = 6. * t + 10
+        series[[20, 60]] += 50
+        original = series.copy()
+        agent = AnomalyDetector(t, memoryview(series), copy=False)
+        self.assertTrue(np.shares_memory(agent.x, series))
+        result = agent.fit()
+        expected = AnomalyDetector(t, series).fit()
+        self.assertEqual(result.best_model, expected.best_model)
+        self.assertEqual(result.outliers, expected.outliers)
+        np.testing.assert_array_equal(series, original)
+        self.assertEqual(agent.fit().outliers, result.outliers)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from anko.anomaly_detector import AnomalyDetector, ErrorCode, Params
+from anko.batch import BatchAnomalyDetector, BatchResult
+
+
+class TestBatchAnomalyDetector(unittest.TestCase):
+
+    @staticmethod
+    def read_from_file():
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        npzfile = np.load(dir_path + '/test_series.npz')
+        series_data = [npzfile['arr_%i' % i] for i in range(len(npzfile.files))]
+        npzfile.close()
+        return series_data
+
+    def assert_same_result(self, expected, result):
+        self.assertEqual(result.best_model, expected.best_model)
+        np.testing.assert_allclose(result.popt, expected.popt)
+        np.testing.assert_allclose(result.perr, expected.perr)
+        np.testing.assert_allclose(result.residual, expected.residual)
+        self.assertEqual(result.outliers, expected.outliers)
+
+    def test_fit_on_2d_array(self):
+        t = np.arange(100)
+        series = np.array([6 * t + 10.,
+                           20 * (np.sign(t - 20) + 2.),
+                           np.random.normal(100, 10, size=100)])
+        series[1, 50] = 100
+        results = BatchAnomalyDetector(series).fit()
+        self.assertEqual(len(results), 3)
+        for x, result in zip(series, results):
+            self.assert_same_result(AnomalyDetector(t, x).fit(), result)
+
+    def test_fit_on_ragged_list(self):
+        series = [s for s in self.read_from_file()[:40]]
+        results = BatchAnomalyDetector(series).fit()
+        for x, result in zip(series, results):
+            if x.size < 10:
+                self.assertEqual(result.error_code, ErrorCode.low_sample.format(x.size, 10))
+                continue
+            self.assert_same_result(AnomalyDetector(None, x).fit(), result)
+
+    def test_fit_columnar(self):
+        series = [s for s in self.read_from_file()[:40]]
+        detector = BatchAnomalyDetector(series)
+        columnar = detector.fit_columnar()
+        self.assertEqual(len(columnar), len(series))
+        for expected, result in zip(detector.fit(), columnar):
+            self.assertEqual(result.error_code, expected.error_code)
+            if expected.best_model is None:
+                self.assertIsNone(result.best_model)
+                continue
+            self.assert_same_result(expected, result)
+        self.assertTrue(np.all(np.diff(columnar.outliers['series']) >= 0))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.npz')
+            columnar.save(path)
+            loaded = BatchResult.load(path)
+        self.assertEqual(loaded.models, columnar.models)
+        for columns, loaded_columns in ((columnar.series, loaded.series), (columnar.outliers, loaded.outliers)):
+            for name in columns.dtype.names:
+                np.testing.assert_array_equal(loaded_columns[name], columns[name])
+
+    def test_fit_columnar_long_seasonal(self):
+        class UncappedParams(Params):
+            seasonal_max_period = None
+
+        t = np.arange(1440 * 56.)
+        x = 10 * np.sin(2 * np.pi * t[None] / [[1440], [40000]]) + np.random.RandomState(0).normal(0, 1, (2, t.size))
+        columnar = BatchAnomalyDetector(x).fit_columnar()
+        self.assertEqual([result.best_model for result in columnar], ['seasonal', 'changepoint'])
+        self.assertEqual(columnar.popt.shape[1], 1443)
+        uncapped = BatchAnomalyDetector(x, params=UncappedParams).fit_columnar()
+        self.assertEqual(uncapped.series['n_popt'][1], t.size // 2 + 3)
+
+    def test_float32(self):
+        class Float32Params(Params):
+            dtype = 'float32'
+
+        series = [s for s in self.read_from_file()[:40] if s.size >= 10]
+        for x, result in zip(series, BatchAnomalyDetector(series, params=Float32Params).fit()):
+            expected = AnomalyDetector(None, x, Float32Params).fit()
+            self.assertEqual(result.residual.dtype, np.float32)
+            self.assertEqual(result.best_model, expected.best_model)
+            self.assertEqual(result.outliers, expected.outliers)
+            np.testing.assert_allclose(result.residual, expected.residual, rtol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
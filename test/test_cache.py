@@ -0,0 +1,64 @@
+import time
+import tempfile
+import unittest
+import numpy as np
+from anko.anomaly_detector import AnomalyDetector, Params
+from anko.batch import BatchAnomalyDetector
+from anko.cache import series_key, MemoryBackend, DiskBackend, ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.t = np.arange(50)
+        self.x = 2. * self.t + np.random.RandomState(0).normal(0, 1, size=50)
+
+    def test_series_key(self):
+        class OtherParams(Params):
+            linear_res = 3.
+
+        key = series_key(self.t, self.x)
+        self.assertEqual(key, series_key(self.t, self.x.copy()))
+        self.assertNotEqual(key, series_key(self.t, self.x + 1))
+        self.assertNotEqual(key, series_key(self.t, self.x.astype(np.float32)))
+        self.assertNotEqual(key, series_key(self.t, self.x, OtherParams))
+
+    def test_fit_hits_and_misses(self):
+        cache = ResultCache()
+        first = cache.fit(AnomalyDetector(self.t, self.x))
+        second = cache.fit(AnomalyDetector(self.t, self.x.copy()))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(first.best_model, second.best_model)
+        self.assertEqual(first.outliers, second.outliers)
+
+    def test_fit_batch_only_fits_missing(self):
+        cache = ResultCache()
+        series = [self.x, self.x + 5, self.x[:30]]
+        cache.fit_batch(BatchAnomalyDetector(series[:2]))
+        results = cache.fit_batch(BatchAnomalyDetector(series))
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+        for x, result in zip(series, results):
+            self.assertEqual(result.best_model, AnomalyDetector(None, x).fit().best_model)
+
+    def test_memory_backend_eviction(self):
+        backend = MemoryBackend(max_size=2, ttl=0.05)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertEqual((backend.get('a'), backend.get('b'), backend.get('c')), (1, None, 3))
+        time.sleep(0.06)
+        self.assertIsNone(backend.get('a'))
+
+    def test_disk_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(DiskBackend(directory, max_size=1))
+            cache.fit(AnomalyDetector(self.t, self.x))
+            cache.fit(AnomalyDetector(self.t, self.x))
+            cache.fit(AnomalyDetector(self.t, self.x + 1))
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+            self.assertEqual(len(cache.backend), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
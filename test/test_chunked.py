@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from anko.anomaly_detector import AnomalyDetector, Params
+from anko.chunked import ChunkedAnomalyDetector, load_series
+from anko.models import Sgn
+
+
+class TestChunkedAnomalyDetector(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.t = np.arange(1000) * 0.5
+        self.step = 20. * (self.t > 200) + rng.normal(100, 1, size=1000)
+        self.step[[100, 700]] += 30
+        self.linear = 3. * self.t + 50 + np.round(rng.normal(0, 1, size=1000), 1)
+        self.linear[[300, 900]] -= 40
+
+    def test_select(self):
+        x = np.round(np.random.RandomState(1).normal(0, 1, size=2001), 2)
+        detector = ChunkedAnomalyDetector(None, x, chunk_size=100)
+        detector.bins = 8
+        self.assertEqual(detector.median(), np.median(x))
+        self.assertEqual(detector.mad(detector.median()), np.median(abs(x - np.median(x))))
+        for q in [0.1, 0.25, 0.75]:
+            self.assertEqual(detector.quantile(q), np.quantile(x, q))
+
+    def test_agrees_with_anomaly_detector(self):
+        class TimedParams(Params):
+            scaleless_t = False
+
+        for x in [self.step, self.linear]:
+            for params in [Params, TimedParams]:
+                expected = AnomalyDetector(self.t, x, params).fit()
+                result = ChunkedAnomalyDetector(self.t, x, params, chunk_size=64).fit()
+                self.assertEqual(result.best_model, expected.best_model)
+                np.testing.assert_allclose(result.popt, expected.popt)
+                self.assertEqual(result.outliers, expected.outliers)
+                np.testing.assert_allclose(result.residual, expected.residual)
+
+    def test_dtype(self):
+        class Float32Params(Params):
+            dtype = 'float32'
+
+        detector = ChunkedAnomalyDetector(None, self.step, Float32Params, chunk_size=64)
+        self.assertTrue(all(x.dtype == np.float32 for _, x in detector.chunks()))
+        self.assertAlmostEqual(detector.summary()['mean'], np.mean(self.step.astype(np.float32), dtype=np.float64))
+        expected = AnomalyDetector(None, self.step, Float32Params).fit()
+        result = detector.fit()
+        self.assertEqual(result.best_model, expected.best_model)
+        self.assertEqual([t for t, _ in result.outliers], [t for t, _ in expected.outliers])
+
+    def test_scan_matches_sgn(self):
+        noise = np.random.RandomState(2).exponential(size=1000)
+        for x in [self.step, noise, noise[:12]]:
+            t = np.arange(x.size)
+            popt, perr, rss = ChunkedAnomalyDetector(None, x, chunk_size=64).scan()
+            expected = Sgn.scan(t, x, min_size=Params.sgn_min_size, min_effect=Params.sgn_min_effect)
+            np.testing.assert_allclose(popt, expected[0])
+            np.testing.assert_allclose(perr, expected[1])
+            self.assertAlmostEqual(rss, np.sum((x - expected[2]) ** 2))
+
+    def test_memory_mapped_input(self):
+        with tempfile.TemporaryDirectory() as directory:
+            np.save(os.path.join(directory, 'x.npy'), self.step)
+            np.savez(os.path.join(directory, 'series.npz'), t=self.t, x=self.step)
+            np.savez_compressed(os.path.join(directory, 'compressed.npz'), x=self.step)
+            self.assertIsInstance(load_series(os.path.join(directory, 'series.npz'), 'x'), np.memmap)
+            np.testing.assert_array_equal(load_series(os.path.join(directory, 'series.npz'), 'x'), self.step)
+            np.testing.assert_array_equal(load_series(os.path.join(directory, 'compressed.npz')), self.step)
+            expected = AnomalyDetector(self.t, self.step).fit()
+            result = ChunkedAnomalyDetector(None, os.path.join(directory, 'x.npy'), chunk_size=100).fit()
+            self.assertEqual(result.outliers, expected.outliers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+from anko.anomaly_detector import AnomalyDetector
+from anko.cli import main, parse_params, read_series
+from anko.utils import InfoCriterion
+
+
+class TestCLI(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        rng = np.random.RandomState(0)
+        self.series = [rng.normal(100, 1, size=50) for _ in range(3)]
+        for x in self.series:
+            x[10] += 50
+        self.npz = os.path.join(self.directory.name, 'series.npz')
+        np.savez(self.npz, *self.series)
+        self.csv = os.path.join(self.directory.name, 'series.csv')
+        with open(self.csv, 'w') as f:
+            f.write('id,t,x\n')
+            for k, x in enumerate(self.series):
+                f.writelines('s{},{},{!r}\n'.format(k, i, float(v)) for i, v in enumerate(x))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def scan(self, *args) -> list:
+        output = os.path.join(self.directory.name, 'out.jsonl')
+        self.assertEqual(main(['scan', *args, '-o', output]), 0)
+        with open(output) as f:
+            return [json.loads(line) for line in f]
+
+    def test_parse_params(self):
+        params = parse_params(['std_width=2', 'scaleless_t=false', 'info_criterion=bic', 'skip_ic_margin=none'])
+        self.assertEqual((params.std_width, params.scaleless_t, params.info_criterion, params.skip_ic_margin),
+                         (2., False, InfoCriterion.BIC, None))
+
+    def test_read_series(self):
+        for path in [self.npz, self.csv]:
+            series = list(read_series(path))
+            self.assertEqual(len(series), 3)
+            for (_, t, x), expected in zip(series, self.series):
+                np.testing.assert_array_equal(t, np.arange(50))
+                np.testing.assert_array_equal(x, expected)
+
+    def test_read_npz_rows_memory_mapped(self):
+        path = os.path.join(self.directory.name, 'block.npz')
+        np.savez(path, block=np.stack(self.series))
+        series = list(read_series(path))
+        self.assertEqual([name for name, _, _ in series], ['block[0]', 'block[1]', 'block[2]'])
+        self.assertTrue(all(isinstance(x, np.memmap) for _, _, x in series))
+        np.savez_compressed(path, block=np.stack(self.series))
+        with self.assertRaisesRegex(ValueError, 'compressed'):
+            list(read_series(path))
+
+    def test_scan(self):
+        records = self.scan(self.npz, self.csv, '--batch-size', '2', '-j', '2', '--chunk-size', '1')
+        self.assertEqual(records, self.scan(self.npz, self.csv, '--batch-size', '2', '-j', '2'))
+        self.assertEqual([record['series'] for record in records], ['arr_0', 'arr_1', 'arr_2', 's0', 's1', 's2'])
+        for record, x in zip(records, self.series * 2):
+            expected = AnomalyDetector(None, x).fit()
+            self.assertEqual(record['model'], expected.best_model)
+            self.assertEqual([(o['t'], o['x']) for o in record['outliers']], expected.outliers)
+
+
+if __name__ == '__main__':
+    unittest.main()
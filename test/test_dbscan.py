@@ -1,30 +1,60 @@
-import os
-import sys
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
 import numpy as np
-sys.path.append('../anko')
-from stats_util import median_absolute_deviation, z_normalization
-from anomaly_detector import AnomalyDetector
-from stats_util import DBSCAN
+import unittest
+from anko.anomaly_detector import AnomalyDetector, Params
+from anko.models import DBSCAN
 
 
-if __name__ == '__main__':
+class TestDBSCAN(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.t = np.arange(300.)
+        self.x = rng.normal(100, 3, size=300)
+        self.x[[50, 180]] += 40
+
+    def test_sweep_1d(self):
+        model = DBSCAN(self.t, self.x)
+        out = model.fit(eps=0.9, min_samples=3)
+        noise = np.flatnonzero(out['labels'] == -1)
+        self.assertIn(50, noise)
+        self.assertIn(180, noise)
+        self.assertEqual(out['n_noise'], noise.size)
+        # @Note: Brute-force neighbour counts.
+        count = np.sum(abs(self.x[:, None] - self.x[None, :]) <= model.x_eps, axis=1)
+        np.testing.assert_array_equal(model.core_sample_mask, count >= 3)
 
-    dir_path = os.path.dirname(os.path.realpath(__file__))
-    npzfile = np.load(dir_path + '/test_series.npz')
-    series_data = [npzfile['arr_%i' % i] for i in range(len(npzfile.files))]
-    npzfile.close()
-    series = np.array(series_data)
+    def test_sweep_2d(self):
+        model = DBSCAN(self.t, self.x)
+        out = model.fit(eps=2, min_samples=4, t_eps=5)
+        near = (abs(self.t[:, None] - self.t[None, :]) <= 5) & (abs(self.x[:, None] - self.x[None, :]) <= model.x_eps)
+        np.testing.assert_array_equal(model.core_sample_mask, near.sum(axis=1) >= 4)
+        self.assertEqual(out['labels'][50], -1)
+        self.assertEqual(out['labels'][180], -1)
 
-    # for i in range(len(series)):
+    def test_sklearn_engine(self):
+        try:
+            import sklearn  # noqa: F401
+        except ImportError:
+            self.skipTest("scikit-learn is not installed")
+        for t_eps in [None, 5.5]:
+            sweep, sk = DBSCAN(self.t, self.x), DBSCAN(self.t, self.x, engine='sklearn')
+            out, sk_out = sweep.fit(2, 4, t_eps), sk.fit(2, 4, t_eps)
+            np.testing.assert_array_equal(sweep.core_sample_mask, sk.core_sample_mask)
+            np.testing.assert_array_equal(out['labels'] == -1, sk_out['labels'] == -1)
+            self.assertEqual(out['n_clusters'], sk_out['n_clusters'])
 
-    i = 28
-    t = np.arange(1, len(series[i]) + 1)
-    print(series[i])
+    def test_fit_dbscan(self):
+        class DBSCANParams(Params):
+            scaleless_t = False
 
-    out = DBSCAN(series[i], 3.0)
-    print(np.std(series[i]))
-    print(out)
+        result = AnomalyDetector(self.t, self.x, DBSCANParams).fit_dbscan()
+        self.assertEqual(result.best_model, 'dbscan')
+        self.assertIn((50., self.x[50]), result.outliers)
+        self.assertIn((180., self.x[180]), result.outliers)
+        self.assertEqual(len(result.residual), len(result.outliers))
 
-    z = (series[i] - np.median(series[i])) / median_absolute_deviation(series[i])
-    print(z)
-    print(z_normalization(series[i]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import os
+import sys
+import subprocess
+import unittest
+
+
+class TestImports(unittest.TestCase):
+
+    def test_no_heavy_import(self):
+        # @Note: A fresh interpreter, since other tests have imported scipy already.
+        code = ("import sys, anko.anomaly_detector, anko.batch, anko.cli; "
+                "print(*sorted(set(m.partition('.')[0] for m in sys.modules) & {'scipy', 'sklearn', 'asyncio'}))")
+        root = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+        out = subprocess.run([sys.executable, '-c', code], cwd=root, check=True,
+                             stdout=subprocess.PIPE, universal_newlines=True).stdout
+        self.assertEqual(out.split(), [])
+
+    def test_cli_without_parallel(self):
+        code = ("import sys, anko.cli; "
+                "print('anko.parallel' in sys.modules, 'multiprocessing.shared_memory' in sys.modules)")
+        root = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+        out = subprocess.run([sys.executable, '-c', code], cwd=root, check=True,
+                             stdout=subprocess.PIPE, universal_newlines=True).stdout
+        self.assertEqual(out.split(), ['False', 'False'])
+
+
+if __name__ == '__main__':
+    unittest.main()
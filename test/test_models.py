@@ -0,0 +1,281 @@
+import unittest
+import numpy as np
+from scipy.stats import normaltest
+from anko.anomaly_detector import AnomalyDetector, Params
+from anko.batch import BatchAnomalyDetector
+from anko.models import Gaussian, LinearRegression, ExpDecay, Sgn, MAD, ChangePoint, Seasonal
+from anko.utils import SeriesStats, median_and_mad
+
+
+class TestGaussian(unittest.TestCase):
+
+    def test_normal_test_matches_scipy(self):
+        rng = np.random.RandomState(0)
+        x = np.array([rng.normal(0, 1, size=100), rng.exponential(size=100), rng.uniform(size=100)])
+        np.testing.assert_allclose(Gaussian.batch_is_normal_distribution(x, 1e-3), normaltest(x, axis=-1)[1] >= 1e-3)
+        for x_i in x:
+            self.assertEqual(Gaussian(x_i).is_normal_distribution(1e-3), normaltest(x_i)[1] >= 1e-3)
+
+    def test_constant_is_not_normal(self):
+        self.assertFalse(Gaussian(np.ones(20)).is_normal_distribution())
+        self.assertFalse(Gaussian(np.random.normal(size=5)).is_normal_distribution())
+
+    def test_moments_engine(self):
+        rng = np.random.RandomState(0)
+        x = rng.normal(100, 10, size=10000)
+        popt, perr = Gaussian(x).fit()
+        np.testing.assert_allclose(popt[1:], [np.mean(x), np.std(x)])
+        np.testing.assert_allclose(perr[1:], [np.std(x) / 100, np.std(x) / np.sqrt(20000)])
+        # @Note: The amplitude of the histogram fit is in counts per bin, the one of the moments per unit of x.
+        bin_width = np.diff(np.histogram_bin_edges(x, bins='auto')[:2])[0]
+        popt_histogram, perr_histogram = Gaussian(x, engine='histogram').fit()
+        np.testing.assert_allclose(popt[1:], popt_histogram[1:], rtol=0.02)
+        np.testing.assert_allclose(popt[0] * bin_width, popt_histogram[0], rtol=0.05)
+        self.assertTrue(np.all(perr[1:] < perr_histogram[1:]))
+
+    def test_robust_moments_engine(self):
+        x = np.random.RandomState(0).normal(0, 1, size=1000)
+        x[:20] = 1e3
+        model = Gaussian(x, robust=True)
+        popt, perr = model.fit()
+        np.testing.assert_allclose(popt[1:], [0, 1], atol=0.1)
+        self.assertTrue(np.all(np.abs(model.residual(0)[:20]) > 100))
+
+
+class TestSgn(unittest.TestCase):
+
+    def test_scan_on_step(self):
+        t = np.arange(1, 100 + 1)
+        series = 20 * (np.sign(t - 20.5) + 2)
+        popt, perr = Sgn(t, series).fit()
+        np.testing.assert_allclose(popt, [20, 60, 20.5])
+        np.testing.assert_allclose(perr, [0, 0, 0.5])
+
+    def test_scan_matches_brute_force(self):
+        rng = np.random.RandomState(0)
+        t = np.sort(rng.uniform(0, 10, size=50))
+        x = np.where(t > 3, 5., 1.) + rng.normal(0, 1, size=50)
+        rss = [np.sum((x[:k] - x[:k].mean()) ** 2) + np.sum((x[k:] - x[k:].mean()) ** 2) for k in range(1, 50)]
+        k = np.argmin(rss) + 1
+        model = Sgn(t, x)
+        popt, _ = model.fit()
+        np.testing.assert_allclose(popt, [x[:k].mean(), x[k:].mean(), 0.5 * (t[k - 1] + t[k])])
+        self.assertAlmostEqual(np.sum((x - model.x_pred) ** 2), min(rss))
+
+    def test_scan_on_batch(self):
+        t = np.arange(30)
+        x = np.array([np.where(t < 10, 1., 4.), np.where(t < 25, 7., -2.)])
+        popt, perr, x_pred = Sgn.scan(t, x)
+        np.testing.assert_allclose(popt, [[1, 4, 9.5], [7, -2, 24.5]])
+        np.testing.assert_allclose(x_pred, x)
+
+    def test_flat_fit_below_min_effect(self):
+        t = np.arange(100)
+        x = np.where(t < 50, 0., 0.5) + np.random.RandomState(0).normal(0, 1, size=100)
+        model = Sgn(t, x)
+        popt, _ = model.fit()
+        np.testing.assert_allclose(popt[:2], np.mean(x))
+        np.testing.assert_allclose(model.x_pred, np.mean(x))
+        self.assertGreater(Sgn(t, x, min_effect=0.).fit()[0][1] - popt[1], 0.)
+
+    def test_skewed_noise(self):
+        rng = np.random.RandomState(0)
+        t, x = np.arange(500.), rng.exponential(size=(50, 500))
+        models = [AnomalyDetector(t, x_i).fit().best_model for x_i in x]
+        self.assertLess(models.count('sgn'), 5)
+
+
+class TestExpDecay(unittest.TestCase):
+
+    def setUp(self):
+        self.t = np.arange(1, 100 + 1.)
+        self.x = 100 * np.exp(-0.05 * self.t) + np.random.RandomState(0).normal(0, 1, size=100)
+
+    def test_log_linear(self):
+        popt, perr = ExpDecay(self.t, 10 * np.exp(-3 * self.t)).fit()
+        np.testing.assert_allclose(popt, [10, 3])
+        np.testing.assert_allclose(perr, 0, atol=1e-12)
+
+    def test_non_positive_falls_back_to_curve_fit(self):
+        self.assertLess(self.x.min(), 0)
+        popt, perr = ExpDecay(self.t, self.x).fit()
+        np.testing.assert_allclose(popt, [100, 0.05], rtol=0.02)
+        self.assertLess(np.linalg.norm(perr), 1)
+
+    def test_noise_without_decay(self):
+        t, x = np.arange(1e4), np.random.RandomState(1).standard_t(2, size=(20, 10000))
+        model = ExpDecay(t, x[0])
+        popt, perr = model.fit()
+        self.assertTrue(np.all(np.isnan(popt)))
+        self.assertEqual(model.score(), np.inf)
+        np.testing.assert_array_equal(ExpDecay.batch_dof(ExpDecay.fit_many(t, x, Params)[0]), np.inf)
+        self.assertNotIn('exp_decay', [AnomalyDetector(t, x_i).fit().best_model for x_i in x])
+
+    def test_fit_many(self):
+        x = np.stack([self.x, -200 * np.exp(-0.03 * self.t) + np.random.RandomState(1).normal(0, 1, size=100)])
+        popt, perr, x_pred = ExpDecay.fit_many(self.t, x, Params)
+        for i in range(len(x)):
+            model = ExpDecay(self.t, x[i])
+            np.testing.assert_allclose(popt[i], model.fit()[0])
+            np.testing.assert_allclose(x_pred[i], model.x_pred)
+
+    def test_selected_by_detector(self):
+        x = self.x.copy()
+        x[60] += 15
+        result = AnomalyDetector(self.t, x).fit()
+        self.assertEqual(result.best_model, 'exp_decay')
+        self.assertEqual([t for t, _ in result.outliers], [60])
+
+
+class TestChangePoint(unittest.TestCase):
+
+    def setUp(self):
+        self.t = np.arange(300.)
+        self.x = np.repeat([0., 5., -3., 8.], 75) + np.random.RandomState(2).normal(0, 1, size=300)
+
+    def test_segment(self):
+        popt, perr = ChangePoint(self.t, self.x).fit()
+        self.assertEqual(popt.size, 7)
+        np.testing.assert_allclose(popt[:4], [0, 5, -3, 8], atol=0.3)
+        np.testing.assert_allclose(popt[4:], [74.5, 149.5, 224.5])
+        np.testing.assert_allclose(perr[4:], 0.5)
+
+    def test_unsorted_t(self):
+        order = np.random.RandomState(1).permutation(self.t.size)
+        model = ChangePoint(self.t[order], self.x[order])
+        np.testing.assert_allclose(model.fit()[0], ChangePoint(self.t, self.x).fit()[0])
+        np.testing.assert_allclose(model.x_pred, ChangePoint.func(self.t[order], *model.fit()[0]))
+
+    def test_single_step_matches_sgn(self):
+        t = np.arange(1, 100 + 1)
+        series = 20 * (np.sign(t - 20.5) + 2)
+        popt, _ = ChangePoint(t, series).fit()
+        np.testing.assert_allclose(popt, Sgn(t, series).fit()[0][[0, 1, 2]])
+
+    def test_selected_by_detector(self):
+        x = self.x.copy()
+        x[200] += 20
+        result = AnomalyDetector(self.t, x).fit()
+        self.assertEqual(result.best_model, 'changepoint')
+        self.assertEqual([t for t, _ in result.outliers], [200.])
+
+    def test_skewed_noise(self):
+        rng = np.random.RandomState(0)
+        t, x = np.arange(500.), rng.exponential(size=(50, 500))
+        popt, _ = ChangePoint(t, x[0]).fit()
+        self.assertEqual(popt.size, 3)
+        np.testing.assert_allclose(popt[:2], np.mean(x[0]))
+        models = [AnomalyDetector(t, x_i).fit().best_model for x_i in x]
+        self.assertNotIn('changepoint', models)
+        self.assertLess(models.count('sgn'), 5)
+
+    def test_short_series(self):
+        rng = np.random.RandomState(0)
+        t, x = np.arange(15.), rng.exponential(size=(100, 15))
+        popt, _ = ChangePoint(t, x[0]).fit()
+        np.testing.assert_allclose(popt, np.mean(x[0]))
+        self.assertEqual(ChangePoint.batch_dof([popt]), np.inf)
+        models = [AnomalyDetector(t, x_i).fit().best_model for x_i in x]
+        models += [result.best_model for result in BatchAnomalyDetector(list(x)).fit()]
+        self.assertNotIn('changepoint', models)
+
+
+class TestSeasonal(unittest.TestCase):
+
+    def setUp(self):
+        self.t = np.arange(480.)
+        self.x = 100 + 10 * np.sin(2 * np.pi * self.t / 48) + np.random.RandomState(0).normal(0, 1, size=480)
+
+    def test_period(self):
+        popt, perr = Seasonal(self.t, self.x).fit()
+        self.assertEqual((popt[2], popt.size, perr.size), (48, 51, 51))
+        np.testing.assert_allclose(popt[:2], [100, 0], atol=0.3)
+
+    def test_weekly_covers_daily(self):
+        t = np.arange(24 * 7 * 4)
+        x = 3 * np.sin(2 * np.pi * t / 24) + 2 * (t % 168 >= 120) + np.random.RandomState(1).normal(0, .3, t.size)
+        self.assertEqual(Seasonal(t, x).fit()[0][2], 168)
+
+    def test_unsorted_t(self):
+        order = np.random.RandomState(1).permutation(self.t.size)
+        model, expected = Seasonal(self.t[order], self.x[order]), Seasonal(self.t, self.x)
+        np.testing.assert_allclose(model.fit()[0], expected.fit()[0])
+        np.testing.assert_allclose(model.x_pred, expected.x_pred[order])
+        np.testing.assert_allclose(model.x_pred, Seasonal.func(self.t[order], *model.fit()[0]))
+
+    def test_decompose_batch(self):
+        x = self.x + np.random.RandomState(2).normal(0, 1, size=(4, 480))
+        popt, perr, x_pred = Seasonal.decompose(self.t, x)
+        for i in range(4):
+            model = Seasonal(self.t, x[i])
+            np.testing.assert_allclose(popt[i], model.fit()[0])
+            np.testing.assert_allclose(x_pred[i], model.x_pred)
+
+    def test_selected_by_detector(self):
+        x = self.x.copy()
+        x[300] += 20
+        result = AnomalyDetector(self.t, x).fit()
+        self.assertEqual(result.best_model, 'seasonal')
+        self.assertEqual([t for t, _ in result.outliers], [300.])
+
+    def test_noise_not_seasonal(self):
+        rng = np.random.RandomState(0)
+        t, x = np.arange(50.), np.concatenate([rng.exponential(size=(50, 50)), rng.standard_t(3, size=(50, 50))])
+        popt, perr, x_pred = Seasonal.decompose(t, x)
+        flat = [i for i, p in enumerate(popt) if p[2] == 1]
+        self.assertGreater(len(flat), 95)
+        line = LinearRegression(t, x[flat[0]])
+        np.testing.assert_allclose(popt[flat[0]][:2], line.fit()[0])
+        np.testing.assert_allclose(x_pred[flat[0]], line.x_pred)
+        self.assertNotIn('seasonal', [AnomalyDetector(t, x_i).fit().best_model for x_i in x])
+
+
+class TestSeriesStats(unittest.TestCase):
+
+    def test_models_share_stats(self):
+        t = np.arange(51)
+        x = np.random.normal(size=51)
+        stats = SeriesStats(x)
+        models = [Gaussian(x, stats=stats), LinearRegression(t, x, stats=stats),
+                  Sgn(t, x, stats=stats), MAD(t, x, stats=stats)]
+        for model in models[1:]:
+            model.fit()
+        self.assertEqual(set(stats._cache), {'moments', 'median', 'mad', 'cumsum'})
+        self.assertAlmostEqual(stats.std, np.std(x))
+        self.assertEqual(models[-1].x_pred, np.median(x))
+        np.testing.assert_allclose(Sgn.scan(t, x)[0], Sgn.scan(t, x, stats=stats)[0])
+
+
+class TestMedianAndMAD(unittest.TestCase):
+
+    def test_exact(self):
+        x = np.random.normal(10, 3, size=(4, 6, 9))
+        for axis in [None, 0, 1, -1]:
+            median, mad = median_and_mad(x, axis=axis)
+            np.testing.assert_allclose(median, np.median(x, axis=axis))
+            np.testing.assert_allclose(mad, np.median(abs(x - np.median(x, axis=axis, keepdims=True)), axis=axis))
+        x = np.random.randint(0, 100, size=100)
+        self.assertEqual(median_and_mad(x), (np.median(x), np.median(abs(x - np.median(x)))))
+
+    def test_approximate(self):
+        x = np.random.normal(10, 3, size=(3, 100001))
+        median, mad = median_and_mad(x, axis=-1, approximate=True)
+        width = np.ptp(x, axis=-1) / 4096
+        self.assertTrue(np.all(abs(median - np.median(x, axis=-1)) <= width))
+        self.assertTrue(np.all(abs(mad - median_and_mad(x, axis=-1)[1]) <= 2 * width))
+        self.assertEqual(median_and_mad(np.ones(4), approximate=True), (1., 0.))
+        x[1] = 7.
+        median, mad = median_and_mad(x, axis=-1, approximate=True)
+        self.assertEqual((median[1], mad[1]), (7., 0.))
+
+    def test_approximate_with_outlier(self):
+        rng = np.random.RandomState(0)
+        x = np.stack([rng.normal(0, 1, size=100001), rng.lognormal(size=100001)])
+        x[0, 10] = 1e6
+        median, mad = median_and_mad(x, axis=-1, approximate=True)
+        np.testing.assert_allclose(median, np.median(x, axis=-1), atol=1e-3)
+        np.testing.assert_allclose(mad, median_and_mad(x, axis=-1)[1], atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
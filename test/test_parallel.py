@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+from anko.batch import BatchAnomalyDetector
+from anko.parallel import ParallelAnomalyDetector, SharedSeries
+
+
+class TestParallelAnomalyDetector(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        t = np.arange(60)
+        self.series = [rng.normal(10, 1, size=n) + 0.5 * np.arange(n) for n in rng.randint(20, 60, size=9)]
+        self.series += [20 * (np.sign(t - 20) + 2.), 6 * t + 10.]
+
+    def assert_same_results(self, expected, results):
+        self.assertEqual(len(results), len(expected))
+        for e, r in zip(expected, results):
+            self.assertEqual(r.best_model, e.best_model)
+            np.testing.assert_allclose(r.residual, e.residual)
+            self.assertEqual(r.outliers, e.outliers)
+
+    def test_shared_series(self):
+        with SharedSeries(self.series) as shared:
+            shm, views = SharedSeries.attach(shared.handle, 2, 5)
+            for view, x in zip(views, self.series[2:5]):
+                np.testing.assert_array_equal(view, x)
+            del views
+            shm.close()
+
+    def test_fit_keeps_input_order(self):
+        expected = BatchAnomalyDetector(self.series).fit()
+        for backend in ParallelAnomalyDetector.backends:
+            results = ParallelAnomalyDetector(self.series, n_jobs=2, chunk_size=3, backend=backend).fit()
+            self.assert_same_results(expected, results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+import numpy as np
+from anko.rolling import RollingAnomalyDetector
+
+
+class TestRollingAnomalyDetector(unittest.TestCase):
+
+    def test_fit_follows_regimes(self):
+        rng = np.random.RandomState(0)
+        x = np.r_[np.full(1000, 10.), 0.05 * np.arange(1000) + 10] + rng.normal(0, 1, size=2000)
+        x[[300, 1500]] += 40
+        detector = RollingAnomalyDetector(None, x, window=200, stride=50)
+        is_outlier = detector.fit()
+        self.assertEqual(is_outlier.shape, x.shape)
+        np.testing.assert_array_equal(np.flatnonzero(is_outlier), [300, 1500])
+        self.assertEqual(detector.best_models[-1], 'linear')
+
+    def test_windows_cover_series(self):
+        detector = RollingAnomalyDetector(None, np.zeros(105), window=20, stride=10)
+        np.testing.assert_array_equal(detector.starts, [0, 10, 20, 30, 40, 50, 60, 70, 80, 85])
+
+    def test_medians_match_numpy(self):
+        x = np.random.randint(0, 20, size=300).astype(float)
+        detector = RollingAnomalyDetector(None, x, window=40, stride=7)
+        expected = [np.median(x[start:start + 40]) for start in detector.starts]
+        np.testing.assert_allclose(detector._window_medians(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import asyncio
+import unittest
+from unittest import mock
+import numpy as np
+from anko.anomaly_detector import AnomalyDetector
+from anko.batch import BatchAnomalyDetector
+from anko.service import MicroBatcher, DetectionServer
+
+
+class TestService(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.series = [rng.normal(100, 1, size=50) for _ in range(5)]
+        for x in self.series:
+            x[10] += 50
+
+    def test_afit(self):
+        detector = AnomalyDetector(None, self.series[0])
+        result = asyncio.run(detector.afit())
+        expected = detector.fit()
+        self.assertEqual((result.best_model, result.outliers), (expected.best_model, expected.outliers))
+
+    def test_micro_batcher(self):
+        async def submit_all():
+            async with MicroBatcher(max_batch_size=2, max_wait=0.05) as batcher:
+                results = await asyncio.gather(*[batcher.submit(x) for x in self.series])
+                return results, batcher.n_batches
+
+        results, n_batches = asyncio.run(submit_all())
+        self.assertEqual(n_batches, 3)
+        for x, result in zip(self.series, results):
+            expected = AnomalyDetector(None, x).fit()
+            self.assertEqual((result.best_model, result.outliers), (expected.best_model, expected.outliers))
+
+    def test_errors_stay_with_their_series(self):
+        async def submit_all(series):
+            async with MicroBatcher(max_batch_size=3, max_wait=0.05) as batcher:
+                return await asyncio.gather(*[batcher.submit(x) for x in series], return_exceptions=True)
+
+        results = asyncio.run(submit_all([self.series[0], [1.0, 'a'], np.full(20, np.nan)]))
+        self.assertIsInstance(results[1], ValueError)
+        self.assertIsInstance(results[2], ValueError)
+        expected = AnomalyDetector(None, self.series[0]).fit()
+        self.assertEqual((results[0].best_model, results[0].outliers), (expected.best_model, expected.outliers))
+
+        # @Note: A series that makes the fit of its batch raise gets the error alone, the others are fitted again.
+        fit = BatchAnomalyDetector.fit
+
+        def fit_or_raise(detector):
+            if any(x[0] == 0 for x in detector.x):
+                raise RuntimeError("bad series")
+            return fit(detector)
+
+        with mock.patch.object(BatchAnomalyDetector, 'fit', fit_or_raise):
+            results = asyncio.run(submit_all([self.series[0], np.zeros(20), self.series[2]]))
+        self.assertIsInstance(results[1], RuntimeError)
+        for i in (0, 2):
+            expected = AnomalyDetector(None, self.series[i]).fit()
+            self.assertEqual((results[i].best_model, results[i].outliers), (expected.best_model, expected.outliers))
+
+    def test_http(self):
+        async def request(reader, writer, method, path, payload=None):
+            body = b'' if payload is None else json.dumps(payload).encode()
+            writer.write("{} {} HTTP/1.1\r\nContent-Length: {}\r\n\r\n".format(method, path, len(body)).encode()
+                         + body)
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line == b'\r\n':
+                    break
+                name, _, value = line.decode().partition(':')
+                headers[name.lower()] = value.strip()
+            return status, json.loads(await reader.readexactly(int(headers['content-length'])))
+
+        async def session():
+            async with MicroBatcher() as batcher:
+                server = await DetectionServer(batcher).start(port=0)
+                port = server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                responses = [
+                    await request(reader, writer, 'GET', '/health'),
+                    await request(reader, writer, 'POST', '/fit', {'x': self.series[0].tolist(), 'id': 'a'}),
+                    await request(reader, writer, 'POST', '/fit', {'series': [{'x': x.tolist()} for x in self.series]}),
+                    await request(reader, writer, 'POST', '/fit', {'y': []}),
+                    await request(reader, writer, 'GET', '/missing'),
+                ]
+                writer.close()
+                server.close()
+                await server.wait_closed()
+                return responses
+
+        health, single, many, invalid, missing = asyncio.run(session())
+        self.assertEqual(health, (200, {'status': 'ok'}))
+        self.assertEqual((single[0], single[1]['series'], single[1]['size']), (200, 'a', 50))
+        self.assertEqual([outlier['t'] for outlier in single[1]['outliers']], [10.])
+        self.assertEqual((many[0], len(many[1])), (200, 5))
+        self.assertEqual(single[1], {**many[1][0], 'series': 'a'})
+        self.assertEqual((invalid[0], missing[0]), (400, 404))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import numpy as np
+from anko.streaming import SortedWindow, MedianSketch, OnlineAnomalyDetector
+
+
+class TestSortedWindow(unittest.TestCase):
+
+    def test_median_and_mad(self):
+        rng = np.random.RandomState(0)
+        for n in range(1, 30):
+            x = rng.randint(0, 8, size=n).astype(float)
+            window = SortedWindow(x)
+            self.assertAlmostEqual(window.median, np.median(x))
+            self.assertAlmostEqual(window.mad, np.median(abs(x - np.median(x))))
+
+    def test_remove(self):
+        window = SortedWindow([3., 1., 2., 2.])
+        window.remove(2.)
+        window.add(7.)
+        self.assertEqual(window.median, 2.5)
+        self.assertEqual(len(window), 4)
+
+    def test_blocks(self):
+        class SmallBlocks(SortedWindow):
+            load = 2
+
+        rng = np.random.RandomState(1)
+        window, values = SmallBlocks(), []
+        for _ in range(500):
+            if values and rng.rand() < 0.4:
+                window.remove(values.pop(rng.randint(len(values))))
+            else:
+                values.append(float(rng.randint(0, 20)))
+                window.add(values[-1])
+            self.assertEqual(list(window), sorted(values))
+            if values:
+                self.assertEqual(window.median, np.median(values))
+                self.assertEqual(window.mad, np.median(abs(np.array(values) - np.median(values))))
+
+
+class TestMedianSketch(unittest.TestCase):
+
+    def test_exact_up_to_size(self):
+        x = np.random.RandomState(0).normal(0, 1, size=64)
+        sketch = MedianSketch(x, size=64)
+        self.assertEqual((sketch.median, sketch.mad), (np.median(x), np.median(abs(x - np.median(x)))))
+
+    def assert_ranks(self, x, sketch, tolerance=0.01):
+        median = np.median(x)
+        self.assertEqual(len(sketch), x.size)
+        self.assertLessEqual(abs(np.mean(x < sketch.median) - 0.5), tolerance)
+        self.assertLessEqual(abs(np.mean(abs(x - median) < sketch.mad) - 0.5), tolerance)
+
+    def test_heavy_tails(self):
+        rng = np.random.RandomState(0)
+        for x in (rng.normal(0, 1, size=20000), rng.exponential(size=20000), rng.lognormal(size=20000),
+                  rng.standard_t(1, size=20000)):
+            self.assert_ranks(x, MedianSketch(x, size=256))
+
+    def test_spike(self):
+        x = np.random.RandomState(1).normal(100, 1, size=20000)
+        x[[1000, 5000]] = [1e7, -1e9]
+        sketch = MedianSketch(x, size=256)
+        self.assert_ranks(x, sketch, tolerance=0.02)
+        self.assertAlmostEqual(sketch.median, 100, delta=0.05)
+        self.assertAlmostEqual(sketch.mad, 0.6745, delta=0.05)
+
+    def test_flat(self):
+        sketch = MedianSketch(np.full(100, 3.), size=16)
+        self.assertEqual((sketch.median, sketch.mad), (3., 0.))
+        with self.assertRaises(ValueError):
+            sketch.add(np.nan)
+
+
+class TestOnlineAnomalyDetector(unittest.TestCase):
+
+    def test_update_on_linear(self):
+        x = 3 * np.arange(200) + np.random.normal(0, 1, size=200)
+        x[150] += 50
+        detector = OnlineAnomalyDetector()
+        flags = [detector.update(None, x_i) for x_i in x]
+        np.testing.assert_array_equal(np.flatnonzero(flags), [150])
+        self.assertEqual(detector.best_model, 'linear')
+
+    def test_spike_without_window(self):
+        x = np.random.RandomState(0).normal(0, 1, size=6000)
+        x[4500] = 1e7
+        detector = OnlineAnomalyDetector()
+        flags = [detector.update(None, x_i) for x_i in x]
+        self.assertTrue(flags[4500])
+        self.assertAlmostEqual(detector.median, np.median(x), delta=0.05)
+        self.assertAlmostEqual(detector.mad, np.median(abs(x - np.median(x))), delta=0.05)
+
+    def test_window_expiry(self):
+        x = np.random.normal(0, 1, size=300)
+        detector = OnlineAnomalyDetector(window=50)
+        for x_i in x:
+            detector.update(None, x_i)
+        self.assertEqual(detector.n, 50)
+        self.assertAlmostEqual(detector.mean, np.mean(x[-50:]))
+        self.assertAlmostEqual(detector.std, np.std(x[-50:]))
+        self.assertAlmostEqual(detector.mad, np.median(abs(x[-50:] - np.median(x[-50:]))))
+
+
+if __name__ == '__main__':
+    unittest.main()